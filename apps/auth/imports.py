@@ -0,0 +1,210 @@
+import csv
+import json
+from typing import AsyncIterator, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from apps.auth.models import User
+from apps.auth.schemas import UserImportError, UserImportResult, UserImportRow
+from apps.auth.usernames import next_username_seq, username_filter
+from core.config import settings
+from core.database import DbSession, run_db
+from core.hashing import password_hasher
+from core.security import get_password_hash
+
+# Content-Types aceitos na importação e o formato correspondente
+IMPORT_FORMATS = {
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/json-lines": "jsonl",
+    "text/csv": "csv",
+}
+
+# (número da linha, campos, erro de parsing)
+ParsedRow = Tuple[int, Optional[dict], Optional[str]]
+
+
+def _decode_line(line: bytes) -> Optional[str]:
+    """Texto da linha, ou None se ela não for UTF-8 válido"""
+    try:
+        return line.decode("utf-8-sig").rstrip("\r")
+    except UnicodeDecodeError:
+        return None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Optional[str]]:
+    """Quebra um corpo recebido em streaming em linhas de texto.
+
+    Linhas que não são UTF-8 válido são entregues como None, para serem
+    reportadas como erro da linha sem abortar a importação.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield _decode_line(line)
+    if buffer:
+        yield _decode_line(buffer)
+
+
+async def parse_import_stream(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[ParsedRow]:
+    """Lê registros JSON Lines ou CSV (com cabeçalho, um registro por linha)"""
+    header: Optional[List[str]] = None
+    line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if line is None:
+            yield line_no, None, "Invalid UTF-8"
+            continue
+        if not line.strip():
+            continue
+        if fmt == "jsonl":
+            try:
+                fields = json.loads(line)
+            except ValueError:
+                yield line_no, None, "Invalid JSON"
+                continue
+            if not isinstance(fields, dict):
+                yield line_no, None, "Expected a JSON object"
+                continue
+            yield line_no, fields, None
+        else:
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) != len(header):
+                yield line_no, None, f"Expected {len(header)} columns, got {len(values)}"
+                continue
+            # Colunas vazias são tratadas como ausentes (ex.: full_name opcional)
+            yield line_no, {k: v for k, v in zip(header, values) if v != ""}, None
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+class UserImportService:
+    @staticmethod
+    async def import_users(
+        db: DbSession,
+        rows: AsyncIterator[ParsedRow],
+        chunk_size: Optional[int] = None
+    ) -> UserImportResult:
+        """Importa usuários em lotes, reportando erros por linha sem abortar"""
+        chunk_size = chunk_size or settings.USER_IMPORT_CHUNK_SIZE
+        result = UserImportResult()
+        seen_emails: Set[str] = set()
+        seen_usernames: Set[str] = set()
+        chunk: List[Tuple[int, UserImportRow]] = []
+
+        async for line_no, fields, error in rows:
+            if error is None:
+                try:
+                    chunk.append((line_no, UserImportRow.model_validate(fields)))
+                except ValidationError as exc:
+                    error = _format_validation_error(exc)
+            if error is not None:
+                UserImportService._fail(result, line_no, error)
+            if len(chunk) >= chunk_size:
+                await UserImportService._import_chunk(db, chunk, seen_emails, seen_usernames, result)
+                chunk = []
+
+        if chunk:
+            await UserImportService._import_chunk(db, chunk, seen_emails, seen_usernames, result)
+        return result
+
+    @staticmethod
+    def _fail(result: UserImportResult, line_no: int, error: str) -> None:
+        result.failed += 1
+        result.errors.append(UserImportError(row=line_no, error=error))
+
+    @staticmethod
+    async def _import_chunk(
+        db: DbSession,
+        chunk: List[Tuple[int, UserImportRow]],
+        seen_emails: Set[str],
+        seen_usernames: Set[str],
+        result: UserImportResult
+    ) -> None:
+        """Valida unicidade do lote com IN, gera os hashes em paralelo e insere"""
+        emails = {row.email for _, row in chunk}
+        usernames = {row.username for _, row in chunk}
+        existing_emails, existing_usernames = await run_db(
+            db, UserImportService._existing, emails, usernames
+        )
+
+        accepted: List[Tuple[int, UserImportRow]] = []
+        for line_no, row in chunk:
+            if row.email in existing_emails or row.email in seen_emails:
+                UserImportService._fail(result, line_no, "Email already registered")
+            elif row.username in existing_usernames or row.username in seen_usernames:
+                UserImportService._fail(result, line_no, "Username already taken")
+            else:
+                seen_emails.add(row.email)
+                seen_usernames.add(row.username)
+                accepted.append((line_no, row))
+        if not accepted:
+            return
+
+        hashes = await password_hasher.run_many(
+            get_password_hash, [(row.password,) for _, row in accepted]
+        )
+        values = [
+            {
+                "email": row.email,
+                "username": row.username,
+                "hashed_password": hashed_password,
+                "full_name": row.full_name,
+                "role": row.role,
+                "is_active": True,
+            }
+            for (_, row), hashed_password in zip(accepted, hashes)
+        ]
+        await run_db(db, UserImportService._insert_chunk, accepted, values, result)
+
+    @staticmethod
+    def _existing(db: Session, emails: Set[str], usernames: Set[str]) -> Tuple[Set[str], Set[str]]:
+        """Emails e usernames do lote que já existem no banco"""
+        existing_emails = set(db.scalars(select(User.email).where(User.email.in_(emails))))
+        existing_usernames = set(db.scalars(select(User.username).where(User.username.in_(usernames))))
+        return existing_emails, existing_usernames
+
+    @staticmethod
+    def _insert_chunk(
+        db: Session,
+        accepted: List[Tuple[int, UserImportRow]],
+        values: List[dict],
+        result: UserImportResult
+    ) -> None:
+        """Insere o lote em um INSERT; em conflito, linha a linha"""
+        try:
+            # Um número de alteração por lote, reservado logo antes do INSERT
+            seq = next_username_seq(db)
+            db.execute(insert(User), [dict(row_values, username_seq=seq) for row_values in values])
+            db.commit()
+            result.created += len(values)
+            for row_values in values:
+                username_filter.add(row_values["username"])
+            return
+        except IntegrityError:
+            # Outro request criou um dos usuários no meio do caminho:
+            # insere linha a linha para isolar os conflitos
+            db.rollback()
+
+        for (line_no, _), row_values in zip(accepted, values):
+            try:
+                db.execute(insert(User), [dict(row_values, username_seq=next_username_seq(db))])
+                db.commit()
+                result.created += 1
+                username_filter.add(row_values["username"])
+            except IntegrityError:
+                db.rollback()
+                UserImportService._fail(result, line_no, "Email or username already exists")
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, Enum
+from sqlalchemy import DDL, Column, Integer, String, Boolean, Enum, DateTime, ForeignKey, event
 from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
 from enum import Enum as PyEnum
 from core.database import Base
 
@@ -20,6 +21,52 @@ class User(Base):
     full_name = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
     role = Column(Enum(UserRole), default=UserRole.USER)
+    # Incrementada a cada revogação dos tokens stateless (claim ver)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Número da última criação/renomeação (UsernameSequence), lido pelo
+    # filtro de usernames do login
+    username_seq = Column(Integer, nullable=False, default=0, server_default="0", index=True)
     
     # Relacionamento many-to-many com Company
-    companies = relationship("Company", secondary="user_companies", back_populates="users")
\ No newline at end of file
+    companies = relationship("Company", secondary="user_companies", back_populates="users")
+
+
+class RefreshToken(Base):
+    """Refresh token opaco; apenas o sha256 do token é armazenado.
+
+    Tokens de uma mesma cadeia de rotação compartilham ``family_id``: o reuso
+    de um token já rotacionado revoga a família inteira.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    family_id = Column(String, nullable=False, index=True)
+    token_hash = Column(String, unique=True, index=True, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+
+    user = relationship("User")
+
+
+class UsernameSequence(Base):
+    """Contador das alterações de username (criações e renomeações).
+
+    Cada alteração incrementa ``value`` na mesma transação, logo antes do
+    commit, e grava o número em ``users.username_seq``. O lock da linha vai
+    até o commit, então os números ficam visíveis na ordem em que foram
+    gerados: quem já leu até N não perde alterações abaixo de N.
+    """
+    __tablename__ = "username_sequence"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False)
+
+
+# Linha única do contador (nas migrations, inserida pela revisão 0005)
+event.listen(
+    UsernameSequence.__table__,
+    "after_create",
+    DDL("INSERT INTO username_sequence (id, value) VALUES (1, 0)")
+)
@@ -1,43 +1,50 @@
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
-from core.database import get_db
-from core.security import create_access_token, get_current_active_user, require_role
+from core.database import DbSession, get_db, get_read_db, run_db
+from core.security import Principal, create_user_access_token, get_current_active_user, require_role
 from core.config import settings
-from apps.auth.models import User, UserRole
+from core.pagination import NEXT_CURSOR_HEADER
+from core.ratelimit import client_ip, login_rate_limiter
+from apps.auth.models import UserRole
 from apps.auth.schemas import (
     UserCreate,
     UserResponse,
     UserUpdate,
     LoginRequest,
-    Token
+    RefreshRequest,
+    Token,
+    UserImportResult
 )
-from apps.auth.services import UserService
+from apps.auth.imports import IMPORT_FORMATS, UserImportService, parse_import_stream
+from apps.auth.services import RefreshTokenService, UserService
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: DbSession = Depends(get_db)):
     """Registra um novo usuário"""
-    return UserService.create_user(db, user, role=UserRole.USER)
+    return await UserService.create_user_async(db, user, role=UserRole.USER)
 
 
 @router.post("/register/admin", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register_admin(
     user: UserCreate,
-    db: Session = Depends(get_db),
-    _: User = Depends(require_role(UserRole.ADMIN))
+    db: DbSession = Depends(get_db),
+    _: Principal = Depends(require_role(UserRole.ADMIN))
 ):
     """Registra um novo usuário admin (apenas admins podem criar)"""
-    return UserService.create_user(db, user, role=UserRole.ADMIN)
+    return await UserService.create_user_async(db, user, role=UserRole.ADMIN)
 
 
 @router.post("/login", response_model=Token)
-async def login(credentials: LoginRequest, db: Session = Depends(get_db)):
+async def login(credentials: LoginRequest, request: Request, db: DbSession = Depends(get_db)):
     """Login e geração de token"""
-    user = UserService.authenticate_user(db, credentials.username, credentials.password)
+    # Rejeita tentativas acima do limite antes de qualquer hashing
+    await login_rate_limiter.check_async(credentials.username, client_ip(request))
+    user = await UserService.authenticate_user_async(db, credentials.username, credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -51,38 +58,92 @@ async def login(credentials: LoginRequest, db: Session = Depends(get_db)):
         )
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.id}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    access_token = create_user_access_token(user, expires_delta=access_token_expires)
+    refresh_token = await run_db(db, RefreshTokenService.issue, user.id)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(payload: RefreshRequest, db: DbSession = Depends(get_db)):
+    """Troca um refresh token (rotacionado a cada uso) por um novo access token"""
+    access_token, refresh_token = await run_db(db, RefreshTokenService.refresh, payload.refresh_token)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
+async def get_current_user_info(
+    db: DbSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
     """Obtém informações do usuário atual"""
-    return current_user
+    user = await run_db(db, UserService.get_user_by_id, current_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
 
 
 @router.get("/users", response_model=list[UserResponse])
 async def get_all_users(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    _: User = Depends(require_role(UserRole.ADMIN))
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    role: Optional[UserRole] = None,
+    is_active: Optional[bool] = None,
+    skip: Optional[int] = Query(None, ge=0),
+    db: DbSession = Depends(get_read_db),
+    _: Principal = Depends(require_role(UserRole.ADMIN))
 ):
-    """Lista todos os usuários (apenas admin)"""
-    users = UserService.get_all_users(db, skip=skip, limit=limit)
+    """Lista todos os usuários (apenas admin).
+
+    Paginação por cursor: o cursor da próxima página vem no header
+    X-Next-Cursor. ``skip`` mantém a paginação por offset (legado).
+    """
+    if skip is not None and cursor is None:
+        return await run_db(
+            db, UserService.get_all_users, skip=skip, limit=limit, role=role, is_active=is_active
+        )
+    
+    users, next_cursor = await run_db(
+        db, UserService.get_users_page, cursor=cursor, limit=limit, role=role, is_active=is_active
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return users
 
 
+@router.post("/users/import", response_model=UserImportResult)
+async def import_users(
+    request: Request,
+    db: DbSession = Depends(get_db),
+    _: Principal = Depends(require_role(UserRole.ADMIN))
+):
+    """Importa usuários em massa a partir de JSON Lines ou CSV (apenas admin).
+
+    O corpo é lido em streaming; erros são reportados por linha sem abortar
+    a importação.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = IMPORT_FORMATS.get(content_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported import format. Use one of: {', '.join(IMPORT_FORMATS)}"
+        )
+    rows = parse_import_stream(request.stream(), fmt)
+    return await UserImportService.import_users(db, rows)
+
+
 @router.get("/users/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    _: User = Depends(require_role(UserRole.ADMIN))
+    db: DbSession = Depends(get_read_db),
+    _: Principal = Depends(require_role(UserRole.ADMIN))
 ):
     """Obtém um usuário por ID (apenas admin)"""
-    user = UserService.get_user_by_id(db, user_id)
+    user = await run_db(db, UserService.get_user_by_id, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -95,18 +156,18 @@ async def get_user(
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
-    _: User = Depends(require_role(UserRole.ADMIN))
+    db: DbSession = Depends(get_db),
+    _: Principal = Depends(require_role(UserRole.ADMIN))
 ):
     """Atualiza um usuário (apenas admin)"""
-    return UserService.update_user(db, user_id, user_update)
+    return await UserService.update_user_async(db, user_id, user_update)
 
 
 @router.put("/me", response_model=UserResponse)
 async def update_current_user(
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: DbSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Atualiza o próprio usuário"""
     # Usuários não podem mudar sua própria role - remove do update
@@ -114,16 +175,16 @@ async def update_current_user(
     if "role" in update_dict:
         del update_dict["role"]
     user_update = UserUpdate(**update_dict)
-    return UserService.update_user(db, current_user.id, user_update)
+    return await UserService.update_user_async(db, current_user.id, user_update)
 
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    _: User = Depends(require_role(UserRole.ADMIN))
+    db: DbSession = Depends(get_db),
+    _: Principal = Depends(require_role(UserRole.ADMIN))
 ):
     """Deleta um usuário (apenas admin)"""
-    UserService.delete_user(db, user_id)
+    await run_db(db, UserService.delete_user, user_id)
     return None
 
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from apps.auth.models import UserRole
 
 
@@ -34,6 +34,11 @@ class UserResponse(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -42,4 +47,19 @@ class TokenData(BaseModel):
 
 class LoginRequest(BaseModel):
     username: str
-    password: str
\ No newline at end of file
+    password: str
+
+
+class UserImportRow(UserCreate):
+    role: UserRole = UserRole.USER
+
+
+class UserImportError(BaseModel):
+    row: int
+    error: str
+
+
+class UserImportResult(BaseModel):
+    created: int = 0
+    failed: int = 0
+    errors: List[UserImportError] = []
@@ -1,31 +1,90 @@
-from sqlalchemy.orm import Session
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
 from fastapi import HTTPException, status
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from apps.auth.models import User, UserRole
+from apps.auth.models import RefreshToken, User, UserRole
 from apps.auth.schemas import UserCreate, UserUpdate
-from core.security import get_password_hash, verify_password
+from apps.auth.usernames import next_username_seq, username_filter
+from core.config import settings
+from core.database import DbSession, run_db
+from core.security import (
+    create_user_access_token,
+    get_password_hash,
+    get_password_hash_async,
+    password_needs_rehash,
+    verify_password,
+    principal_cache,
+    verify_dummy_password,
+    verify_dummy_password_async,
+    verify_password_async
+)
+from core.pagination import decode_cursor, encode_cursor, invalid_cursor
+from core.revocation import token_versions
+
+# Campos que, ao mudar, invalidam os tokens stateless já emitidos
+TOKEN_REVOKING_FIELDS = {"username", "role", "is_active", "hashed_password"}
+
+
+def _revokes_refresh_tokens(update_data: dict) -> bool:
+    """Troca de senha ou desativação encerram as sessões (refresh tokens)"""
+    return "hashed_password" in update_data or update_data.get("is_active") is False
+
+
+def _revoke_user_refresh_tokens(user_id: int):
+    return (
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+    )
+
+
+def _rename_in_filter(old_username: str, update_data: dict) -> None:
+    new_username = update_data.get("username", old_username)
+    if new_username != old_username:
+        username_filter.add(new_username)
+        username_filter.discard(old_username)
+
+
+# Índice único de users -> coluna e mensagem de erro da API
+UNIQUE_USER_INDEXES = {
+    "ix_users_email": ("email", "Email already registered"),
+    "ix_users_username": ("username", "Username already taken"),
+}
+
+
+def _unique_violation(exc: IntegrityError) -> HTTPException:
+    """Converte a violação dos índices únicos de users no erro 400 da API.
+
+    Identifica o índice pelo nome da constraint (Postgres) ou pela coluna
+    (SQLite: ``UNIQUE constraint failed: users.email``), nunca pelos valores
+    duplicados, que aparecem no DETAIL da mensagem do Postgres.
+    """
+    constraint = getattr(getattr(exc.orig, "diag", None), "constraint_name", None)
+    # Só a primeira linha: o DETAIL do Postgres traz os valores informados
+    message = (str(exc.orig).splitlines() or [""])[0].lower()
+    for index_name, (column, detail) in UNIQUE_USER_INDEXES.items():
+        if constraint == index_name or (
+            constraint is None and (f'"{index_name}"' in message or f"users.{column}" in message)
+        ):
+            return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+    raise exc
 
 
 class UserService:
     @staticmethod
-    def create_user(db: Session, user: UserCreate, role: UserRole = UserRole.USER) -> User:
-        """Cria um novo usuário"""
-        # Verifica se email já existe
-        if db.query(User).filter(User.email == user.email).first():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-        
-        # Verifica se username já existe
-        if db.query(User).filter(User.username == user.username).first():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already taken"
-            )
-        
-        hashed_password = get_password_hash(user.password)
+    def _insert_user(db: Session, user: UserCreate, role: UserRole, hashed_password: str) -> User:
+        """Persiste um usuário com a senha já hasheada.
+
+        A unicidade de email/username é garantida pelos índices únicos:
+        um único INSERT, sem SELECTs prévios.
+        """
         db_user = User(
             email=user.email,
             username=user.username,
@@ -34,10 +93,28 @@ class UserService:
             role=role
         )
         db.add(db_user)
-        db.commit()
+        db_user.username_seq = next_username_seq(db)
+        try:
+            db.commit()
+        except IntegrityError as exc:
+            db.rollback()
+            raise _unique_violation(exc)
         db.refresh(db_user)
+        username_filter.add(db_user.username)
         return db_user
     
+    @staticmethod
+    def create_user(db: Session, user: UserCreate, role: UserRole = UserRole.USER) -> User:
+        """Cria um novo usuário"""
+        hashed_password = get_password_hash(user.password)
+        return UserService._insert_user(db, user, role, hashed_password)
+    
+    @staticmethod
+    async def create_user_async(db: DbSession, user: UserCreate, role: UserRole = UserRole.USER) -> User:
+        """Cria um novo usuário, gerando o hash no pool de hashing"""
+        hashed_password = await get_password_hash_async(user.password)
+        return await run_db(db, UserService._insert_user, user, role, hashed_password)
+    
     @staticmethod
     def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
         """Obtém usuário por ID"""
@@ -54,13 +131,53 @@ class UserService:
         return db.query(User).filter(User.username == username).first()
     
     @staticmethod
-    def get_all_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
-        """Lista todos os usuários"""
-        return db.query(User).offset(skip).limit(limit).all()
+    def _filter_users(query, role: Optional[UserRole] = None, is_active: Optional[bool] = None):
+        if role is not None:
+            query = query.filter(User.role == role)
+        if is_active is not None:
+            query = query.filter(User.is_active == is_active)
+        return query
     
     @staticmethod
-    def update_user(db: Session, user_id: int, user_update: UserUpdate) -> User:
-        """Atualiza um usuário"""
+    def get_all_users(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        role: Optional[UserRole] = None,
+        is_active: Optional[bool] = None
+    ) -> List[User]:
+        """Lista todos os usuários (paginação por offset, legado)"""
+        query = UserService._filter_users(db.query(User), role, is_active)
+        return query.order_by(User.id).offset(skip).limit(limit).all()
+    
+    @staticmethod
+    def get_users_page(
+        db: Session,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        role: Optional[UserRole] = None,
+        is_active: Optional[bool] = None
+    ) -> Tuple[List[User], Optional[str]]:
+        """Lista usuários por keyset (users.id), retornando o próximo cursor"""
+        query = UserService._filter_users(db.query(User), role, is_active)
+        position = decode_cursor(cursor)
+        if position is not None:
+            try:
+                last_id = int(position["id"])
+            except (KeyError, TypeError, ValueError):
+                raise invalid_cursor()
+            query = query.filter(User.id > last_id)
+        
+        # Busca uma linha a mais para saber se existe próxima página
+        users = query.order_by(User.id).limit(limit + 1).all()
+        if len(users) <= limit:
+            return users, None
+        users = users[:limit]
+        return users, encode_cursor({"id": users[-1].id})
+    
+    @staticmethod
+    def _prepare_update(db: Session, user_id: int, user_update: UserUpdate) -> Tuple[User, dict]:
+        """Carrega o usuário e extrai os dados de atualização"""
         db_user = db.query(User).filter(User.id == user_id).first()
         if not db_user:
             raise HTTPException(
@@ -68,34 +185,55 @@ class UserService:
                 detail="User not found"
             )
         
-        update_data = user_update.model_dump(exclude_unset=True)
-        
-        # Se está atualizando email, verifica se já existe
-        if "email" in update_data and update_data["email"] != db_user.email:
-            if db.query(User).filter(User.email == update_data["email"]).first():
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Email already registered"
-                )
+        return db_user, user_update.model_dump(exclude_unset=True)
+    
+    @staticmethod
+    def _apply_update(db: Session, db_user: User, update_data: dict) -> User:
+        """Aplica e persiste os dados de atualização"""
+        old_username = db_user.username
+        for key, value in update_data.items():
+            setattr(db_user, key, value)
+        if _revokes_refresh_tokens(update_data):
+            db.execute(_revoke_user_refresh_tokens(db_user.id))
+        if TOKEN_REVOKING_FIELDS.intersection(update_data):
+            # Incremento atômico no banco, visto por todos os workers
+            db_user.token_version = User.token_version + 1
+        if db_user.username != old_username:
+            # Por último: o contador fica bloqueado só até o commit
+            db_user.username_seq = next_username_seq(db)
         
-        # Se está atualizando username, verifica se já existe
-        if "username" in update_data and update_data["username"] != db_user.username:
-            if db.query(User).filter(User.username == update_data["username"]).first():
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Username already taken"
-                )
+        # Email/username duplicados são detectados pelos índices únicos
+        try:
+            db.commit()
+        except IntegrityError as exc:
+            db.rollback()
+            raise _unique_violation(exc)
+        principal_cache.invalidate(db_user.id)
+        token_versions.invalidate(db_user.id)
+        _rename_in_filter(old_username, update_data)
+        db.refresh(db_user)
+        return db_user
+    
+    @staticmethod
+    def update_user(db: Session, user_id: int, user_update: UserUpdate) -> User:
+        """Atualiza um usuário"""
+        db_user, update_data = UserService._prepare_update(db, user_id, user_update)
         
         # Se está atualizando senha, faz hash
         if "password" in update_data:
             update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
         
-        for key, value in update_data.items():
-            setattr(db_user, key, value)
+        return UserService._apply_update(db, db_user, update_data)
+    
+    @staticmethod
+    async def update_user_async(db: DbSession, user_id: int, user_update: UserUpdate) -> User:
+        """Atualiza um usuário, gerando o hash da nova senha no pool de hashing"""
+        db_user, update_data = await run_db(db, UserService._prepare_update, user_id, user_update)
         
-        db.commit()
-        db.refresh(db_user)
-        return db_user
+        if "password" in update_data:
+            update_data["hashed_password"] = await get_password_hash_async(update_data.pop("password"))
+        
+        return await run_db(db, UserService._apply_update, db_user, update_data)
     
     @staticmethod
     def delete_user(db: Session, user_id: int) -> bool:
@@ -106,17 +244,139 @@ class UserService:
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
+        username = db_user.username
         db.delete(db_user)
         db.commit()
+        username_filter.discard(username)
+        principal_cache.invalidate(user_id)
+        token_versions.invalidate(user_id)
         return True
     
     @staticmethod
     def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
-        """Autentica um usuário"""
-        user = UserService.get_user_by_username(db, username)
+        """Autentica um usuário.
+
+        Usernames inexistentes custam o mesmo que uma senha errada: o hash é
+        verificado contra um hash de referência. O bloom filter evita o
+        SELECT para usernames que certamente não existem.
+        """
+        user = None
+        if username_filter.might_exist(db, username):
+            user = UserService.get_user_by_username(db, username)
         if not user:
+            verify_dummy_password(password)
             return None
         if not verify_password(password, user.hashed_password):
             return None
+        # Atualiza hashes gerados com esquema/custo antigos (mesma senha:
+        # não revoga tokens nem sessões)
+        if password_needs_rehash(user.hashed_password):
+            UserService._store_rehash(db, user, get_password_hash(password))
         return user
+    
+    @staticmethod
+    async def authenticate_user_async(db: DbSession, username: str, password: str) -> Optional[User]:
+        """Autentica um usuário, verificando a senha no pool de hashing"""
+        user = None
+        if await username_filter.might_exist_async(db, username):
+            user = await run_db(db, UserService.get_user_by_username, username)
+        if not user:
+            await verify_dummy_password_async(password)
+            return None
+        if not await verify_password_async(password, user.hashed_password):
+            return None
+        if password_needs_rehash(user.hashed_password):
+            await run_db(db, UserService._store_rehash, user, await get_password_hash_async(password))
+        return user
+    
+    @staticmethod
+    def _store_rehash(db: Session, user: User, hashed_password: str) -> None:
+        user.hashed_password = hashed_password
+        db.commit()
+
+
+def _hash_refresh_token(token: str) -> str:
+    # Tokens aleatórios de 256 bits: sha256 basta, sem custo de bcrypt
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _invalid_refresh_token(detail: str = "Invalid refresh token") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+class RefreshTokenService:
+    @staticmethod
+    def issue(db: Session, user_id: int, family_id: Optional[str] = None) -> str:
+        """Emite um refresh token; apenas o hash é persistido"""
+        token = secrets.token_urlsafe(32)
+        now = datetime.now(timezone.utc)
+        db.add(RefreshToken(
+            user_id=user_id,
+            family_id=family_id or uuid.uuid4().hex,
+            token_hash=_hash_refresh_token(token),
+            created_at=now,
+            expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        ))
+        db.commit()
+        return token
+
+    @staticmethod
+    def revoke_family(db: Session, family_id: str) -> None:
+        """Revoga todos os tokens ainda ativos de uma família"""
+        db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc))
+        )
+        db.commit()
+
+    @staticmethod
+    def refresh(db: Session, token: str) -> Tuple[str, str]:
+        """Rotaciona o refresh token e emite um novo access token.
+
+        Custa um SELECT (token + usuário) e duas escritas, sem bcrypt.
+        Apresentar um token já rotacionado revoga a família inteira.
+        """
+        db_token = (
+            db.query(RefreshToken)
+            .options(joinedload(RefreshToken.user))
+            .filter(RefreshToken.token_hash == _hash_refresh_token(token))
+            .first()
+        )
+        if db_token is None:
+            raise _invalid_refresh_token()
+
+        now = datetime.now(timezone.utc)
+        # Consome o token de forma atômica: em requests concorrentes só um vence
+        consumed = db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == db_token.id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not consumed:
+            RefreshTokenService.revoke_family(db, db_token.family_id)
+            raise _invalid_refresh_token("Refresh token revoked")
+
+        user = db_token.user
+        expires_at = db_token.expires_at
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at <= now or user is None:
+            db.commit()
+            raise _invalid_refresh_token()
+        if not user.is_active:
+            db.commit()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Inactive user"
+            )
 
+        # Gera o access token antes do commit, enquanto o usuário está carregado
+        access_token = create_user_access_token(user)
+        new_token = RefreshTokenService.issue(db, user.id, family_id=db_token.family_id)
+        return access_token, new_token
@@ -0,0 +1,293 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from apps.auth.models import User, UsernameSequence
+from core.bloom import BloomFilter
+from core.config import settings
+from core.database import DbSession
+
+logger = logging.getLogger(__name__)
+
+# Linhas lidas por vez ao (re)carregar o filtro
+SYNC_BATCH_SIZE = 10000
+
+_username_sequence = UsernameSequence.__table__
+
+
+def next_username_seq(db: Session) -> int:
+    """Reserva o número da próxima criação/renomeação de username.
+
+    Chamar na transação da escrita, logo antes do commit: a linha do
+    contador fica bloqueada até o commit (ou rollback), o que ordena a
+    visibilidade dos números entre os workers.
+    """
+    return db.execute(
+        update(_username_sequence)
+        .where(_username_sequence.c.id == 1)
+        .values(value=_username_sequence.c.value + 1)
+        .returning(_username_sequence.c.value)
+    ).scalar_one()
+
+
+def _read_changes(db: Session, after_seq: int):
+    """(username, username_seq) das criações/renomeações acima de ``after_seq``"""
+    return db.execute(
+        select(User.username, User.username_seq).where(User.username_seq > after_seq)
+    ).all()
+
+
+class UsernameFilter:
+    """Cache negativo de usernames (bloom filter) para o login.
+
+    Um username ausente do filtro certamente não existe, e o login é
+    rejeitado sem consultar a tabela users. Criações e renomeações, em
+    qualquer worker, recebem um número crescente (``users.username_seq``) e
+    o filtro lê só as linhas acima do último número lido. Essa leitura é
+    compartilhada: um negativo só dispara uma nova leitura se a última
+    começou há mais de ``catch_up_interval`` segundos. Um usuário criado ou
+    renomeado em outro worker é reconhecido em até esse intervalo, e um pico
+    de usernames inexistentes custa no máximo uma query por intervalo.
+
+    A carga completa e as reconstruções rodam na thread de fundo iniciada por
+    ``start``, a cada ``sync_interval`` segundos; até a primeira carga, todo
+    username segue para o SELECT. Bloom filters não removem itens:
+    deleções/renomeações só são contadas, e o filtro é reconstruído quando os
+    itens obsoletos passam de ``max_stale_ratio``, quando a capacidade estoura
+    ou a cada ``rebuild_interval`` segundos.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        sync_interval: float,
+        rebuild_interval: float,
+        catch_up_interval: float = 1.0,
+        max_stale_ratio: float = 0.2,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.catch_up_interval = catch_up_interval
+        self.max_stale_ratio = max_stale_ratio
+        self.enabled = enabled
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._bloom: Optional[BloomFilter] = None
+        self._last_seq = 0
+        self._caught_up_at: Optional[float] = None
+        self._built_at = 0.0
+        self._stale = 0
+        self._catch_ups = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.rebuilds = 0
+        self.negatives = 0
+
+    def _needs_rebuild(self) -> bool:
+        bloom = self._bloom
+        return (
+            bloom is None
+            or self._clock() - self._built_at >= self.rebuild_interval
+            or bloom.count > bloom.capacity
+            or self._stale > bloom.count * self.max_stale_ratio
+        )
+
+    def _is_fresh(self, max_age: float) -> bool:
+        caught_up_at = self._caught_up_at
+        return caught_up_at is not None and self._clock() - caught_up_at < max_age
+
+    def _apply_changes(self, db: Session) -> None:
+        """Adiciona os usernames com número acima do último lido (com o lock)"""
+        self._add_changes(_read_changes(db, self._last_seq))
+
+    def _add_changes(self, rows) -> None:
+        for username, seq in rows:
+            # Criações deste processo já entraram pelo add
+            if username not in self._bloom:
+                self._bloom.add(username)
+            self._last_seq = max(self._last_seq, seq)
+
+    def rebuild(self, db: Session) -> None:
+        """Carrega o filtro do zero e o troca pelo atual"""
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        built_at = self._clock()
+        # Lido antes da carga: alterações commitadas durante a leitura completa
+        # têm número maior e entram pela leitura incremental logo após a troca
+        start_seq = db.execute(
+            select(_username_sequence.c.value).where(_username_sequence.c.id == 1)
+        ).scalar_one()
+        last_id = 0
+        # Leitura completa fora do lock: negativos continuam usando o filtro atual
+        while True:
+            rows = db.execute(
+                select(User.id, User.username)
+                .where(User.id > last_id)
+                .order_by(User.id)
+                .limit(SYNC_BATCH_SIZE)
+            ).all()
+            for _, username in rows:
+                bloom.add(username)
+            if rows:
+                last_id = rows[-1][0]
+            if len(rows) < SYNC_BATCH_SIZE:
+                break
+        with self._lock:
+            self._bloom = bloom
+            self._last_seq = start_seq
+            self._built_at = built_at
+            self._stale = 0
+            self.rebuilds += 1
+            self._caught_up_at = self._clock()
+            self._apply_changes(db)
+
+    def catch_up(self, db: Session, max_age: float = 0.0) -> None:
+        """Lê as criações e renomeações commitadas desde a última leitura.
+
+        Não faz nada se a última leitura começou há menos de ``max_age``
+        segundos (inclusive uma ainda em andamento em outra thread).
+        """
+        if self._is_fresh(max_age):
+            return
+        with self._lock:
+            if self._bloom is None or self._is_fresh(max_age):
+                return
+            self._caught_up_at = self._clock()
+            self._catch_ups += 1
+            self._apply_changes(db)
+
+    def refresh(self, db: Session) -> None:
+        """Reconstrói o filtro se necessário, senão lê apenas as alterações"""
+        if self._needs_rebuild():
+            self.rebuild(db)
+        else:
+            self.catch_up(db)
+
+    def _maybe_present(self, username: str) -> bool:
+        bloom = self._bloom
+        return not self.enabled or bloom is None or username in bloom
+
+    def _confirm_negative(self, username: str) -> bool:
+        bloom = self._bloom
+        if bloom is None or username in bloom:
+            return True
+        with self._lock:
+            self.negatives += 1
+        return False
+
+    def might_exist(self, db: Session, username: str) -> bool:
+        """False apenas se o username não existia até a última leitura"""
+        if self._maybe_present(username):
+            return True
+        self.catch_up(db, self.catch_up_interval)
+        return self._confirm_negative(username)
+
+    async def _catch_up_async(self, db: AsyncSession, max_age: float) -> None:
+        """Como ``catch_up``, com a query fora do lock.
+
+        A query cede o event loop: segurar o lock durante ela travaria as
+        outras corrotinas da thread. Negativos que chegam durante a leitura
+        usam o filtro atual.
+        """
+        with self._lock:
+            if self._bloom is None or self._is_fresh(max_age):
+                return
+            self._caught_up_at = self._clock()
+            self._catch_ups += 1
+            after_seq = self._last_seq
+        rows = await db.run_sync(_read_changes, after_seq)
+        with self._lock:
+            # clear() pode ter descartado o filtro durante a leitura
+            if self._bloom is not None:
+                self._add_changes(rows)
+
+    async def might_exist_async(self, db: DbSession, username: str) -> bool:
+        """Como ``might_exist``, com a leitura do banco fora do event loop"""
+        if self._maybe_present(username):
+            return True
+        if not self._is_fresh(self.catch_up_interval):
+            if isinstance(db, AsyncSession):
+                await self._catch_up_async(db, self.catch_up_interval)
+            else:
+                await run_in_threadpool(self.catch_up, db, self.catch_up_interval)
+        return self._confirm_negative(username)
+
+    def add(self, username: str) -> None:
+        """Registra um username criado ou renomeado neste processo"""
+        bloom = self._bloom
+        if bloom is not None:
+            bloom.add(username)
+
+    def discard(self, username: str) -> None:
+        """Registra um username deletado ou renomeado (item obsoleto)"""
+        with self._lock:
+            self._stale += 1
+
+    def _run(self, session_factory: Callable[[], Session]) -> None:
+        while True:
+            if self.enabled:
+                try:
+                    with session_factory() as db:
+                        self.refresh(db)
+                except Exception as exc:
+                    logger.warning("Failed to refresh username filter: %s", exc)
+            if self._stop.wait(self.sync_interval):
+                return
+
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        """Carrega e mantém o filtro em uma thread de fundo"""
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(session_factory,), name="username-filter", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bloom = None
+            self._last_seq = 0
+            self._caught_up_at = None
+            self._built_at = 0.0
+            self._stale = 0
+            self._catch_ups = 0
+            self.rebuilds = self.negatives = 0
+
+    def stats(self) -> dict:
+        """Estado do filtro e logins rejeitados por ele"""
+        bloom = self._bloom
+        return {
+            "loaded": bloom is not None,
+            "items": bloom.count if bloom is not None else 0,
+            "capacity": self.capacity,
+            "stale": self._stale,
+            "last_seq": self._last_seq,
+            "catch_ups": self._catch_ups,
+            "rebuilds": self.rebuilds,
+            "negatives": self.negatives,
+        }
+
+
+username_filter = UsernameFilter(
+    capacity=settings.USERNAME_FILTER_CAPACITY,
+    error_rate=settings.USERNAME_FILTER_ERROR_RATE,
+    sync_interval=settings.USERNAME_FILTER_SYNC_SECONDS,
+    rebuild_interval=settings.USERNAME_FILTER_REBUILD_SECONDS,
+    catch_up_interval=settings.USERNAME_FILTER_CATCH_UP_SECONDS,
+    enabled=settings.USERNAME_FILTER_ENABLED,
+)
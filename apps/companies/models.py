@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Table, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Table, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from core.database import Base
@@ -13,7 +13,10 @@ user_companies = Table(
     'user_companies',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
-    Column('company_id', Integer, ForeignKey('companies.id'), primary_key=True)
+    Column('company_id', Integer, ForeignKey('companies.id'), primary_key=True),
+    # A PK (user_id, company_id) cobre as buscas por usuário; este índice
+    # cobre as buscas por company (membros, checagem de membership)
+    Index('ix_user_companies_company_id_user_id', 'company_id', 'user_id')
 )
 
 
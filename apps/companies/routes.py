@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from fastapi import APIRouter, Depends, Query, Response, status
+from typing import List, Literal, Optional
 
-from core.database import get_db
-from core.security import get_current_active_user, require_role
-from apps.auth.models import User, UserRole
+from core.database import DbSession, get_db, get_read_db, run_db
+from core.pagination import NEXT_CURSOR_HEADER
+from core.security import Principal, get_current_active_user, require_role
+from apps.auth.models import UserRole
+from apps.auth.schemas import UserResponse
 from apps.companies.schemas import (
     CompanyCreate,
     CompanyUpdate,
     CompanyResponse,
     CompanyAddUser,
-    CompanyWithUsersResponse
+    CompanyBatchMembershipResponse,
+    CompanyBatchUsers,
+    CompanyMembershipResponse
 )
 from apps.companies.services import CompanyService
 
@@ -20,127 +23,155 @@ router = APIRouter()
 @router.post("/companies", response_model=CompanyResponse, status_code=status.HTTP_201_CREATED)
 async def create_company(
     company: CompanyCreate,
-    db: Session = Depends(get_db),
-    _: User = Depends(require_role(UserRole.ADMIN))
+    db: DbSession = Depends(get_db),
+    _: Principal = Depends(require_role(UserRole.ADMIN))
 ):
     """Cria uma nova company e associa a um usuário (apenas admin)"""
-    return CompanyService.create_company(db, company)
+    return await run_db(db, CompanyService.create_company, company)
 
 
 @router.get("/companies", response_model=List[CompanyResponse])
 async def get_my_companies(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    sort: Literal["name", "created_at"] = "name",
+    order: Literal["asc", "desc"] = "asc",
+    name_prefix: Optional[str] = None,
+    db: DbSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
-    """Lista todas as companies do usuário atual"""
-    companies = CompanyService.get_user_companies(db, current_user.id)
+    """Lista as companies do usuário atual.
+
+    Paginação por cursor (header X-Next-Cursor), ordenação por ``name`` ou
+    ``created_at`` e filtro por prefixo do nome.
+    """
+    companies, next_cursor = await run_db(
+        db,
+        CompanyService.get_user_companies_page,
+        current_user.id,
+        cursor=cursor,
+        limit=limit,
+        sort=sort,
+        descending=order == "desc",
+        name_prefix=name_prefix
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return companies
 
 
 @router.get("/companies/{company_id}", response_model=CompanyResponse)
 async def get_company(
     company_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: DbSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Obtém uma company por ID (apenas se o usuário for membro)"""
-    company = CompanyService.get_company_by_id(db, company_id)
-    if not company:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Company not found"
-        )
-    
-    # Verifica se o usuário é membro
-    if not CompanyService.is_user_member(db, company_id, current_user.id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this company"
-        )
-    
-    return company
+    access = await run_db(db, CompanyService.load_company_access, company_id, member_id=current_user.id)
+    return access.company
 
 
 @router.put("/companies/{company_id}", response_model=CompanyResponse)
 async def update_company(
     company_id: int,
     company_update: CompanyUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: DbSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Atualiza uma company (apenas se o usuário for membro)"""
-    # Verifica se a company existe
-    company = CompanyService.get_company_by_id(db, company_id)
-    if not company:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Company not found"
-        )
-    
-    # Verifica se o usuário é membro
-    if not CompanyService.is_user_member(db, company_id, current_user.id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this company"
-        )
-    
-    return CompanyService.update_company(db, company_id, company_update)
-
-
-@router.post("/companies/{company_id}/users", response_model=CompanyWithUsersResponse)
+    access = await run_db(db, CompanyService.load_company_access, company_id, member_id=current_user.id)
+    return await run_db(db, CompanyService.apply_company_update, access.company, company_update)
+
+
+@router.get("/companies/{company_id}/users", response_model=List[UserResponse])
+async def get_company_members(
+    company_id: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    search: Optional[str] = None,
+    db: DbSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Lista os membros de uma company (apenas se o usuário for membro).
+
+    Paginação por cursor (header X-Next-Cursor) e busca por prefixo de
+    username ou email.
+    """
+    await run_db(db, CompanyService.load_company_access, company_id, member_id=current_user.id)
+    users, next_cursor = await run_db(
+        db, CompanyService.get_company_members_page, company_id, cursor=cursor, limit=limit, search=search
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return users
+
+
+@router.post("/companies/{company_id}/users", response_model=CompanyMembershipResponse)
 async def add_user_to_company(
     company_id: int,
     user_data: CompanyAddUser,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: DbSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Adiciona um usuário a uma company (apenas se o usuário atual for membro)"""
-    # Verifica se a company existe
-    company = CompanyService.get_company_by_id(db, company_id)
-    if not company:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Company not found"
-        )
-    
-    # Verifica se o usuário atual é membro
-    if not CompanyService.is_user_member(db, company_id, current_user.id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this company"
-        )
-    
-    company = CompanyService.add_user_to_company(db, company_id, user_data.user_id)
-    # Força o carregamento dos usuários
-    _ = company.users  # Acessa para forçar o carregamento
-    return company
-
-
-@router.delete("/companies/{company_id}/users/{user_id}", response_model=CompanyWithUsersResponse)
+    access = await run_db(
+        db, CompanyService.load_company_access, company_id,
+        member_id=current_user.id, target_user_id=user_data.user_id
+    )
+    await run_db(db, CompanyService.add_member, access)
+    return CompanyMembershipResponse(
+        company_id=company_id,
+        user_id=user_data.user_id,
+        is_member=True,
+        member_count=await run_db(db, CompanyService.count_members, company_id)
+    )
+
+
+@router.delete("/companies/{company_id}/users/{user_id}", response_model=CompanyMembershipResponse)
 async def remove_user_from_company(
     company_id: int,
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: DbSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Remove um usuário de uma company (apenas se o usuário atual for membro)"""
-    # Verifica se a company existe
-    company = CompanyService.get_company_by_id(db, company_id)
-    if not company:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Company not found"
-        )
-    
-    # Verifica se o usuário atual é membro
-    if not CompanyService.is_user_member(db, company_id, current_user.id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this company"
-        )
-    
-    company = CompanyService.remove_user_from_company(db, company_id, user_id)
-    # Força o carregamento dos usuários
-    _ = company.users  # Acessa para forçar o carregamento
-    return company
+    access = await run_db(
+        db, CompanyService.load_company_access, company_id,
+        member_id=current_user.id, target_user_id=user_id
+    )
+    await run_db(db, CompanyService.remove_member, access)
+    return CompanyMembershipResponse(
+        company_id=company_id,
+        user_id=user_id,
+        is_member=False,
+        member_count=await run_db(db, CompanyService.count_members, company_id)
+    )
+
+
+@router.post("/companies/{company_id}/users:batch", response_model=CompanyBatchMembershipResponse)
+async def add_users_to_company(
+    company_id: int,
+    batch: CompanyBatchUsers,
+    db: DbSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Adiciona vários usuários a uma company (apenas se o usuário atual for membro).
 
+    Usuários que já são membros ou inexistentes são reportados, não abortam o lote.
+    """
+    await run_db(db, CompanyService.load_company_access, company_id, member_id=current_user.id)
+    return await run_db(db, CompanyService.add_members, company_id, batch.user_ids)
+
+
+@router.post("/companies/{company_id}/users:batchRemove", response_model=CompanyBatchMembershipResponse)
+async def remove_users_from_company(
+    company_id: int,
+    batch: CompanyBatchUsers,
+    db: DbSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Remove vários usuários de uma company (apenas se o usuário atual for membro)"""
+    await run_db(db, CompanyService.load_company_access, company_id, member_id=current_user.id)
+    return await run_db(db, CompanyService.remove_members, company_id, batch.user_ids)
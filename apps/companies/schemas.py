@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from apps.auth.schemas import UserResponse
@@ -38,3 +38,23 @@ class CompanyWithUsersResponse(CompanyResponse):
     class Config:
         from_attributes = True
 
+
+class CompanyMembershipResponse(BaseModel):
+    """Resultado compacto de uma alteração de membership"""
+    company_id: int
+    user_id: int
+    is_member: bool
+    member_count: int
+
+
+class CompanyBatchUsers(BaseModel):
+    user_ids: List[int] = Field(min_length=1, max_length=10000)
+
+
+class CompanyBatchMembershipResponse(BaseModel):
+    """Resultado de uma alteração de membership em lote"""
+    company_id: int
+    applied: List[int]  # usuários adicionados/removidos
+    skipped: List[int]  # já eram membros (adição) ou não eram (remoção)
+    not_found: List[int]
+    member_count: int
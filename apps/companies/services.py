@@ -1,10 +1,63 @@
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import and_, delete, exists, func, insert, literal, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session, joinedload
 from fastapi import HTTPException, status
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from apps.companies.models import Company
+from apps.companies.models import Company, user_companies
 from apps.companies.schemas import CompanyCreate, CompanyUpdate
 from apps.auth.models import User
+from core.pagination import decode_cursor, encode_cursor, invalid_cursor, keyset_condition
+
+# Colunas aceitas na ordenação da listagem de companies
+COMPANY_SORT_COLUMNS = {
+    "name": Company.name,
+    "created_at": Company.created_at,
+}
+
+
+def _membership_exists(company_id: int, user_id: int):
+    """EXISTS sobre user_companies, resolvido pelo índice (company_id, user_id)"""
+    return exists().where(
+        user_companies.c.company_id == company_id,
+        user_companies.c.user_id == user_id
+    )
+
+
+# INSERT ... ON CONFLICT DO NOTHING por dialeto
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _insert_members(db: Session, company_id: int, user_ids: List[int]) -> List[int]:
+    """Insere as memberships, ignorando as criadas por requests concorrentes.
+
+    Retorna os IDs efetivamente inseridos.
+    """
+    rows = [{"company_id": company_id, "user_id": user_id} for user_id in user_ids]
+    dialect_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        db.execute(insert(user_companies), rows)
+        return user_ids
+    statement = (
+        dialect_insert(user_companies)
+        .on_conflict_do_nothing(index_elements=["user_id", "company_id"])
+        .returning(user_companies.c.user_id)
+    )
+    inserted = set(db.scalars(statement, rows))
+    return [user_id for user_id in user_ids if user_id in inserted]
+
+
+@dataclass
+class CompanyAccess:
+    """Company carregada e autorizada, reutilizada pelas rotas"""
+    company: Company
+    target_user: Optional[User] = None
+    target_is_member: bool = False
 
 
 class CompanyService:
@@ -41,6 +94,50 @@ class CompanyService:
             query = query.options(joinedload(Company.users))
         return query.first()
     
+    @staticmethod
+    def load_company_access(
+        db: Session,
+        company_id: int,
+        member_id: Optional[int] = None,
+        target_user_id: Optional[int] = None
+    ) -> CompanyAccess:
+        """Carrega a company e verifica membership em um único SELECT.
+
+        Se ``member_id`` for informado, exige que ele seja membro (403).
+        Se ``target_user_id`` for informado, carrega também o usuário alvo
+        (404 se não existir) e indica se ele já é membro.
+        """
+        caller_is_member = (
+            _membership_exists(company_id, member_id) if member_id is not None else literal(True)
+        )
+        target_is_member = (
+            _membership_exists(company_id, target_user_id) if target_user_id is not None else literal(False)
+        )
+        row = db.execute(
+            select(Company, caller_is_member, target_is_member).where(Company.id == company_id)
+        ).first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Company not found"
+            )
+        company, is_member, is_target_member = row
+        if not is_member:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You are not a member of this company"
+            )
+        
+        access = CompanyAccess(company=company, target_is_member=bool(is_target_member))
+        if target_user_id is not None:
+            access.target_user = db.query(User).filter(User.id == target_user_id).first()
+            if not access.target_user:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="User not found"
+                )
+        return access
+    
     @staticmethod
     def get_user_companies(db: Session, user_id: int) -> List[Company]:
         """Lista todas as companies de um usuário"""
@@ -49,13 +146,102 @@ class CompanyService:
             return []
         return user.companies
     
+    @staticmethod
+    def get_user_companies_page(
+        db: Session,
+        user_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        sort: str = "name",
+        descending: bool = False,
+        name_prefix: Optional[str] = None
+    ) -> Tuple[List[Company], Optional[str]]:
+        """Lista as companies de um usuário por keyset, via join em user_companies"""
+        sort_column = COMPANY_SORT_COLUMNS[sort]
+        query = (
+            db.query(Company)
+            .join(user_companies, user_companies.c.company_id == Company.id)
+            .filter(user_companies.c.user_id == user_id)
+        )
+        if name_prefix:
+            # Intervalo em vez de LIKE para aproveitar o índice de companies.name
+            query = query.filter(Company.name >= name_prefix, Company.name < name_prefix + "\U0010ffff")
+        
+        position = decode_cursor(cursor)
+        if position is not None:
+            try:
+                if position["s"] != sort:
+                    raise ValueError("cursor sort mismatch")
+                sort_value = position["k"]
+                if sort == "created_at":
+                    sort_value = datetime.fromisoformat(sort_value)
+                last_id = int(position["id"])
+            except (KeyError, TypeError, ValueError):
+                raise invalid_cursor()
+            query = query.filter(
+                keyset_condition(sort_column, Company.id, sort_value, last_id, descending)
+            )
+        
+        order = (sort_column.desc(), Company.id.desc()) if descending else (sort_column, Company.id)
+        companies = query.order_by(*order).limit(limit + 1).all()
+        if len(companies) <= limit:
+            return companies, None
+        companies = companies[:limit]
+        last = companies[-1]
+        sort_value = getattr(last, sort)
+        if sort == "created_at":
+            sort_value = sort_value.isoformat()
+        return companies, encode_cursor({"s": sort, "k": sort_value, "id": last.id})
+    
+    @staticmethod
+    def get_company_members_page(
+        db: Session,
+        company_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        search: Optional[str] = None
+    ) -> Tuple[List[User], Optional[str]]:
+        """Lista os membros de uma company por keyset (users.id)"""
+        query = (
+            db.query(User)
+            .join(user_companies, user_companies.c.user_id == User.id)
+            .filter(user_companies.c.company_id == company_id)
+        )
+        if search:
+            # Prefixo de username ou email, resolvido pelos índices únicos
+            upper_bound = search + "\U0010ffff"
+            query = query.filter(or_(
+                and_(User.username >= search, User.username < upper_bound),
+                and_(User.email >= search, User.email < upper_bound)
+            ))
+        
+        position = decode_cursor(cursor)
+        if position is not None:
+            try:
+                last_id = int(position["id"])
+            except (KeyError, TypeError, ValueError):
+                raise invalid_cursor()
+            query = query.filter(User.id > last_id)
+        
+        users = query.order_by(User.id).limit(limit + 1).all()
+        if len(users) <= limit:
+            return users, None
+        users = users[:limit]
+        return users, encode_cursor({"id": users[-1].id})
+    
+    @staticmethod
+    def count_members(db: Session, company_id: int) -> int:
+        """Conta os membros de uma company (apenas o índice de user_companies)"""
+        return db.execute(
+            select(func.count()).select_from(user_companies).where(
+                user_companies.c.company_id == company_id
+            )
+        ).scalar_one()
+    
     @staticmethod
     def is_user_member(db: Session, company_id: int, user_id: int) -> bool:
         """Verifica se um usuário é membro de uma company"""
-        company = CompanyService.get_company_by_id(db, company_id)
-        if not company:
-            return False
-        return any(user.id == user_id for user in company.users)
+        return db.query(_membership_exists(company_id, user_id)).scalar()
     
     @staticmethod
     def update_company(db: Session, company_id: int, company_update: CompanyUpdate) -> Company:
@@ -66,7 +252,11 @@ class CompanyService:
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Company not found"
             )
-        
+        return CompanyService.apply_company_update(db, db_company, company_update)
+    
+    @staticmethod
+    def apply_company_update(db: Session, db_company: Company, company_update: CompanyUpdate) -> Company:
+        """Aplica a atualização em uma company já carregada"""
         update_data = company_update.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_company, key, value)
@@ -78,62 +268,110 @@ class CompanyService:
     @staticmethod
     def add_user_to_company(db: Session, company_id: int, user_id: int) -> Company:
         """Adiciona um usuário a uma company"""
-        company = CompanyService.get_company_by_id(db, company_id)
-        if not company:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Company not found"
-            )
-        
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
+        access = CompanyService.load_company_access(db, company_id, target_user_id=user_id)
+        return CompanyService.add_member(db, access)
+    
+    @staticmethod
+    def add_member(db: Session, access: CompanyAccess) -> Company:
+        """Adiciona o usuário alvo de um CompanyAccess à company"""
         # Verifica se já é membro
-        if CompanyService.is_user_member(db, company_id, user_id):
+        if access.target_is_member:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="User is already a member of this company"
             )
         
-        company.users.append(user)
+        # Insere direto na associação, sem carregar a lista de membros
+        db.execute(
+            insert(user_companies).values(
+                company_id=access.company.id,
+                user_id=access.target_user.id
+            )
+        )
         db.commit()
-        db.refresh(company)
-        # Força o carregamento dos usuários
-        _ = company.users
-        return company
+        return access.company
     
     @staticmethod
-    def remove_user_from_company(db: Session, company_id: int, user_id: int) -> Company:
-        """Remove um usuário de uma company"""
-        company = CompanyService.get_company_by_id(db, company_id)
-        if not company:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Company not found"
+    def _classify_batch(db: Session, company_id: int, user_ids: List[int]) -> Tuple[List[int], set, List[int]]:
+        """Separa os IDs em (únicos, já membros, inexistentes) com dois SELECTs IN"""
+        unique_ids = list(dict.fromkeys(user_ids))
+        existing = set(db.scalars(select(User.id).where(User.id.in_(unique_ids))))
+        members = set(db.scalars(
+            select(user_companies.c.user_id).where(
+                user_companies.c.company_id == company_id,
+                user_companies.c.user_id.in_(unique_ids)
             )
-        
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
+        ))
+        not_found = [user_id for user_id in unique_ids if user_id not in existing]
+        return unique_ids, members, not_found
+    
+    @staticmethod
+    def add_members(db: Session, company_id: int, user_ids: List[int]) -> dict:
+        """Adiciona vários usuários à company em uma única transação"""
+        unique_ids, members, not_found = CompanyService._classify_batch(db, company_id, user_ids)
+        missing = set(not_found)
+        to_add = [user_id for user_id in unique_ids if user_id not in members and user_id not in missing]
+        # Um request concorrente pode ter adicionado alguns desde o SELECT:
+        # esses entram em skipped, sem abortar o lote
+        added = _insert_members(db, company_id, to_add) if to_add else []
+        db.commit()
+        applied = set(added)
+        return {
+            "company_id": company_id,
+            "applied": added,
+            "skipped": [
+                user_id for user_id in unique_ids
+                if user_id not in missing and user_id not in applied
+            ],
+            "not_found": not_found,
+            "member_count": CompanyService.count_members(db, company_id),
+        }
+    
+    @staticmethod
+    def remove_members(db: Session, company_id: int, user_ids: List[int]) -> dict:
+        """Remove vários usuários da company em uma única transação"""
+        unique_ids, members, not_found = CompanyService._classify_batch(db, company_id, user_ids)
+        missing = set(not_found)
+        to_remove = [user_id for user_id in unique_ids if user_id in members]
+        if to_remove:
+            db.execute(
+                delete(user_companies).where(
+                    user_companies.c.company_id == company_id,
+                    user_companies.c.user_id.in_(to_remove)
+                )
             )
-        
+        db.commit()
+        return {
+            "company_id": company_id,
+            "applied": to_remove,
+            "skipped": [
+                user_id for user_id in unique_ids if user_id not in members and user_id not in missing
+            ],
+            "not_found": not_found,
+            "member_count": CompanyService.count_members(db, company_id),
+        }
+    
+    @staticmethod
+    def remove_user_from_company(db: Session, company_id: int, user_id: int) -> Company:
+        """Remove um usuário de uma company"""
+        access = CompanyService.load_company_access(db, company_id, target_user_id=user_id)
+        return CompanyService.remove_member(db, access)
+    
+    @staticmethod
+    def remove_member(db: Session, access: CompanyAccess) -> Company:
+        """Remove o usuário alvo de um CompanyAccess da company"""
         # Verifica se é membro
-        if not CompanyService.is_user_member(db, company_id, user_id):
+        if not access.target_is_member:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="User is not a member of this company"
             )
         
-        company.users.remove(user)
+        db.execute(
+            delete(user_companies).where(
+                user_companies.c.company_id == access.company.id,
+                user_companies.c.user_id == access.target_user.id
+            )
+        )
         db.commit()
-        db.refresh(company)
-        # Força o carregamento dos usuários
-        _ = company.users
-        return company
-
+        return access.company
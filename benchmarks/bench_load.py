@@ -0,0 +1,393 @@
+"""Teste de carga das APIs de auth e companies, com relatório em JSON.
+
+Semeia a massa de ``benchmarks.seed`` (se o banco estiver vazio), sobe o
+servidor com uvicorn e dispara cada cenário por ``--duration`` segundos com
+``--concurrency`` clientes simultâneos:
+
+- ``login``: POST /auth/login com usuários aleatórios (custo do bcrypt)
+- ``me``: GET /auth/me
+- ``companies_list``: GET /companies do usuário autenticado
+- ``company_detail``: GET /companies/{id} de uma company do usuário
+- ``membership``: POST e DELETE /companies/{id}/users de um usuário sem
+  company (cada cliente usa o seu, então os pares nunca colidem)
+
+O relatório (req/s, erros e percentis de latência por endpoint) é gravado
+com o commit atual, para comparar execuções entre commits com ``--compare``
+(sai com código 1 se req/s cair ou o p99 subir além de ``--threshold``).
+
+Uso:
+    python -m benchmarks.bench_load --users 100000 --companies 10000 --concurrency 32 --duration 30
+    python -m benchmarks.bench_load --database-url postgresql://localhost/bench --workers 4
+    python -m benchmarks.bench_load --compare benchmarks/results/load-abc1234.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+from sqlalchemy import select
+
+from apps.auth.models import User
+from apps.companies.models import user_companies
+from benchmarks.bench_startup import ROOT, migrate
+from benchmarks.seed import PASSWORD, is_seeded, seed
+from core.database import build_engine
+
+API = "/api/v1"
+SCENARIOS = ("login", "me", "companies_list", "company_detail", "membership")
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentil por nearest-rank de uma lista já ordenada"""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> dict:
+    """req/s e percentis (ms) de um endpoint; erros contam nas requests"""
+    values = sorted(latencies)
+    summary = {
+        "requests": len(values) + errors,
+        "errors": errors,
+        "rps": round((len(values) + errors) / seconds, 2) if seconds else 0.0,
+    }
+    if values:
+        summary.update({
+            "mean_ms": round(sum(values) / len(values) * 1000, 3),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+            "p90_ms": round(percentile(values, 0.90) * 1000, 3),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+            "max_ms": round(values[-1] * 1000, 3),
+        })
+    return summary
+
+
+class Recorder:
+    """Latências das respostas 2xx e contagem de erros, por endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.enabled = False
+
+    async def request(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.is_success
+        except httpx.HTTPError:
+            response, ok = None, False
+        elapsed = time.perf_counter() - started_at
+        if self.enabled:
+            if ok:
+                self.latencies.setdefault(endpoint, []).append(elapsed)
+            else:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return response
+
+    def summary(self, seconds: float) -> Dict[str, dict]:
+        endpoints = sorted(set(self.latencies) | set(self.errors))
+        return {
+            endpoint: summarize(self.latencies.get(endpoint, []), self.errors.get(endpoint, 0), seconds)
+            for endpoint in endpoints
+        }
+
+
+class Actor:
+    """Usuário autenticado usado pelos cenários de leitura e de membership"""
+
+    def __init__(self, user_id: int, token: str, company_ids: List[int]):
+        self.user_id = user_id
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.company_ids = company_ids
+
+
+async def _login(client: httpx.AsyncClient, username: str) -> Optional[str]:
+    response = await client.post(f"{API}/auth/login", json={"username": username, "password": PASSWORD})
+    return response.json()["access_token"] if response.is_success else None
+
+
+def pick_actors(engine, count: int, random_seed: int) -> Dict[int, List[int]]:
+    """Usuários com ao menos uma company (e as companies de cada um), determinístico"""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(user_companies.c.user_id, user_companies.c.company_id)
+            .order_by(user_companies.c.user_id, user_companies.c.company_id)
+        ).all()
+    memberships: Dict[int, List[int]] = {}
+    for user_id, company_id in rows:
+        memberships.setdefault(user_id, []).append(company_id)
+    user_ids = sorted(memberships)
+    chosen = random.Random(random_seed).sample(user_ids, min(count, len(user_ids)))
+    return {user_id: memberships[user_id] for user_id in chosen}
+
+
+def spare_user_ids(engine, count: int) -> List[int]:
+    """Os ``count`` maiores IDs de usuário sem nenhuma company"""
+    with engine.connect() as conn:
+        return list(conn.scalars(
+            select(User.id)
+            .where(User.id.not_in(select(user_companies.c.user_id)))
+            .order_by(User.id.desc())
+            .limit(count)
+        ))
+
+
+async def _worker(scenario: str, index: int, ctx: dict, recorder: Recorder, deadline: float):
+    client: httpx.AsyncClient = ctx["client"]
+    rng = random.Random(ctx["seed"] + index)
+    actors: List[Actor] = ctx["actors"]
+    while time.perf_counter() < deadline:
+        actor = actors[rng.randrange(len(actors))]
+        if scenario == "login":
+            username = f"user{rng.randint(1, ctx['users'])}"
+            await recorder.request(
+                client, "POST /auth/login", "POST", f"{API}/auth/login",
+                json={"username": username, "password": PASSWORD}
+            )
+        elif scenario == "me":
+            await recorder.request(client, "GET /auth/me", "GET", f"{API}/auth/me", headers=actor.headers)
+        elif scenario == "companies_list":
+            await recorder.request(
+                client, "GET /companies", "GET", f"{API}/companies", headers=actor.headers
+            )
+        elif scenario == "company_detail":
+            company_id = rng.choice(actor.company_ids)
+            await recorder.request(
+                client, "GET /companies/{company_id}", "GET", f"{API}/companies/{company_id}",
+                headers=actor.headers
+            )
+        elif scenario == "membership":
+            # Ator e usuário-alvo fixos por cliente: adiciona e remove em sequência
+            actor = actors[index % len(actors)]
+            company_id = actor.company_ids[0]
+            target_id = ctx["spare"][index]
+            await recorder.request(
+                client, "POST /companies/{company_id}/users", "POST", f"{API}/companies/{company_id}/users",
+                json={"user_id": target_id}, headers=actor.headers
+            )
+            await recorder.request(
+                client, "DELETE /companies/{company_id}/users/{user_id}", "DELETE",
+                f"{API}/companies/{company_id}/users/{target_id}", headers=actor.headers
+            )
+
+
+async def run_scenario(scenario: str, ctx: dict, concurrency: int, duration: float, warmup: float) -> dict:
+    recorder = Recorder()
+    if warmup > 0:
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(*(
+            _worker(scenario, i, ctx, recorder, deadline) for i in range(concurrency)
+        ))
+    recorder.enabled = True
+    started_at = time.perf_counter()
+    deadline = started_at + duration
+    await asyncio.gather(*(
+        _worker(scenario, i, ctx, recorder, deadline) for i in range(concurrency)
+    ))
+    return recorder.summary(time.perf_counter() - started_at)
+
+
+async def run_scenarios(base_url: str, engine, args) -> Dict[str, dict]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        memberships = pick_actors(engine, args.token_users, args.seed)
+        actors = []
+        for user_id, company_ids in memberships.items():
+            token = await _login(client, f"user{user_id}")
+            if token is None:
+                raise RuntimeError(f"login failed for user{user_id}; is the database seeded?")
+            actors.append(Actor(user_id, token, company_ids))
+        if not actors:
+            raise RuntimeError("no users with companies to authenticate as")
+
+        ctx = {"client": client, "actors": actors, "users": args.users, "seed": args.seed}
+        results = {}
+        for scenario in args.scenarios:
+            if scenario == "membership":
+                ctx["spare"] = spare_user_ids(engine, args.concurrency)
+                if len(ctx["spare"]) < args.concurrency:
+                    raise RuntimeError("membership scenario needs --spare >= --concurrency")
+            print(f"{scenario}: {args.duration:.0f} s @ {args.concurrency} clients", flush=True)
+            results[scenario] = await run_scenario(
+                scenario, ctx, args.concurrency, args.duration, args.warmup
+            )
+        return results
+
+
+def wait_until_ready(base_url: str, timeout: float) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health/ready", timeout=1).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    return False
+
+
+def start_server(database_url: str, port: int, workers: int, bcrypt_rounds: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        # Mesmo custo da massa: o login não refaz (nem grava) o hash
+        BCRYPT_ROUNDS=str(bcrypt_rounds),
+        # Todos os clientes vêm de 127.0.0.1
+        RATE_LIMIT_ENABLED="false",
+    )
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def git_revision() -> dict:
+    def git(*args: str) -> str:
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=ROOT, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    """Regressões de req/s ou p99 acima de ``threshold`` (fração) em relação ao baseline"""
+    regressions = []
+    for scenario, endpoints in report["scenarios"].items():
+        for endpoint, current in endpoints.items():
+            previous = baseline.get("scenarios", {}).get(scenario, {}).get(endpoint)
+            if not previous:
+                continue
+            if previous["rps"] and current["rps"] < previous["rps"] * (1 - threshold):
+                regressions.append(
+                    f"{scenario} {endpoint}: rps {previous['rps']} -> {current['rps']}"
+                )
+            if "p99_ms" in previous and "p99_ms" in current and current["p99_ms"] > previous["p99_ms"] * (1 + threshold):
+                regressions.append(
+                    f"{scenario} {endpoint}: p99 {previous['p99_ms']} ms -> {current['p99_ms']} ms"
+                )
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    print(f"{'scenario':<16} {'endpoint':<46} {'req/s':>9} {'err':>6} {'p50':>9} {'p90':>9} {'p99':>9}")
+    for scenario, endpoints in report["scenarios"].items():
+        for endpoint, row in endpoints.items():
+            print(
+                f"{scenario:<16} {endpoint:<46} {row['rps']:>9.1f} {row['errors']:>6} "
+                f"{row.get('p50_ms', 0):>9.2f} {row.get('p90_ms', 0):>9.2f} {row.get('p99_ms', 0):>9.2f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="padrão: SQLite temporário, descartado ao final")
+    parser.add_argument("--url", help="servidor já em execução sobre --database-url (não sobe o uvicorn)")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--workers", type=int, default=1, help="workers do uvicorn")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--companies", type=int, default=10000)
+    parser.add_argument("--spare", type=int, default=1000, help="usuários sem company")
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--token-users", type=int, default=100, help="usuários autenticados nas leituras")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0, help="segundos medidos por cenário")
+    parser.add_argument("--warmup", type=float, default=3.0, help="segundos descartados por cenário")
+    parser.add_argument("--timeout", type=float, default=30.0, help="timeout por request")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--output", help="padrão: benchmarks/results/load-<commit>.json")
+    parser.add_argument("--compare", help="relatório baseline para detectar regressões")
+    parser.add_argument("--threshold", type=float, default=0.10, help="variação tolerada (fração)")
+    args = parser.parse_args()
+    if args.url and not args.database_url:
+        parser.error("--url requires --database-url (the server's database)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{Path(tmp) / 'bench_load.db'}"
+        migrate(database_url)
+        engine = build_engine(database_url)
+        seeded = None
+        if not is_seeded(engine):
+            seeded = seed(
+                engine, args.users, args.companies, args.spare, args.skew, args.seed, args.bcrypt_rounds
+            )
+            print(
+                f"seeded {seeded['users']} users, {seeded['companies']} companies, "
+                f"{seeded['memberships']} memberships in {seeded['seconds']:.1f} s"
+            )
+
+        process = None
+        base_url = args.url
+        if base_url is None:
+            base_url = f"http://127.0.0.1:{args.port}"
+            process = start_server(database_url, args.port, args.workers, args.bcrypt_rounds)
+        try:
+            if not wait_until_ready(base_url, timeout=60):
+                sys.exit(f"server at {base_url} is not ready")
+            scenarios = asyncio.run(run_scenarios(base_url, engine, args))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+            engine.dispose()
+
+    config = {
+        key: value for key, value in vars(args).items()
+        # A URL do banco pode conter credenciais
+        if key not in ("database_url", "output", "compare", "threshold", "port")
+    }
+    config["database"] = engine.dialect.name
+    report = {
+        **git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "seed": seeded,
+        "scenarios": scenarios,
+    }
+    print_report(report)
+
+    if args.output:
+        output = Path(args.output)
+    else:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        output = RESULTS_DIR / f"load-{(report['commit'] or 'unknown')[:7]}.json"
+    output.write_text(json.dumps(report, indent=2))
+    print(f"report written to {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {baseline.get('commit', args.compare)}")
+
+
+if __name__ == "__main__":
+    main()
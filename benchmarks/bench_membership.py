@@ -0,0 +1,95 @@
+"""Benchmark da checagem de membership (CompanyService.is_user_member).
+
+Semeia uma company com N membros em um SQLite em memória e mede o tempo
+médio da checagem via EXISTS, comparando com o carregamento completo da
+relação ``Company.users`` (implementação anterior).
+
+Uso:
+    python -m benchmarks.bench_membership --sizes 100 1000 10000 50000
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.database import Base
+from apps.auth.models import User
+from apps.companies.models import Company, user_companies
+from apps.companies.services import CompanyService
+
+
+def seed(db, members: int) -> int:
+    """Cria uma company com ``members`` usuários e retorna o ID dela"""
+    company = Company(name="Bench Company")
+    db.add(company)
+    db.flush()
+    db.execute(insert(User), [
+        {"email": f"user{i}@example.com", "username": f"user{i}", "hashed_password": "x"}
+        for i in range(members)
+    ])
+    db.execute(
+        insert(user_companies).from_select(
+            ["user_id", "company_id"],
+            db.query(User.id, company.id).statement
+        )
+    )
+    db.commit()
+    return company.id
+
+
+def time_per_call(fn, repeat: int) -> float:
+    """Tempo médio por chamada, em milissegundos"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def relationship_scan(db, company_id: int, user_id: int) -> bool:
+    """Implementação anterior: carrega todos os membros e itera em Python"""
+    company = db.get(Company, company_id)
+    db.expire(company, ["users"])
+    return any(user.id == user_id for user in company.users)
+
+
+def run(sizes, repeat: int) -> list:
+    results = []
+    for size in sizes:
+        engine = create_engine(
+            "sqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        company_id = seed(db, size)
+        last_user_id = size
+
+        exists_ms = time_per_call(
+            lambda: CompanyService.is_user_member(db, company_id, last_user_id), repeat
+        )
+        scan_repeat = max(1, repeat // 100)
+        scan_ms = time_per_call(
+            lambda: relationship_scan(db, company_id, last_user_id), scan_repeat
+        )
+        results.append({"members": size, "exists_ms": exists_ms, "relationship_ms": scan_ms})
+        db.close()
+        engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'members':>10} {'EXISTS (ms)':>12} {'relationship (ms)':>18}")
+    for row in run(args.sizes, args.repeat):
+        print(f"{row['members']:>10} {row['exists_ms']:>12.4f} {row['relationship_ms']:>18.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark de latência de login por esquema e custo de hash de senha.
+
+Para cada nível (bcrypt com N rounds, scrypt com N = 2^k) cria um usuário
+com hash nesse custo em um SQLite em memória e mede ``POST /login``
+ponta a ponta (TestClient), reportando média, p50 e p95.
+
+Uso:
+    python -m benchmarks.bench_password_hash --bcrypt 10 11 12 13 --scrypt 14 15 --repeat 20
+"""
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.config import settings
+from core.database import Base, get_db
+from core.ratelimit import login_rate_limiter
+from main import app
+from apps.auth.schemas import UserCreate
+from apps.auth.services import UserService
+
+
+def configure(scheme: str, cost: int) -> None:
+    settings.PASSWORD_HASH_SCHEME = scheme
+    if scheme == "bcrypt":
+        settings.BCRYPT_ROUNDS = cost
+    else:
+        settings.SCRYPT_N = 2 ** cost
+
+
+def measure(client: TestClient, username: str, repeat: int) -> list:
+    """Latências de login, em milissegundos"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.post("/api/v1/auth/login", json={"username": username, "password": "benchmark123"})
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text
+    return timings
+
+
+def run(levels, repeat: int) -> list:
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    # Logins repetidos do mesmo usuário: o limite por username rejeitaria a 11ª
+    limiter_enabled, login_rate_limiter.enabled = login_rate_limiter.enabled, False
+    results = []
+    try:
+        with TestClient(app) as client:
+            for scheme, cost in levels:
+                configure(scheme, cost)
+                username = f"{scheme}{cost}"
+                db = session_factory()
+                UserService.create_user(
+                    db, UserCreate(email=f"{username}@example.com", username=username, password="benchmark123")
+                )
+                db.close()
+
+                timings = sorted(measure(client, username, repeat))
+                results.append({
+                    "scheme": scheme,
+                    "cost": cost,
+                    "mean_ms": statistics.mean(timings),
+                    "p50_ms": timings[len(timings) // 2],
+                    "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+                })
+    finally:
+        app.dependency_overrides.clear()
+        login_rate_limiter.enabled = limiter_enabled
+        login_rate_limiter.reset()
+        engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bcrypt", type=int, nargs="*", default=[10, 11, 12, 13], help="rounds")
+    parser.add_argument("--scrypt", type=int, nargs="*", default=[14, 15], help="log2(N)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    levels = [("bcrypt", cost) for cost in args.bcrypt] + [("scrypt", cost) for cost in args.scrypt]
+    print(f"{'scheme':>8} {'cost':>5} {'mean (ms)':>10} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for row in run(levels, args.repeat):
+        print(f"{row['scheme']:>8} {row['cost']:>5} {row['mean_ms']:>10.1f} {row['p50_ms']:>10.1f} {row['p95_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
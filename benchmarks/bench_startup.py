@@ -0,0 +1,105 @@
+"""Benchmark de startup: tempo até o primeiro request atendido por worker.
+
+Aplica as migrations uma única vez em um SQLite temporário e então sobe N
+processos uvicorn ao mesmo tempo (simulando os workers de um deploy),
+medindo, para cada um, o tempo entre o spawn e a primeira resposta 200 em
+``/health``.
+
+Uso:
+    python -m benchmarks.bench_startup --workers 8
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def migrate(url: str) -> float:
+    """Aplica as migrations e retorna o tempo gasto, em milissegundos"""
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    start = time.perf_counter()
+    command.upgrade(config, "head")
+    return (time.perf_counter() - start) * 1000
+
+
+def wait_until_ready(port: int, timeout: float) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.01)
+    return False
+
+
+def run(workers: int, base_port: int, timeout: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench_startup.db'}"
+        migrate_ms = migrate(url)
+        env = dict(os.environ, DATABASE_URL=url)
+
+        processes = []
+        for i in range(workers):
+            port = base_port + i
+            started_at = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                cwd=ROOT,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            processes.append((port, started_at, process))
+
+        results = []
+        try:
+            for port, started_at, _ in processes:
+                ready = wait_until_ready(port, timeout)
+                elapsed = (time.perf_counter() - started_at) * 1000 if ready else None
+                results.append({"port": port, "first_request_ms": elapsed})
+        finally:
+            for _, _, process in processes:
+                process.terminate()
+            for _, _, process in processes:
+                process.wait()
+    return {"migrate_ms": migrate_ms, "workers": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--base-port", type=int, default=8100)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    report = run(args.workers, args.base_port, args.timeout)
+    print(f"migrations (uma vez): {report['migrate_ms']:.1f} ms")
+    print(f"{'worker':>8} {'port':>6} {'first request (ms)':>20}")
+    timings = []
+    for i, row in enumerate(report["workers"]):
+        value = row["first_request_ms"]
+        if value is not None:
+            timings.append(value)
+        shown = f"{value:.1f}" if value is not None else "timeout"
+        print(f"{i:>8} {row['port']:>6} {shown:>20}")
+    if timings:
+        print(f"{'mean':>15} {sum(timings) / len(timings):>20.1f}")
+        print(f"{'max':>15} {max(timings):>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Microbenchmark dos backends de token: operações por segundo.
+
+Compara encode e decode (verificação da assinatura) do backend
+python-jose com o backend nativo, para HS256, ES256 e EdDSA (o
+python-jose não suporta EdDSA). As chaves são geradas em memória.
+
+Uso:
+    python -m benchmarks.bench_tokens --seconds 1
+"""
+import argparse
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+from core.tokens import JoseTokenBackend, NativeTokenBackend
+
+
+def _pem(private_key) -> str:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+
+
+def backends() -> list:
+    secret = "benchmark-secret-key"
+    ec_pem = _pem(ec.generate_private_key(ec.SECP256R1()))
+    ed_pem = _pem(ed25519.Ed25519PrivateKey.generate())
+    return [
+        ("jose", "HS256", JoseTokenBackend("HS256", secret)),
+        ("native", "HS256", NativeTokenBackend("HS256", secret)),
+        ("jose", "ES256", JoseTokenBackend("ES256", ec_pem)),
+        ("native", "ES256", NativeTokenBackend("ES256", ec_pem)),
+        ("native", "EdDSA", NativeTokenBackend("EdDSA", ed_pem)),
+    ]
+
+
+def ops_per_second(fn, seconds: float) -> float:
+    """Executa ``fn`` repetidamente por ``seconds`` e retorna ops/s"""
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        for _ in range(100):
+            fn()
+        count += 100
+        now = time.perf_counter()
+        if now >= deadline:
+            return count / (now - start)
+
+
+def run(seconds: float) -> list:
+    claims = {
+        "sub": "1",
+        "username": "benchmark",
+        "role": "user",
+        "active": True,
+        "ver": 0,
+        "exp": int(time.time()) + 3600,
+    }
+    results = []
+    for name, algorithm, backend in backends():
+        token = backend.encode(claims)
+        results.append({
+            "backend": name,
+            "algorithm": algorithm,
+            "encode_ops": ops_per_second(lambda: backend.encode(claims), seconds),
+            "decode_ops": ops_per_second(lambda: backend.decode(token), seconds),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="duração de cada medição")
+    args = parser.parse_args()
+
+    print(f"{'backend':>8} {'alg':>6} {'encode (ops/s)':>16} {'decode (ops/s)':>16}")
+    for row in run(args.seconds):
+        print(f"{row['backend']:>8} {row['algorithm']:>6} {row['encode_ops']:>16,.0f} {row['decode_ops']:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Massa de dados determinística para os benchmarks de carga.
+
+Cria N usuários e M companies com membership enviesada: a popularidade das
+companies segue uma lei de potência (poucas companies grandes, cauda longa
+de pequenas) e cada usuário participa de 0 a 3 companies. A mesma
+``--seed`` gera sempre os mesmos dados, então execuções em commits
+diferentes são comparáveis. Todos os usuários têm a mesma senha
+(``PASSWORD``), com hash gerado uma vez no custo informado.
+
+Os últimos ``spare`` usuários não participam de nenhuma company: o
+benchmark de membership os adiciona e remove sem alterar a massa.
+
+Uso:
+    python -m benchmarks.seed --database-url sqlite:///./bench.db --users 100000 --companies 10000
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+import bcrypt
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Engine
+
+from apps.auth.models import User
+from apps.companies.models import Company, user_companies
+from benchmarks.bench_startup import migrate
+from core.database import build_engine
+
+PASSWORD = "benchmark123"
+BATCH_SIZE = 10000
+# Número de companies por usuário e o peso de cada opção
+MEMBERSHIPS_PER_USER = (0, 1, 2, 3)
+MEMBERSHIP_WEIGHTS = (10, 50, 30, 10)
+
+
+def _batches(rows: List[dict]):
+    for start in range(0, len(rows), BATCH_SIZE):
+        yield rows[start:start + BATCH_SIZE]
+
+
+def membership_plan(users: int, companies: int, spare: int, skew: float, seed: int) -> Dict[int, List[int]]:
+    """Companies de cada usuário (IDs começando em 1), determinístico pela seed"""
+    rng = random.Random(seed)
+    company_ids = list(range(1, companies + 1))
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, companies + 1):
+        total += 1 / rank ** skew
+        cum_weights.append(total)
+
+    plan: Dict[int, List[int]] = {}
+    for user_id in range(1, users - spare + 1):
+        count = rng.choices(MEMBERSHIPS_PER_USER, weights=MEMBERSHIP_WEIGHTS)[0]
+        chosen = set(rng.choices(company_ids, cum_weights=cum_weights, k=count))
+        plan[user_id] = sorted(chosen)
+    return plan
+
+
+def is_seeded(engine: Engine) -> bool:
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(User)) > 0
+
+
+def seed(
+    engine: Engine,
+    users: int,
+    companies: int,
+    spare: int = 1000,
+    skew: float = 1.1,
+    random_seed: int = 42,
+    bcrypt_rounds: int = 12
+) -> dict:
+    """Insere a massa em lotes; o banco deve estar migrado e vazio"""
+    started_at = time.perf_counter()
+    hashed_password = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=bcrypt_rounds)).decode()
+    plan = membership_plan(users, companies, spare, skew, random_seed)
+
+    user_rows = [
+        {
+            "id": user_id,
+            "email": f"user{user_id}@example.com",
+            "username": f"user{user_id}",
+            "hashed_password": hashed_password,
+            "full_name": f"User {user_id}",
+            "is_active": True,
+        }
+        for user_id in range(1, users + 1)
+    ]
+    company_rows = [
+        {"id": company_id, "name": f"Company {company_id:05d}", "description": None}
+        for company_id in range(1, companies + 1)
+    ]
+    membership_rows = [
+        {"user_id": user_id, "company_id": company_id}
+        for user_id, company_ids in plan.items()
+        for company_id in company_ids
+    ]
+
+    with engine.begin() as conn:
+        for batch in _batches(user_rows):
+            conn.execute(insert(User), batch)
+        for batch in _batches(company_rows):
+            conn.execute(insert(Company), batch)
+        for batch in _batches(membership_rows):
+            conn.execute(insert(user_companies), batch)
+        if engine.dialect.name == "postgresql":
+            # IDs explícitos não avançam as sequences: ajusta para os INSERTs da API
+            for table in ("users", "companies"):
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"
+                )
+
+    return {
+        "users": users,
+        "companies": companies,
+        "memberships": len(membership_rows),
+        "seconds": time.perf_counter() - started_at,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--companies", type=int, default=10000)
+    parser.add_argument("--spare", type=int, default=1000, help="usuários sem company")
+    parser.add_argument("--skew", type=float, default=1.1, help="expoente da lei de potência")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    args = parser.parse_args()
+
+    migrate(args.database_url)
+    engine = build_engine(args.database_url)
+    if is_seeded(engine):
+        print("database already seeded; nothing to do")
+        return
+    result = seed(
+        engine, args.users, args.companies, args.spare, args.skew, args.seed, args.bcrypt_rounds
+    )
+    print(
+        f"{result['users']} users, {result['companies']} companies, "
+        f"{result['memberships']} memberships in {result['seconds']:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -9,11 +9,108 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./rapier_auth.db"
-    
+    # Rotas com AsyncSession (aiosqlite/asyncpg, URLs derivadas de DATABASE_URL
+    # e DATABASE_REPLICA_URLS); o engine síncrono continua com a thread do
+    # filtro de usernames e o probe de prontidão
+    DATABASE_ASYNC: bool = False
+    # Pool de conexões (ignorado para SQLite em memória)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # segundos aguardando uma conexão livre
+    DB_POOL_RECYCLE: int = -1  # segundos; -1 desativa
+    DB_POOL_PRE_PING: bool = False
+    # Timeout por statement no Postgres (ms); None mantém o padrão do servidor
+    DB_STATEMENT_TIMEOUT_MS: Optional[int] = None
+    # Conexões abertas por engine no startup (limitado ao pool_size)
+    DB_POOL_WARMUP: int = 1
+    # PRAGMAs aplicados a cada nova conexão SQLite (None mantém o padrão)
+    SQLITE_JOURNAL_MODE: Optional[str] = "WAL"
+    SQLITE_SYNCHRONOUS: Optional[str] = "NORMAL"
+    SQLITE_CACHE_SIZE: Optional[int] = -64000  # negativo = KiB
+    SQLITE_MMAP_SIZE: Optional[int] = None  # bytes
+    # Réplicas de leitura (JSON, ex.: ["postgresql://.../r1", "postgresql://.../r2"])
+    DATABASE_REPLICA_URLS: List[str] = []
+    DATABASE_REPLICA_STRATEGY: str = "round_robin"  # ou "least_connections"
+    # Após uma escrita, leituras do mesmo cliente vão ao primário por N segundos
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    # Warning de possível N+1 a partir de N statements repetidos em um request
+    QUERY_DUPLICATE_WARN_THRESHOLD: int = 5
+
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production"
-    ALGORITHM: str = "HS256"
+    ALGORITHM: str = "HS256"  # HS256/HS384/HS512, ES256 ou EdDSA
+    TOKEN_BACKEND: str = "native"  # "native" ou "jose"
+    # Chaves PEM para ES256/EdDSA; só a pública = apenas verificação
+    JWT_PRIVATE_KEY_FILE: Optional[str] = None
+    JWT_PUBLIC_KEY_FILE: Optional[str] = None
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    # Confia em role/is_active assinados no token, sem SELECT por request
+    STATELESS_AUTH: bool = False
+    # Cache em memória do usuário autenticado (0 desativa)
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: float = 60.0
+    # Cache de claims de tokens já verificados, por digest do token (0 desativa)
+    TOKEN_CACHE_SIZE: int = 10000
+    # Cache de users.token_version para o modo stateless (0 desativa); uma
+    # revogação feita em outro worker é vista após o TTL
+    TOKEN_VERSION_CACHE_SIZE: int = 10000
+    TOKEN_VERSION_CACHE_TTL: float = 5.0
+    
+    # Esquema e custo do hash de senhas; hashes com parâmetros diferentes são
+    # refeitos no próximo login bem-sucedido
+    PASSWORD_HASH_SCHEME: str = "bcrypt"  # "bcrypt" ou "scrypt"
+    BCRYPT_ROUNDS: int = 12
+    SCRYPT_N: int = 2 ** 14
+    SCRYPT_R: int = 8
+    SCRYPT_P: int = 1
+
+    # Métricas Prometheus (GET /metrics)
+    METRICS_ENABLED: bool = True
+    # Buckets (segundos) do histograma de latência por rota
+    METRICS_LATENCY_BUCKETS: List[float] = [
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+    ]
+    # Diretório compartilhado pelos workers (uvicorn --workers N); None = um processo
+    METRICS_MULTIPROC_DIR: Optional[str] = None
+    METRICS_SNAPSHOT_SECONDS: float = 5.0
+
+    # Probe de prontidão (GET /health/ready)
+    HEALTH_DB_TIMEOUT: float = 2.0  # segundos por ping ao banco
+    HEALTH_CACHE_SECONDS: float = 2.0  # resultado reaproveitado entre probes
+    HEALTH_POOL_MAX_UTILIZATION: float = 0.9  # fração do pool (size + overflow) em uso
+    HEALTH_HASHER_MAX_QUEUE_RATIO: float = 0.8  # fração de PASSWORD_HASH_MAX_QUEUE
+
+    # Cache negativo de usernames (bloom filter) consultado no login
+    USERNAME_FILTER_ENABLED: bool = True
+    USERNAME_FILTER_CAPACITY: int = 1_000_000
+    USERNAME_FILTER_ERROR_RATE: float = 0.01
+    # Intervalo da thread de fundo que carrega e atualiza o filtro
+    USERNAME_FILTER_SYNC_SECONDS: float = 5.0
+    # Intervalo mínimo entre leituras de criações/renomeações disparadas por
+    # logins negativos (atraso máximo para ver usuários de outros workers)
+    USERNAME_FILTER_CATCH_UP_SECONDS: float = 1.0
+    # Reconstrução completa (descarta usernames deletados ou renomeados)
+    USERNAME_FILTER_REBUILD_SECONDS: float = 3600.0
+    
+    # Password hashing (pool de workers para o bcrypt)
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # "thread" ou "process"
+    PASSWORD_HASH_WORKERS: Optional[int] = None  # None = número de CPUs
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    PASSWORD_HASH_RETRY_AFTER: int = 1  # segundos sugeridos no header Retry-After
+    
+    # Rate limiting de login (aplicado antes do bcrypt)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory", "store" (local) ou "redis"
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    # Usa o primeiro IP de X-Forwarded-For (apenas atrás de proxy confiável)
+    RATE_LIMIT_TRUST_FORWARDED: bool = False
+    LOGIN_RATE_LIMIT_USERNAME: int = 10  # tentativas por janela, por username
+    LOGIN_RATE_LIMIT_IP: int = 100  # tentativas por janela, por IP
+    LOGIN_RATE_LIMIT_WINDOW: float = 60.0  # segundos
+    
+    # Importação em massa de usuários
+    USER_IMPORT_CHUNK_SIZE: int = 500
     
     # CORS
     CORS_ORIGINS: List[str] = ["*"]
@@ -1,22 +1,427 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+import itertools
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple, TypeVar, Union
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.datastructures import MutableHeaders
 
 from core.config import settings
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+logger = logging.getLogger(__name__)
+
+REPLICA_STRATEGIES = ("round_robin", "least_connections")
+# Cookie com o instante (epoch) até o qual as leituras do cliente vão ao primário
+READ_YOUR_WRITES_COOKIE = "rapier_primary_until"
+# Chave em ``request.state`` marcada pelos commits feitos no request
+WRITE_STATE_KEY = "db_write"
+# Diferença tolerada entre os relógios de quem emitiu e de quem lê o cookie
+READ_YOUR_WRITES_CLOCK_SKEW = 1.0
+# Driver assíncrono por backend (DATABASE_ASYNC)
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+T = TypeVar("T")
+# Sessão do request: AsyncSession com DATABASE_ASYNC, Session caso contrário
+DbSession = Union[Session, AsyncSession]
+
+
+class PoolWaitStats:
+    """Mede o tempo de checkout (espera por conexão livre + abertura)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        started_at = time.monotonic()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._wait_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.monotonic() - started_at
+            with self._wait_lock:
+                self.checkouts += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def wait_stats(self) -> dict:
+        with self._wait_lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": (self.wait_seconds / self.checkouts * 1000) if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+                "wait_seconds": self.wait_seconds,
+            }
+
+
+class InstrumentedQueuePool(PoolWaitStats, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(PoolWaitStats, AsyncAdaptedQueuePool):
+    pass
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(url: str) -> dict:
+    """Monta os argumentos de create_engine a partir das configurações"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    connect_args: dict = {}
+
+    if backend == "sqlite":
+        connect_args["check_same_thread"] = False
+    if _is_memory_sqlite(parsed):
+        # Banco em memória: mantém o pool padrão do dialeto (conexão única)
+        return {"connect_args": connect_args}
+
+    timeout_ms = settings.DB_STATEMENT_TIMEOUT_MS
+    if backend == "postgresql" and timeout_ms:
+        connect_args["options"] = f"-c statement_timeout={timeout_ms}"
+
+    return {
+        "connect_args": connect_args,
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def sqlite_pragmas() -> List[Tuple[str, Union[str, int]]]:
+    """PRAGMAs configurados para novas conexões SQLite"""
+    pragmas = [
+        ("journal_mode", settings.SQLITE_JOURNAL_MODE),
+        ("synchronous", settings.SQLITE_SYNCHRONOUS),
+        ("cache_size", settings.SQLITE_CACHE_SIZE),
+        ("mmap_size", settings.SQLITE_MMAP_SIZE),
+    ]
+    return [(name, value) for name, value in pragmas if value is not None]
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def build_engine(url: str) -> Engine:
+    """Cria o engine síncrono com pool e PRAGMAs configurados"""
+    db_engine = create_engine(url, **engine_options(url))
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+
+def async_url(url: str) -> str:
+    """URL equivalente com o driver assíncrono (sqlite+aiosqlite, postgresql+asyncpg)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"No async driver for database backend: {backend}")
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+def async_engine_options(url: str) -> dict:
+    """Argumentos de create_async_engine: os mesmos do engine síncrono, com pool assíncrono"""
+    options = engine_options(url)
+    if "poolclass" in options:
+        options["poolclass"] = InstrumentedAsyncQueuePool
+    connect_args = options["connect_args"]
+    connect_args.pop("check_same_thread", None)
+    timeout = connect_args.pop("options", None)
+    if timeout is not None:
+        # asyncpg não aceita "options": o timeout vai como parâmetro da sessão
+        connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    return options
+
+
+def build_async_engine(url: str) -> AsyncEngine:
+    """Cria o engine assíncrono (driver derivado da URL síncrona)"""
+    url = async_url(url)
+    db_engine = create_async_engine(url, **async_engine_options(url))
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+
+def pool_stats(target: Optional[Engine] = None) -> dict:
+    """Estatísticas do pool de conexões (padrão: engine principal)"""
+    pool = (target or engine).pool
+    stats: dict = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # overflow() é negativo enquanto o pool base não está cheio
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+        })
+    if isinstance(pool, PoolWaitStats):
+        stats.update(pool.wait_stats())
+    return stats
+
+
+def _checked_out(db_engine: Engine) -> int:
+    pool = db_engine.pool
+    return pool.checkedout() if isinstance(pool, QueuePool) else 0
+
+
+class ReplicaRouter:
+    """Escolhe o engine de leitura: réplicas, ou o primário após escritas.
+
+    Depois que um cliente escreve, suas leituras vão ao primário durante
+    ``sticky_seconds`` (read-your-writes), evitando ler de uma réplica
+    ainda atrasada. O prazo viaja com o cliente (cookie), então vale em
+    qualquer worker que atender o próximo request. Sem réplicas
+    configuradas, tudo vai ao primário.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: List[Engine],
+        strategy: str = "round_robin",
+        sticky_seconds: float = 5.0,
+        clock=time.time
+    ):
+        if strategy not in REPLICA_STRATEGIES:
+            raise ValueError(f"Invalid replica strategy: {strategy}")
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self.sticky_seconds = sticky_seconds
+        self._clock = clock
+        self._counter = itertools.count()
+
+    def primary_until(self) -> Optional[float]:
+        """Prazo de leitura no primário para quem acabou de escrever (None = desativado)"""
+        if not self.replicas or self.sticky_seconds <= 0:
+            return None
+        return self._clock() + self.sticky_seconds
+
+    def engine_for(self, primary_until: Optional[float] = None) -> Engine:
+        """Engine a usar para as leituras do cliente"""
+        if not self.replicas:
+            return self.primary
+        if primary_until is not None:
+            now = self._clock()
+            # O cookie vem do cliente: prazos além do que o servidor emitiria
+            # (now + sticky_seconds) são forjados e ignorados
+            if now < primary_until <= now + self.sticky_seconds + READ_YOUR_WRITES_CLOCK_SKEW:
+                return self.primary
+        if self.strategy == "least_connections":
+            return min(self.replicas, key=_checked_out)
+        return self.replicas[next(self._counter) % len(self.replicas)]
+
+
+def primary_until(request: Request) -> Optional[float]:
+    """Prazo de read-your-writes enviado pelo cliente no cookie (None se ausente/inválido)"""
+    value = request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+engine = build_engine(settings.DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+replica_router = ReplicaRouter(
+    engine,
+    [build_engine(url) for url in settings.DATABASE_REPLICA_URLS],
+    strategy=settings.DATABASE_REPLICA_STRATEGY,
+    sticky_seconds=settings.READ_YOUR_WRITES_SECONDS
+)
+
+
+if settings.DATABASE_ASYNC:
+    async_engine: Optional[AsyncEngine] = build_async_engine(settings.DATABASE_URL)
+    async_replica_router: Optional[ReplicaRouter] = ReplicaRouter(
+        async_engine,
+        [build_async_engine(url) for url in settings.DATABASE_REPLICA_URLS],
+        strategy=settings.DATABASE_REPLICA_STRATEGY,
+        sticky_seconds=settings.READ_YOUR_WRITES_SECONDS
+    )
+else:
+    async_engine = None
+    async_replica_router = None
+
+# expire_on_commit=False: objetos retornados pelos services são serializados
+# após o commit, fora do run_sync, onde um refresh implícito não é permitido
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+@event.listens_for(Session, "after_commit")
+def _record_write(session) -> None:
+    state = session.info.get("request_state")
+    if state is not None:
+        state[WRITE_STATE_KEY] = True
+
+
+class ReadYourWritesMiddleware:
+    """Middleware ASGI que marca com um cookie os clientes que escreveram.
+
+    Requests com commit via ``get_db`` recebem ``READ_YOUR_WRITES_COOKIE``
+    com o prazo de leitura no primário; ``get_read_db`` o respeita em
+    qualquer worker ou instância.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and state.get(WRITE_STATE_KEY):
+                until = replica_router.primary_until()
+                if until is not None:
+                    MutableHeaders(scope=message).append(
+                        "set-cookie",
+                        f"{READ_YOUR_WRITES_COOKIE}={until:.3f}; "
+                        f"Max-Age={math.ceil(replica_router.sticky_seconds)}; Path=/; HttpOnly; SameSite=Lax"
+                    )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
 Base = declarative_base()
 
 
-def get_db():
+def warm_up_pool(db_engine: Engine, connections: int = 1) -> int:
+    """Abre conexões e as devolve ao pool, para que o primeiro request não pague o connect"""
+    pool = db_engine.pool
+    if isinstance(pool, QueuePool):
+        connections = min(connections, pool.size())
+    else:
+        connections = min(connections, 1)
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = db_engine.connect()
+            opened.append(conn)
+            conn.exec_driver_sql("SELECT 1")
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+
+def database_engines() -> List[Tuple[str, Engine]]:
+    """Engines síncronos por nome: primary, replica0, replica1..."""
+    return [("primary", engine)] + [
+        (f"replica{i}", replica) for i, replica in enumerate(replica_router.replicas)
+    ]
+
+
+def warm_up_databases() -> dict:
+    """Aquece os pools do primário e das réplicas; falhas não impedem o startup"""
+    results = {}
+    for name, db_engine in database_engines():
+        try:
+            results[name] = warm_up_pool(db_engine, settings.DB_POOL_WARMUP)
+        except SQLAlchemyError as exc:
+            logger.warning("Database warm-up failed for %s: %s", name, exc)
+            results[name] = 0
+    return results
+
+
+async def dispose_async_engines() -> None:
+    """Fecha as conexões dos engines assíncronos (shutdown)"""
+    if async_replica_router is None:
+        return
+    for db_engine in [async_replica_router.primary, *async_replica_router.replicas]:
+        await db_engine.dispose()
+
+
+def get_sync_db(request: Request):
     db = SessionLocal()
+    # Commits nesta sessão ativam o read-your-writes (ReadYourWritesMiddleware)
+    db.info["request_state"] = request.scope.setdefault("state", {})
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_sync_read_db(request: Request):
+    """Sessão para handlers somente leitura (réplica, quando configurada)"""
+    db = SessionLocal(bind=replica_router.engine_for(primary_until(request)))
     try:
         yield db
     finally:
         db.close()
 
+
+async def get_async_db(request: Request):
+    """Como ``get_sync_db``, com AsyncSession: as queries não bloqueiam o event loop"""
+    db = AsyncSessionLocal()
+    db.info["request_state"] = request.scope.setdefault("state", {})
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_async_read_db(request: Request):
+    """Como ``get_sync_read_db``, com AsyncSession"""
+    db = AsyncSessionLocal(bind=async_replica_router.engine_for(primary_until(request)))
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+# Dependencies das rotas, no modo escolhido por DATABASE_ASYNC
+get_db = get_async_db if settings.DATABASE_ASYNC else get_sync_db
+get_read_db = get_async_read_db if settings.DATABASE_ASYNC else get_sync_read_db
+
+
+async def run_db(db: DbSession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Executa ``fn(session, *args)`` com a sessão do request.
+
+    Com AsyncSession, ``fn`` roda via ``run_sync``: o mesmo código dos
+    services síncronos, com o I/O no driver assíncrono (o event loop segue
+    livre durante as queries). Com Session, ``fn`` é chamada diretamente.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return fn(db, *args, **kwargs)
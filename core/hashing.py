@@ -0,0 +1,195 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+
+from fastapi import HTTPException, status
+
+from core.config import settings
+
+# Intervalo entre tentativas de obter vaga no pool em operações em lote
+BATCH_POLL_SECONDS = 0.01
+
+
+def _noop() -> None:
+    return None
+
+
+def _timed_call(fn: Callable, *args) -> tuple:
+    """Executa a função no worker e devolve (início, duração, resultado)"""
+    started_at = time.monotonic()
+    result = fn(*args)
+    return started_at, time.monotonic() - started_at, result
+
+
+class PasswordHasher:
+    """Pool limitado de workers para operações de hashing de senha.
+
+    O bcrypt é intencionalmente lento (~250 ms), então ele roda fora do
+    event loop. Quando há mais trabalhos pendentes do que
+    ``workers + max_queue`` o pedido é rejeitado com 503 e ``Retry-After``.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue: int = 64,
+        executor: str = "thread",
+        retry_after: int = 1
+    ):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Invalid password hash executor: {executor}")
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.executor_type = executor
+        self.retry_after = retry_after
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    @property
+    def capacity(self) -> int:
+        """Número máximo de trabalhos em execução + na fila"""
+        return self.workers + self.max_queue
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Trabalhos aguardando um worker livre"""
+        return max(0, self._in_flight - self.workers)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.executor_type == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers,
+                            thread_name_prefix="password-hasher"
+                        )
+        return self._executor
+
+    def _try_acquire(self) -> bool:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                return False
+            self._in_flight += 1
+            self.submitted += 1
+            return True
+
+    def _acquire(self) -> None:
+        if not self._try_acquire():
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Password hashing service is busy, try again later",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+    def _release(self, submitted_at: float, future: Future) -> None:
+        """Libera a vaga quando o worker termina (mesmo que o request tenha sido cancelado)"""
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+                return
+            started_at, duration, _ = future.result()
+            self.completed += 1
+            self._wait_seconds += max(0.0, started_at - submitted_at)
+            self._run_seconds += duration
+
+    async def _submit(self, fn: Callable, *args) -> Any:
+        """Executa no pool uma tarefa que já ocupa uma vaga.
+
+        A vaga é liberada no callback do future do executor, não aqui: se o
+        request for cancelado (cliente desconectou, ``wait_for``, shutdown),
+        ela continua ocupada enquanto o worker ainda estiver executando.
+        """
+        submitted_at = time.monotonic()
+        try:
+            future = self._get_executor().submit(_timed_call, fn, *args)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+                self.failed += 1
+            raise
+        future.add_done_callback(functools.partial(self._release, submitted_at))
+        _, _, result = await asyncio.wrap_future(future)
+        return result
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Executa ``fn(*args)`` no pool, aplicando backpressure"""
+        self._acquire()
+        return await self._submit(fn, *args)
+
+    async def run_many(self, fn: Callable, args_list: Sequence[tuple]) -> List[Any]:
+        """Executa ``fn`` para cada tupla de argumentos, em paralelo.
+
+        Usado em lotes: no máximo ``workers`` tarefas do lote ocupam o pool
+        ao mesmo tempo e, em vez de rejeitar com 503, aguarda vaga livre.
+        """
+        results: List[Any] = [None] * len(args_list)
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def worker(index: int, args: tuple) -> None:
+            async with semaphore:
+                while not self._try_acquire():
+                    await asyncio.sleep(BATCH_POLL_SECONDS)
+                results[index] = await self._submit(fn, *args)
+
+        await asyncio.gather(*(worker(i, args) for i, args in enumerate(args_list)))
+        return results
+
+    def warm_up(self) -> None:
+        """Cria o pool e inicia os workers antes do primeiro request"""
+        executor = self._get_executor()
+        for future in [executor.submit(_noop) for _ in range(self.workers)]:
+            future.result()
+
+    def stats(self) -> dict:
+        """Métricas do pool de hashing"""
+        with self._lock:
+            completed = self.completed
+            return {
+                "executor": self.executor_type,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.workers),
+                "submitted": self.submitted,
+                "completed": completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": (self._wait_seconds / completed * 1000) if completed else 0.0,
+                "avg_run_ms": (self._run_seconds / completed * 1000) if completed else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Encerra o pool (é recriado sob demanda no próximo uso)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+    retry_after=settings.PASSWORD_HASH_RETRY_AFTER,
+)
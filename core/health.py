@@ -0,0 +1,134 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from sqlalchemy.engine import Engine
+
+from core.config import settings
+from core.database import database_engines, pool_stats
+from core.hashing import password_hasher
+
+# Threads dedicadas aos pings: um banco travado ocupa no máximo estas
+# threads, sem consumir o threadpool dos handlers
+PING_WORKERS = 2
+
+
+def ping_database(db_engine: Engine) -> None:
+    with db_engine.connect() as conn:
+        conn.exec_driver_sql("SELECT 1")
+
+
+def check_pool(db_engine: Engine) -> dict:
+    """Ocupação do pool: ``saturated`` acima de HEALTH_POOL_MAX_UTILIZATION"""
+    stats = pool_stats(db_engine)
+    if "size" not in stats:
+        # Pools sem limite (ex.: SQLite em memória)
+        return {"status": "ok"}
+    capacity = stats["size"] + stats["max_overflow"]
+    utilization = stats["checked_out"] / capacity if capacity else 1.0
+    saturated = utilization >= settings.HEALTH_POOL_MAX_UTILIZATION
+    return {
+        "status": "saturated" if saturated else "ok",
+        "checked_out": stats["checked_out"],
+        "capacity": capacity,
+        "utilization": round(utilization, 3),
+    }
+
+
+def check_password_hasher() -> dict:
+    """Fila do pool de hashing: ``overloaded`` acima de HEALTH_HASHER_MAX_QUEUE_RATIO"""
+    stats = password_hasher.stats()
+    if stats["max_queue"] == 0:
+        # Sem fila: sobrecarregado quando todos os workers estão ocupados
+        overloaded = stats["in_flight"] >= stats["workers"]
+    else:
+        overloaded = stats["queue_depth"] >= stats["max_queue"] * settings.HEALTH_HASHER_MAX_QUEUE_RATIO
+    return {
+        "status": "overloaded" if overloaded else "ok",
+        "queue_depth": stats["queue_depth"],
+        "max_queue": stats["max_queue"],
+    }
+
+
+class ReadinessProbe:
+    """Checagens de prontidão com resultado em cache.
+
+    Probes concorrentes dentro de ``cache_seconds`` recebem o mesmo
+    resultado, e só uma checagem roda por vez: o probe nunca multiplica a
+    carga sobre o banco, mesmo com vários balanceadores consultando.
+    """
+
+    def __init__(self, cache_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.cache_seconds = cache_seconds
+        self._clock = clock
+        self._lock: Optional[asyncio.Lock] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._result: Optional[dict] = None
+        self._checked_at = 0.0
+
+    def _cached(self) -> Optional[dict]:
+        if self._result is not None and self._clock() - self._checked_at < self.cache_seconds:
+            return self._result
+        return None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=PING_WORKERS, thread_name_prefix="health")
+        return self._executor
+
+    async def _check_database(self, db_engine: Engine) -> dict:
+        started_at = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(
+                loop.run_in_executor(self._get_executor(), ping_database, db_engine),
+                timeout=settings.HEALTH_DB_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            return {"status": "timeout"}
+        except Exception as exc:
+            return {"status": "error", "error": type(exc).__name__}
+        return {"status": "ok", "latency_ms": round((time.perf_counter() - started_at) * 1000, 2)}
+
+    async def _run_checks(self) -> dict:
+        checks = {}
+        for name, db_engine in database_engines():
+            pool = check_pool(db_engine)
+            checks[f"pool:{name}"] = pool
+            # Com o pool esgotado o ping só esperaria na fila do pool
+            checks[f"database:{name}"] = (
+                await self._check_database(db_engine) if pool["status"] == "ok"
+                else {"status": "skipped"}
+            )
+        checks["password_hasher"] = check_password_hasher()
+        ready = all(check["status"] == "ok" for check in checks.values())
+        return {"status": "ready" if ready else "not_ready", "checks": checks}
+
+    async def check(self) -> dict:
+        cached = self._cached()
+        if cached is not None:
+            return cached
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            cached = self._cached()
+            if cached is not None:
+                return cached
+            self._result = await self._run_checks()
+            self._checked_at = self._clock()
+            return self._result
+
+    def clear(self) -> None:
+        self._result = None
+        self._checked_at = 0.0
+        self._lock = None
+
+    def shutdown(self) -> None:
+        """Libera as threads de ping (um ping travado não segura o shutdown)"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+readiness_probe = ReadinessProbe(cache_seconds=settings.HEALTH_CACHE_SECONDS)
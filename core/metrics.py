@@ -0,0 +1,391 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from apps.auth.usernames import username_filter
+from core.config import settings
+from core.database import database_engines, pool_stats
+from core.hashing import password_hasher
+from core.queries import query_metrics
+from core.ratelimit import login_rate_limiter
+from core.routing import route_method, route_template
+from core.security import principal_cache, token_cache
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+SNAPSHOT_PREFIX = "metrics-"
+
+# (nome da amostra, labels ordenados) -> valor
+SampleKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class MetricFamily:
+    """Métrica no formato de exposição do Prometheus (HELP, TYPE e amostras)"""
+
+    def __init__(self, name: str, kind: str, documentation: str):
+        self.name = name
+        self.kind = kind
+        self.documentation = documentation
+        self.samples: Dict[SampleKey, float] = {}
+
+    def add(self, value: float, suffix: str = "", **labels) -> None:
+        key = (self.name + suffix, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        self.samples[key] = self.samples.get(key, 0) + value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(families: Iterable[MetricFamily]) -> str:
+    """Texto no formato de exposição 0.0.4"""
+    lines: List[str] = []
+    for family in families:
+        lines.append(f"# HELP {family.name} {family.documentation}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for (sample_name, labels), value in family.samples.items():
+            if labels:
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                lines.append(f"{sample_name}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{sample_name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class LatencyHistogram:
+    """Histograma com contagens por bucket pré-alocadas.
+
+    ``observe`` só incrementa posições da lista: nenhuma alocação por
+    request. As contagens cumulativas são calculadas apenas na coleta.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def export(self, family: MetricFamily, **labels) -> None:
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            family.add(cumulative, "_bucket", le=_format_value(bound), **labels)
+        family.add(self.sum, "_sum", **labels)
+        family.add(self.count, "_count", **labels)
+
+
+class RouteMetrics:
+    """Latência e contagem por status de uma rota (método + template)"""
+
+    __slots__ = ("histogram", "statuses")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.histogram = LatencyHistogram(buckets)
+        self.statuses: Dict[int, int] = {}
+
+    def record(self, status_code: int, seconds: float) -> None:
+        self.histogram.observe(seconds)
+        self.statuses[status_code] = self.statuses.get(status_code, 0) + 1
+
+
+class HttpMetrics:
+    """Métricas HTTP do processo, por método e template da rota.
+
+    As séries são criadas no startup para todas as rotas do OpenAPI (e sob
+    demanda para as demais); paths sem rota caem em ``<unmatched>`` e
+    métodos não padrão em ``OTHER``, então a cardinalidade fica limitada ao
+    número de rotas.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self._routes: Dict[str, Dict[str, RouteMetrics]] = {}
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def route(self, method: str, template: str) -> RouteMetrics:
+        by_template = self._routes.get(method)
+        metrics = by_template.get(template) if by_template is not None else None
+        if metrics is None:
+            with self._lock:
+                metrics = self._routes.setdefault(method, {}).setdefault(
+                    template, RouteMetrics(self.buckets)
+                )
+        return metrics
+
+    def preallocate(self, app) -> None:
+        """Cria as séries de todas as rotas documentadas no OpenAPI"""
+        for path, operations in app.openapi().get("paths", {}).items():
+            for method in operations:
+                self.route(method.upper(), path)
+
+    def collect(self) -> List[MetricFamily]:
+        requests = MetricFamily("http_requests_total", "counter", "HTTP requests by route and status")
+        duration = MetricFamily("http_request_duration_seconds", "histogram", "HTTP request latency by route")
+        in_progress = MetricFamily("http_requests_in_progress", "gauge", "HTTP requests being served")
+        with self._lock:
+            routes = [
+                (method, template, metrics)
+                for method, by_template in self._routes.items()
+                for template, metrics in by_template.items()
+            ]
+        for method, template, metrics in sorted(routes, key=lambda item: item[:2]):
+            metrics.histogram.export(duration, method=method, route=template)
+            for status_code, count in sorted(metrics.statuses.items()):
+                requests.add(count, method=method, route=template, status=status_code)
+        in_progress.add(self.in_flight)
+        return [requests, duration, in_progress]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+        self.in_flight = 0
+
+
+http_metrics = HttpMetrics(settings.METRICS_LATENCY_BUCKETS)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede latência, status e requests em andamento"""
+
+    def __init__(self, app, metrics: Optional[HttpMetrics] = None):
+        self.app = app
+        self.metrics = metrics or http_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            metrics.in_flight -= 1
+            metrics.route(route_method(scope), route_template(scope)).record(status_code, elapsed)
+
+
+def _family(name: str, kind: str, documentation: str, values: Iterable[Tuple[float, dict]]) -> MetricFamily:
+    family = MetricFamily(name, kind, documentation)
+    for value, labels in values:
+        family.add(value, **labels)
+    return family
+
+
+def collect_application_metrics() -> List[MetricFamily]:
+    """Estatísticas já mantidas pelos componentes: pools, hashing, caches e limites"""
+    pools = [(name, pool_stats(db_engine)) for name, db_engine in database_engines()]
+    hasher = password_hasher.stats()
+    logins = login_rate_limiter.stats()
+    caches = [("token", token_cache.stats()), ("principal", principal_cache.stats())]
+    usernames = username_filter.stats()
+    queries = [(route.split(" ", 1), entry) for route, entry in query_metrics.snapshot().items()]
+
+    return [
+        _family("db_pool_connections", "gauge", "Database pool connections by state", [
+            (stats[state], {"database": name, "state": state})
+            for name, stats in pools
+            for state in ("checked_out", "checked_in", "overflow")
+            if state in stats
+        ]),
+        _family("db_pool_size", "gauge", "Database pool base size", [
+            (stats["size"], {"database": name}) for name, stats in pools if "size" in stats
+        ]),
+        _family("db_pool_checkouts_total", "counter", "Database pool checkouts", [
+            (stats["checkouts"], {"database": name}) for name, stats in pools if "checkouts" in stats
+        ]),
+        _family("db_pool_timeouts_total", "counter", "Database pool checkout timeouts", [
+            (stats["timeouts"], {"database": name}) for name, stats in pools if "timeouts" in stats
+        ]),
+        _family("db_pool_wait_seconds_total", "counter", "Time spent waiting for a pooled connection", [
+            (stats["wait_seconds"], {"database": name}) for name, stats in pools if "wait_seconds" in stats
+        ]),
+        _family("db_queries_total", "counter", "SQL statements executed by route", [
+            (entry["queries"], {"method": method, "route": route}) for (method, route), entry in queries
+        ]),
+        _family("db_query_duration_seconds_total", "counter", "Time spent in SQL statements by route", [
+            (entry["db_time_ms"] / 1000, {"method": method, "route": route}) for (method, route), entry in queries
+        ]),
+        _family("db_duplicate_queries_total", "counter", "Repeated SQL statements (possible N+1) by route", [
+            (entry["duplicate_queries"], {"method": method, "route": route}) for (method, route), entry in queries
+        ]),
+        _family("password_hasher_in_flight", "gauge", "Password hashing jobs running or queued", [
+            (hasher["in_flight"], {})
+        ]),
+        _family("password_hasher_queue_depth", "gauge", "Password hashing jobs waiting for a worker", [
+            (hasher["queue_depth"], {})
+        ]),
+        _family("password_hasher_jobs_total", "counter", "Password hashing jobs by result", [
+            (hasher[result], {"result": result}) for result in ("completed", "failed", "rejected")
+        ]),
+        _family("login_attempts_total", "counter", "Login attempts by rate limiter decision", [
+            (logins[result], {"result": result}) for result in ("allowed", "rejected_ip", "rejected_username")
+        ]),
+        _family("cache_requests_total", "counter", "Cache lookups by result", [
+            (stats[key], {"cache": name, "result": result})
+            for name, stats in caches
+            for result, key in (("hit", "hits"), ("miss", "misses"))
+        ]),
+        _family("cache_evictions_total", "counter", "Cache entries evicted by size", [
+            (stats["evictions"], {"cache": name}) for name, stats in caches
+        ]),
+        _family("cache_entries", "gauge", "Cache entries", [
+            (stats["size"], {"cache": name}) for name, stats in caches
+        ]),
+        _family("username_filter_items", "gauge", "Usernames loaded in the login bloom filter", [
+            (usernames["items"], {})
+        ]),
+        _family("username_filter_negatives_total", "counter", "Logins rejected by the username filter", [
+            (usernames["negatives"], {})
+        ]),
+    ]
+
+
+def collect() -> List[MetricFamily]:
+    """Todas as métricas deste processo"""
+    return http_metrics.collect() + collect_application_metrics()
+
+
+def _serialize(families: List[MetricFamily]) -> dict:
+    return {
+        family.name: {
+            "type": family.kind,
+            "help": family.documentation,
+            "samples": [[name, [list(label) for label in labels], value]
+                        for (name, labels), value in family.samples.items()],
+        }
+        for family in families
+    }
+
+
+def merge(own: List[MetricFamily], snapshots: List[Tuple[dict, bool]]) -> List[MetricFamily]:
+    """Soma as métricas deste processo com os snapshots dos outros workers.
+
+    Contadores e histogramas de workers encerrados continuam somados (não
+    regridem); gauges só entram quando o snapshot é recente (``fresh``).
+    """
+    families = {family.name: family for family in own}
+    for data, fresh in snapshots:
+        for name, serialized in data.items():
+            if serialized["type"] == "gauge" and not fresh:
+                continue
+            family = families.get(name)
+            if family is None:
+                family = families[name] = MetricFamily(name, serialized["type"], serialized["help"])
+            for sample_name, labels, value in serialized["samples"]:
+                key = (sample_name, tuple(tuple(label) for label in labels))
+                family.samples[key] = family.samples.get(key, 0) + value
+    return list(families.values())
+
+
+class SnapshotStore:
+    """Snapshots das métricas de cada worker em um diretório compartilhado.
+
+    Cada processo grava ``metrics-<pid>.json`` periodicamente; o worker que
+    atende ``/metrics`` soma os próprios números (ao vivo) aos arquivos dos
+    demais. Limpe o diretório a cada deploy: arquivos de workers antigos
+    mantêm seus contadores na soma.
+    """
+
+    def __init__(self, directory: str, interval: float, pid: Optional[int] = None):
+        self.directory = Path(directory)
+        self.interval = interval
+        self._pid = pid
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def path(self) -> Path:
+        # pid lido no uso: o módulo pode ter sido importado antes do fork
+        pid = self._pid if self._pid is not None else os.getpid()
+        return self.directory / f"{SNAPSHOT_PREFIX}{pid}.json"
+
+    def write(self, families: Optional[List[MetricFamily]] = None) -> None:
+        """Grava o snapshot deste processo (escrita atômica)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = {"written_at": time.time(), "families": _serialize(families or collect())}
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data))
+        os.replace(tmp_path, self.path)
+
+    def read_others(self) -> List[Tuple[dict, bool]]:
+        """Snapshots dos outros workers, com indicação de frescor"""
+        snapshots = []
+        stale_before = time.time() - 3 * self.interval
+        for path in sorted(self.directory.glob(f"{SNAPSHOT_PREFIX}*.json")):
+            if path == self.path:
+                continue
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                # Arquivo removido ou incompleto: entra na próxima coleta
+                continue
+            snapshots.append((data["families"], data["written_at"] >= stale_before))
+        return snapshots
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as exc:
+                logger.warning("Failed to write metrics snapshot: %s", exc)
+
+    def start(self) -> None:
+        self.write()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write()
+
+
+snapshot_store: Optional[SnapshotStore] = (
+    SnapshotStore(settings.METRICS_MULTIPROC_DIR, settings.METRICS_SNAPSHOT_SECONDS)
+    if settings.METRICS_MULTIPROC_DIR else None
+)
+
+
+def generate_latest(store: Optional[SnapshotStore] = None) -> str:
+    """Métricas de todos os workers (ou só deste processo) em texto"""
+    store = store if store is not None else snapshot_store
+    families = collect()
+    if store is not None:
+        families = merge(families, store.read_others())
+    return render(families)
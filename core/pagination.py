@@ -0,0 +1,54 @@
+import base64
+import binascii
+import json
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+# Header com o cursor da próxima página (o corpo continua sendo uma lista)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: dict) -> str:
+    """Codifica a posição da última linha da página em um cursor opaco"""
+    raw = json.dumps(position, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[dict]:
+    """Decodifica um cursor gerado por encode_cursor"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error, UnicodeError):
+        position = None
+    if not isinstance(position, dict):
+        raise invalid_cursor()
+    return position
+
+
+def keyset_condition(sort_column, id_column, sort_value, last_id: int, descending: bool = False):
+    """Condição de keyset para ordenação por (sort_column, id_column).
+
+    Equivale a ``(sort_column, id) > (sort_value, last_id)`` (ou ``<`` em
+    ordem decrescente), escrita com OR para funcionar em qualquer banco.
+    """
+    if descending:
+        return or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < last_id)
+        )
+    return or_(
+        sort_column > sort_value,
+        and_(sort_column == sort_value, id_column > last_id)
+    )
@@ -0,0 +1,182 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from core.config import settings
+from core.routing import route_method, route_template
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Query-Time-Ms"
+QUERY_DUPLICATES_HEADER = "X-DB-Duplicate-Queries"
+
+
+class QueryStats:
+    """Statements SQL executados em um escopo (request, bloco de teste).
+
+    Escopos aninhados repassam cada statement ao escopo externo.
+    """
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+        if self.parent is not None:
+            self.parent.record(statement, seconds)
+
+    @property
+    def duplicates(self) -> int:
+        """Execuções repetidas do mesmo statement (sinal de N+1)"""
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+    def most_repeated(self) -> Tuple[Optional[str], int]:
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Conta os statements executados no bloco (inclusive em threads do threadpool)"""
+    stats = QueryStats(parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started = conn.info.get("query_started_at")
+    if stats is None or not started:
+        return
+    stats.record(statement, time.perf_counter() - started.pop())
+
+
+def _handle_error(context):
+    started = context.connection.info.get("query_started_at") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engines(target=Engine) -> None:
+    """Registra os listeners de contagem (por padrão, em todos os engines)"""
+    for name, listener in (
+        ("before_cursor_execute", _before_cursor_execute),
+        ("after_cursor_execute", _after_cursor_execute),
+        ("handle_error", _handle_error),
+    ):
+        if not event.contains(target, name, listener):
+            event.listen(target, name, listener)
+
+
+class QueryMetrics:
+    """Agregado de queries por rota (método + template da rota)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, dict] = {}
+
+    def observe(self, route: str, stats: QueryStats) -> None:
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = {
+                    "requests": 0,
+                    "queries": 0,
+                    "max_queries": 0,
+                    "db_time_ms": 0.0,
+                    "duplicate_queries": 0,
+                    "requests_with_duplicates": 0,
+                }
+            entry["requests"] += 1
+            entry["queries"] += stats.count
+            entry["max_queries"] = max(entry["max_queries"], stats.count)
+            entry["db_time_ms"] += stats.seconds * 1000
+            entry["duplicate_queries"] += stats.duplicates
+            if stats.duplicates:
+                entry["requests_with_duplicates"] += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Métricas por rota, com a média de queries por request"""
+        with self._lock:
+            return {
+                route: {**entry, "avg_queries": entry["queries"] / entry["requests"]}
+                for route, entry in sorted(self._routes.items())
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+query_metrics = QueryMetrics()
+
+
+class QueryCountMiddleware:
+    """Middleware ASGI que conta as queries de cada request.
+
+    Agrega os números em ``query_metrics``; em modo DEBUG também os expõe
+    nos headers da resposta. Requests com statements repetidos acima de
+    QUERY_DUPLICATE_WARN_THRESHOLD geram um warning com o statement.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_with_headers(message):
+                if message["type"] == "http.response.start" and settings.DEBUG:
+                    headers = MutableHeaders(scope=message)
+                    headers[QUERY_COUNT_HEADER] = str(stats.count)
+                    headers[QUERY_TIME_HEADER] = f"{stats.seconds * 1000:.2f}"
+                    headers[QUERY_DUPLICATES_HEADER] = str(stats.duplicates)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_headers)
+            finally:
+                route = f"{route_method(scope)} {route_template(scope)}"
+                query_metrics.observe(route, stats)
+                if stats.duplicates >= settings.QUERY_DUPLICATE_WARN_THRESHOLD:
+                    statement, times = stats.most_repeated()
+                    logger.warning(
+                        "Possible N+1 on %s: %d queries, statement repeated %d times: %s",
+                        route, stats.count, times, statement
+                    )
+
+
+instrument_engines()
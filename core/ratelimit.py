@@ -0,0 +1,265 @@
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+
+from core.config import settings
+
+# Máximo de chaves mantidas em memória (LRU)
+MAX_TRACKED_KEYS = 100000
+
+# (permitido, segundos até a próxima tentativa permitida)
+Decision = Tuple[bool, float]
+
+
+class RateLimitBackend(ABC):
+    """Contador de tentativas por chave"""
+
+    name: str
+    # Faz I/O bloqueante (ex.: rede): roda no threadpool, fora do event loop
+    blocking = False
+
+    @abstractmethod
+    def hit(self, key: str, limit: int, window: float) -> Decision:
+        """Registra uma tentativa e informa se ela está dentro do limite"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Descarta os contadores"""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Token bucket em memória, por processo.
+
+    Cada chave tem até ``limit`` tokens, repostos continuamente à taxa de
+    ``limit / window`` por segundo; cada tentativa consome um token.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = MAX_TRACKED_KEYS, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, window: float) -> Decision:
+        rate = limit / window
+        now = self._clock()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (float(limit), now))
+            tokens = min(float(limit), tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class InMemoryStore:
+    """Substituto local de um store compartilhado (mesma interface do RedisStore)"""
+
+    blocking = False
+
+    def __init__(self, max_keys: int = MAX_TRACKED_KEYS, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def incr(self, key: str, ttl: int) -> int:
+        now = self._clock()
+        with self._lock:
+            count, expires_at = self._data.get(key, (0, now + ttl))
+            if expires_at <= now:
+                count = 0
+            count += 1
+            self._data[key] = (count, now + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+            return count
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= self._clock():
+                return 0
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class RedisStore:
+    """Adapta um cliente redis-py (ou compatível) à interface de store"""
+
+    # Cada operação é uma ida e volta síncrona ao Redis
+    blocking = True
+
+    def __init__(self, client):
+        self._client = client
+
+    def incr(self, key: str, ttl: int) -> int:
+        pipeline = self._client.pipeline()
+        pipeline.incr(key)
+        pipeline.expire(key, ttl)
+        count, _ = pipeline.execute()
+        return int(count)
+
+    def get(self, key: str) -> int:
+        value = self._client.get(key)
+        return int(value) if value is not None else 0
+
+    def clear(self) -> None:
+        # Em um store compartilhado as chaves expiram sozinhas (TTL)
+        return None
+
+
+class SharedStoreRateLimitBackend(RateLimitBackend):
+    """Sliding window counter sobre um store compartilhado entre processos.
+
+    Usa só INCR com TTL e GET (atômicos no Redis): a contagem estimada é a
+    janela atual mais a anterior, ponderada pela fração ainda sobreposta.
+    """
+
+    name = "store"
+
+    def __init__(self, store, clock: Callable[[], float] = time.time):
+        self.store = store
+        self.blocking = store.blocking
+        self._clock = clock
+
+    def hit(self, key: str, limit: int, window: float) -> Decision:
+        now = self._clock()
+        window_id = int(now // window)
+        elapsed = now - window_id * window
+        ttl = math.ceil(window * 2)
+        current = self.store.incr(f"{key}:{window_id}", ttl)
+        previous = self.store.get(f"{key}:{window_id - 1}")
+        estimated = previous * (1 - elapsed / window) + current
+        if estimated <= limit:
+            return True, 0.0
+        return False, window - elapsed
+
+    def clear(self) -> None:
+        self.store.clear()
+
+
+def build_rate_limit_backend() -> RateLimitBackend:
+    """Cria o backend configurado em RATE_LIMIT_BACKEND"""
+    backend = settings.RATE_LIMIT_BACKEND
+    if backend == "memory":
+        return MemoryRateLimitBackend()
+    if backend == "store":
+        return SharedStoreRateLimitBackend(InMemoryStore())
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the redis package")
+        client = redis.Redis.from_url(settings.RATE_LIMIT_REDIS_URL)
+        return SharedStoreRateLimitBackend(RedisStore(client))
+    raise ValueError(f"Unknown rate limit backend: {backend}")
+
+
+def client_ip(request: Request) -> str:
+    """IP do cliente (primeiro X-Forwarded-For, se configurado como confiável)"""
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class LoginRateLimiter:
+    """Limita tentativas de login por username e por IP, antes do bcrypt"""
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        username_limit: int,
+        ip_limit: int,
+        window: float,
+        enabled: bool = True
+    ):
+        self.backend = backend
+        self.username_limit = username_limit
+        self.ip_limit = ip_limit
+        self.window = window
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected_ip = 0
+        self.rejected_username = 0
+
+    def check(self, username: str, ip: str) -> None:
+        """Registra a tentativa; levanta 429 com Retry-After acima do limite"""
+        if not self.enabled:
+            return
+        allowed, retry_after = self.backend.hit(f"login:ip:{ip}", self.ip_limit, self.window)
+        if allowed:
+            allowed, retry_after = self.backend.hit(
+                f"login:user:{username.lower()}", self.username_limit, self.window
+            )
+            rejected_by = "username"
+        else:
+            rejected_by = "ip"
+
+        with self._lock:
+            if allowed:
+                self.allowed += 1
+            elif rejected_by == "ip":
+                self.rejected_ip += 1
+            else:
+                self.rejected_username += 1
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts, try again later",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+    async def check_async(self, username: str, ip: str) -> None:
+        """``check`` para handlers async: backends bloqueantes rodam no threadpool"""
+        if self.enabled and self.backend.blocking:
+            await run_in_threadpool(self.check, username, ip)
+        else:
+            self.check(username, ip)
+
+    def stats(self) -> dict:
+        """Contadores de tentativas permitidas e rejeitadas"""
+        with self._lock:
+            return {
+                "backend": self.backend.name,
+                "allowed": self.allowed,
+                "rejected_ip": self.rejected_ip,
+                "rejected_username": self.rejected_username,
+            }
+
+    def reset(self) -> None:
+        self.backend.clear()
+        with self._lock:
+            self.allowed = self.rejected_ip = self.rejected_username = 0
+
+
+login_rate_limiter = LoginRateLimiter(
+    build_rate_limit_backend(),
+    username_limit=settings.LOGIN_RATE_LIMIT_USERNAME,
+    ip_limit=settings.LOGIN_RATE_LIMIT_IP,
+    window=settings.LOGIN_RATE_LIMIT_WINDOW,
+    enabled=settings.RATE_LIMIT_ENABLED,
+)
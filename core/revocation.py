@@ -0,0 +1,38 @@
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from apps.auth.models import User
+from core.cache import TTLCache
+from core.config import settings
+
+# Versão de token por user id, lida de users.token_version.
+#
+# Tokens stateless carregam a versão vigente no claim ``ver``. Quando role,
+# status, username ou senha mudam, a coluna é incrementada no mesmo commit e
+# tokens emitidos antes disso deixam de ser aceitos. O banco é a fonte da
+# verdade, então todos os workers enxergam a mesma versão e ela sobrevive a
+# restarts; o cache só evita o SELECT por request. O worker que revoga
+# invalida a própria entrada, os demais veem a nova versão após
+# TOKEN_VERSION_CACHE_TTL segundos.
+token_versions = TTLCache(
+    maxsize=settings.TOKEN_VERSION_CACHE_SIZE,
+    ttl=settings.TOKEN_VERSION_CACHE_TTL
+)
+
+
+def current_token_version(db: Session, user_id: int) -> Optional[int]:
+    """Versão atual de token do usuário, ou None se ele não existe mais"""
+    version = token_versions.get(user_id)
+    if version is None:
+        version = db.query(User.token_version).filter(User.id == user_id).scalar()
+        if version is None:
+            return None
+        token_versions.set(user_id, version)
+    return version
+
+
+def is_current(db: Session, user_id: int, version: int) -> bool:
+    """Verifica se um token com a versão informada ainda é válido"""
+    current = current_token_version(db, user_id)
+    return current is not None and version >= current
@@ -0,0 +1,45 @@
+import threading
+from typing import Dict
+
+UNMATCHED_ROUTE = "<unmatched>"
+# Métodos fora desta lista viram OTHER nos labels (cardinalidade limitada)
+STANDARD_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+OTHER_METHOD = "OTHER"
+
+# Prefixo (prefix do include_router) já resolvido para cada rota
+_route_prefixes: Dict[int, str] = {}
+_lock = threading.Lock()
+
+
+def route_template(scope) -> str:
+    """Template completo da rota do request (``/api/v1/users/{user_id}``).
+
+    Usa a rota registrada no scope pelo roteamento (chamar após o app),
+    nunca o path bruto, para não criar uma série por id. Rotas de routers
+    incluídos guardam o path sem o prefixo; o prefixo é resolvido uma vez
+    por rota.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    path = scope["path"]
+    prefix = _route_prefixes.get(id(route))
+    if prefix is not None and path.startswith(prefix) and route.path_regex.match(path[len(prefix):]):
+        return prefix + template
+    for index, char in enumerate(path):
+        if char == "/" and route.path_regex.match(path[index:]):
+            with _lock:
+                _route_prefixes[id(route)] = path[:index]
+            return path[:index] + template
+    return template
+
+
+def route_method(scope) -> str:
+    """Método HTTP do request para labels.
+
+    O método vem do cliente: valores fora de ``STANDARD_METHODS`` são
+    agrupados em ``OTHER`` para não criar séries arbitrárias.
+    """
+    method = scope["method"]
+    return method if method in STANDARD_METHODS else OTHER_METHOD
@@ -1,20 +1,103 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Optional
-from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
 from core.config import settings
-from core.database import get_db
+from core.database import DbSession, get_db, run_db
+from core.cache import TTLCache
+from core.hashing import password_hasher
+from core.revocation import is_current, token_versions
+from core.tokens import InvalidTokenError, build_token_backend
 from apps.auth.models import User, UserRole
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+# Backend de tokens (algoritmo e chaves carregados uma vez, no startup)
+token_backend = build_token_backend()
+
+# Principals recentes por user id; invalidado pelo UserService a cada escrita.
+# Com vários workers, uma alteração feita em outro processo só é vista após o TTL.
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL
+)
+
+# Claims de tokens já verificados, por sha256 do token; cada entrada expira
+# junto com o token (claim exp)
+token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Snapshot imutável do usuário autenticado"""
+    id: int
+    username: str
+    role: UserRole
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            role=UserRole(user.role),
+            is_active=bool(user.is_active)
+        )
+
+
+PASSWORD_HASH_SCHEMES = ("bcrypt", "scrypt")
+SCRYPT_PREFIX = "$scrypt$"
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode('utf-8'),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=256 * n * r * p,
+        dklen=64
+    )
+
+
+def _parse_scrypt_hash(hashed_password: str) -> Optional[tuple]:
+    """Extrai (n, r, p, salt, digest) de ``$scrypt$n=..,r=..,p=..$salt$digest``"""
+    try:
+        _, _, params, salt, digest = hashed_password.split("$")
+        values = dict(item.split("=") for item in params.split(","))
+        return (
+            int(values["n"]),
+            int(values["r"]),
+            int(values["p"]),
+            base64.b64decode(salt),
+            base64.b64decode(digest)
+        )
+    except (KeyError, ValueError):
+        return None
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifica se a senha está correta"""
+    """Verifica se a senha está correta (bcrypt ou scrypt, pelo prefixo do hash)"""
+    if hashed_password.startswith(SCRYPT_PREFIX):
+        parsed = _parse_scrypt_hash(hashed_password)
+        if parsed is None:
+            return False
+        n, r, p, salt, digest = parsed
+        return hmac.compare_digest(_scrypt(plain_password, salt, n, r, p), digest)
     return bcrypt.checkpw(
         plain_password.encode('utf-8'),
         hashed_password.encode('utf-8')
@@ -22,12 +105,83 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def get_password_hash(password: str) -> str:
-    """Gera hash da senha"""
-    salt = bcrypt.gensalt()
+    """Gera hash da senha com o esquema e o custo configurados"""
+    scheme = settings.PASSWORD_HASH_SCHEME
+    if scheme == "scrypt":
+        n, r, p = settings.SCRYPT_N, settings.SCRYPT_R, settings.SCRYPT_P
+        salt = os.urandom(16)
+        digest = _scrypt(password, salt, n, r, p)
+        salt_b64 = base64.b64encode(salt).decode()
+        digest_b64 = base64.b64encode(digest).decode()
+        return f"{SCRYPT_PREFIX}n={n},r={r},p={p}${salt_b64}${digest_b64}"
+    if scheme != "bcrypt":
+        raise ValueError(f"Unsupported password hash scheme: {scheme}")
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Indica se o hash foi gerado com esquema ou custo diferentes dos atuais"""
+    if settings.PASSWORD_HASH_SCHEME == "scrypt":
+        if not hashed_password.startswith(SCRYPT_PREFIX):
+            return True
+        parsed = _parse_scrypt_hash(hashed_password)
+        current = (settings.SCRYPT_N, settings.SCRYPT_R, settings.SCRYPT_P)
+        return parsed is None or parsed[:3] != current
+    if hashed_password.startswith(SCRYPT_PREFIX):
+        return True
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != settings.BCRYPT_ROUNDS
+
+
+# Hash de referência por (esquema, custo), usado quando o usuário não existe
+_dummy_hashes: dict = {}
+
+
+def _hash_parameters() -> tuple:
+    if settings.PASSWORD_HASH_SCHEME == "scrypt":
+        return ("scrypt", settings.SCRYPT_N, settings.SCRYPT_R, settings.SCRYPT_P)
+    return (settings.PASSWORD_HASH_SCHEME, settings.BCRYPT_ROUNDS)
+
+
+def dummy_password_hash() -> str:
+    """Hash de uma senha aleatória com o esquema e o custo atuais (gerado uma vez)"""
+    key = _hash_parameters()
+    hashed = _dummy_hashes.get(key)
+    if hashed is None:
+        hashed = _dummy_hashes[key] = get_password_hash(secrets.token_urlsafe(32))
+    return hashed
+
+
+def verify_dummy_password(plain_password: str) -> bool:
+    """Gasta o mesmo custo de uma verificação real; sempre False.
+
+    Usado no login quando o username não existe, para que a latência não
+    revele quais usuários estão cadastrados.
+    """
+    verify_password(plain_password, dummy_password_hash())
+    return False
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verifica a senha no pool de hashing, sem bloquear o event loop"""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+async def verify_dummy_password_async(plain_password: str) -> bool:
+    """verify_dummy_password no pool de hashing"""
+    return await password_hasher.run(verify_dummy_password, plain_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Gera hash da senha no pool de hashing, sem bloquear o event loop"""
+    return await password_hasher.run(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Cria token JWT"""
     to_encode = data.copy()
@@ -40,23 +194,67 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    return token_backend.encode(to_encode)
+
+
+def create_user_access_token(user: User, expires_delta: Optional[timedelta] = None) -> str:
+    """Cria token JWT com os claims usados na autenticação stateless"""
+    token_versions.set(user.id, user.token_version)
+    return create_access_token(
+        data={
+            "sub": user.id,
+            "username": user.username,
+            "role": UserRole(user.role).value,
+            "active": bool(user.is_active),
+            "ver": user.token_version,
+        },
+        expires_delta=expires_delta
+    )
 
 
 def decode_access_token(token: str) -> Optional[dict]:
-    """Decodifica token JWT"""
+    """Decodifica token JWT (a verificação é cacheada até o exp do token)"""
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return dict(payload)
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
-    except JWTError:
+        payload = token_backend.decode(token)
+    except InvalidTokenError:
         return None
+    
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        token_cache.set(key, dict(payload), ttl=exp - time.time())
+    return payload
+
+
+def _principal_from_claims(db: Session, user_id: int, payload: dict) -> Optional[Principal]:
+    """Monta o Principal a partir dos claims, se o token for stateless e vigente"""
+    if not all(claim in payload for claim in ("username", "role", "active", "ver")):
+        return None
+    try:
+        role = UserRole(payload["role"])
+    except ValueError:
+        return None
+    if not is_current(db, user_id, payload["ver"]):
+        return None
+    return Principal(
+        id=user_id,
+        username=payload["username"],
+        role=role,
+        is_active=bool(payload["active"])
+    )
+
+
+def _load_user(db: Session, user_id: int) -> Optional[User]:
+    return db.query(User).filter(User.id == user_id).first()
 
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+    db: DbSession = Depends(get_db)
+) -> Principal:
     """Obtém o usuário atual a partir do token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -78,16 +276,30 @@ async def get_current_user(
     except (ValueError, TypeError):
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Modo stateless: confia nos claims assinados; só a versão do token é
+    # conferida com o banco (em cache por TOKEN_VERSION_CACHE_TTL)
+    if settings.STATELESS_AUTH and "ver" in payload:
+        principal = await run_db(db, _principal_from_claims, user_id, payload)
+        if principal is None:
+            raise credentials_exception
+        return principal
+    
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+    
+    user = await run_db(db, _load_user, user_id)
     if user is None:
         raise credentials_exception
     
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.set(user_id, principal)
+    return principal
 
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     """Obtém o usuário ativo atual"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -96,7 +308,7 @@ async def get_current_active_user(
 
 def require_role(required_role: UserRole):
     """Dependency para verificar role do usuário"""
-    async def role_checker(current_user: User = Depends(get_current_active_user)) -> User:
+    async def role_checker(current_user: Principal = Depends(get_current_active_user)) -> Principal:
         if str(current_user.role) != str(required_role):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
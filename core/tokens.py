@@ -0,0 +1,288 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Union
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.asymmetric.utils import (
+    decode_dss_signature,
+    encode_dss_signature
+)
+from jose import JWTError, jwt as jose_jwt
+
+from core.config import settings
+
+HMAC_ALGORITHMS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+ASYMMETRIC_ALGORITHMS = ("ES256", "EdDSA")
+# Claims de data convertidos para timestamp (NumericDate) no encode
+TIME_CLAIMS = ("exp", "iat", "nbf")
+
+Key = Union[str, bytes, ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey,
+            ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey]
+
+
+class InvalidTokenError(Exception):
+    """Token malformado, com assinatura inválida ou expirado"""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    padded = data + "=" * (-len(data) % 4)
+    return base64.b64decode(padded, altchars=b"-_", validate=True)
+
+
+def _json_segment(data: dict) -> str:
+    return _b64encode(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+
+def _load_private_key(key: Key):
+    if isinstance(key, (str, bytes)):
+        pem = key.encode() if isinstance(key, str) else key
+        return serialization.load_pem_private_key(pem, password=None)
+    return key
+
+
+def _load_public_key(key: Key):
+    if isinstance(key, (str, bytes)):
+        pem = key.encode() if isinstance(key, str) else key
+        return serialization.load_pem_public_key(pem)
+    return key
+
+
+def _check_key_type(algorithm: str, public_key) -> None:
+    if algorithm == "ES256":
+        if not (isinstance(public_key, ec.EllipticCurvePublicKey)
+                and isinstance(public_key.curve, ec.SECP256R1)):
+            raise ValueError("ES256 requires a P-256 key")
+    elif not isinstance(public_key, ed25519.Ed25519PublicKey):
+        raise ValueError("EdDSA requires an Ed25519 key")
+
+
+def public_jwk(algorithm: str, public_key) -> dict:
+    """Chave pública no formato JWK, com kid = thumbprint (RFC 7638)"""
+    if algorithm == "ES256":
+        numbers = public_key.public_numbers()
+        members = {
+            "crv": "P-256",
+            "kty": "EC",
+            "x": _b64encode(numbers.x.to_bytes(32, "big")),
+            "y": _b64encode(numbers.y.to_bytes(32, "big")),
+        }
+    else:
+        raw = public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        members = {"crv": "Ed25519", "kty": "OKP", "x": _b64encode(raw)}
+    thumbprint = hashlib.sha256(json.dumps(members, separators=(",", ":"), sort_keys=True).encode()).digest()
+    return {**members, "use": "sig", "alg": algorithm, "kid": _b64encode(thumbprint)}
+
+
+def _numeric_date(value):
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return value
+
+
+def _validate_time_claims(claims: dict) -> None:
+    """Mesmas regras do python-jose para exp e nbf (sem leeway)"""
+    now = int(time.time())
+    for claim in ("exp", "nbf"):
+        if claim in claims and not isinstance(claims[claim], (int, float)):
+            raise InvalidTokenError(f"Invalid {claim} claim")
+    if "exp" in claims and claims["exp"] < now:
+        raise InvalidTokenError("Signature has expired")
+    if "nbf" in claims and claims["nbf"] > now:
+        raise InvalidTokenError("The token is not yet valid")
+
+
+class TokenBackend(ABC):
+    """Interface de emissão e verificação de tokens JWT.
+
+    ``signing_key`` é o segredo (HS*) ou a chave privada (ES256/EdDSA);
+    ``verifying_key`` é a chave pública. Um backend só com a chave pública
+    apenas verifica tokens (ex.: outro serviço validando localmente).
+    """
+
+    algorithm: str
+    public_key = None
+
+    @abstractmethod
+    def encode(self, claims: dict) -> str:
+        """Assina os claims e retorna o token"""
+
+    @abstractmethod
+    def decode(self, token: str) -> dict:
+        """Verifica o token e retorna os claims (InvalidTokenError se inválido)"""
+
+    def jwks(self) -> dict:
+        """Chaves públicas para verificação por outros serviços"""
+        if self.public_key is None:
+            return {"keys": []}
+        return {"keys": [public_jwk(self.algorithm, self.public_key)]}
+
+
+class NativeTokenBackend(TokenBackend):
+    """Backend próprio: chaves carregadas e preparadas uma única vez"""
+
+    def __init__(self, algorithm: str, signing_key: Optional[Key] = None, verifying_key: Optional[Key] = None):
+        self.algorithm = algorithm
+        self._private_key = None
+        header = {"alg": algorithm, "typ": "JWT"}
+
+        if algorithm in HMAC_ALGORITHMS:
+            secret = signing_key.encode() if isinstance(signing_key, str) else signing_key
+            if not secret:
+                raise ValueError(f"{algorithm} requires a secret key")
+            # Os pads interno/externo do HMAC são calculados aqui; cada
+            # assinatura só copia o estado inicial
+            self._hmac = hmac.new(secret, digestmod=HMAC_ALGORITHMS[algorithm])
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            if signing_key is not None:
+                self._private_key = _load_private_key(signing_key)
+            if verifying_key is not None:
+                self.public_key = _load_public_key(verifying_key)
+            elif self._private_key is not None:
+                self.public_key = self._private_key.public_key()
+            else:
+                raise ValueError(f"{algorithm} requires a private or public key")
+            _check_key_type(algorithm, self.public_key)
+            header["kid"] = public_jwk(algorithm, self.public_key)["kid"]
+        else:
+            raise ValueError(f"Unsupported token algorithm: {algorithm}")
+
+        self._header_segment = _json_segment(header)
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        if self.algorithm in HMAC_ALGORITHMS:
+            mac = self._hmac.copy()
+            mac.update(signing_input)
+            return mac.digest()
+        if self._private_key is None:
+            raise RuntimeError("Token backend has no signing key")
+        if self.algorithm == "ES256":
+            # JWS usa r || s (64 bytes) em vez da assinatura DER
+            r, s = decode_dss_signature(self._private_key.sign(signing_input, ec.ECDSA(hashes.SHA256())))
+            return r.to_bytes(32, "big") + s.to_bytes(32, "big")
+        return self._private_key.sign(signing_input)
+
+    def _verify(self, signing_input: bytes, signature: bytes) -> bool:
+        if self.algorithm in HMAC_ALGORITHMS:
+            return hmac.compare_digest(self._sign(signing_input), signature)
+        try:
+            if self.algorithm == "ES256":
+                if len(signature) != 64:
+                    return False
+                der = encode_dss_signature(
+                    int.from_bytes(signature[:32], "big"),
+                    int.from_bytes(signature[32:], "big")
+                )
+                self.public_key.verify(der, signing_input, ec.ECDSA(hashes.SHA256()))
+            else:
+                self.public_key.verify(signature, signing_input)
+        except InvalidSignature:
+            return False
+        return True
+
+    def encode(self, claims: dict) -> str:
+        payload = {
+            key: _numeric_date(value) if key in TIME_CLAIMS else value
+            for key, value in claims.items()
+        }
+        signing_input = f"{self._header_segment}.{_json_segment(payload)}"
+        signature = self._sign(signing_input.encode("ascii"))
+        return f"{signing_input}.{_b64encode(signature)}"
+
+    def decode(self, token: str) -> dict:
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+            signing_input = f"{header_segment}.{payload_segment}".encode("ascii")
+            header = json.loads(_b64decode(header_segment))
+            signature = _b64decode(signature_segment)
+        except ValueError:
+            raise InvalidTokenError("Malformed token")
+        # Só aceita o algoritmo configurado (evita confusão de algoritmos)
+        if not isinstance(header, dict) or header.get("alg") != self.algorithm:
+            raise InvalidTokenError("Unexpected token algorithm")
+        if not self._verify(signing_input, signature):
+            raise InvalidTokenError("Signature verification failed")
+        try:
+            claims = json.loads(_b64decode(payload_segment))
+        except ValueError:
+            raise InvalidTokenError("Malformed token")
+        if not isinstance(claims, dict):
+            raise InvalidTokenError("Malformed token")
+        _validate_time_claims(claims)
+        return claims
+
+
+class JoseTokenBackend(TokenBackend):
+    """Backend baseado no python-jose (implementação original)"""
+
+    def __init__(self, algorithm: str, signing_key: Optional[Key] = None, verifying_key: Optional[Key] = None):
+        if algorithm == "EdDSA":
+            raise ValueError("python-jose does not support EdDSA")
+        if algorithm not in HMAC_ALGORITHMS and algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise ValueError(f"Unsupported token algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self._signing_key = signing_key
+        self._verifying_key = verifying_key if verifying_key is not None else signing_key
+        if algorithm == "ES256":
+            self.public_key = (
+                _load_public_key(verifying_key) if verifying_key is not None
+                else _load_private_key(signing_key).public_key()
+            )
+            _check_key_type(algorithm, self.public_key)
+            # O python-jose só verifica ES256 com a chave pública
+            self._verifying_key = self.public_key.public_bytes(
+                serialization.Encoding.PEM,
+                serialization.PublicFormat.SubjectPublicKeyInfo
+            ).decode()
+
+    def encode(self, claims: dict) -> str:
+        if self._signing_key is None:
+            raise RuntimeError("Token backend has no signing key")
+        return jose_jwt.encode(claims, self._signing_key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return jose_jwt.decode(token, self._verifying_key, algorithms=[self.algorithm])
+        except JWTError as exc:
+            raise InvalidTokenError(str(exc))
+
+
+TOKEN_BACKENDS = {
+    "native": NativeTokenBackend,
+    "jose": JoseTokenBackend,
+}
+
+
+def _read_key_file(path: Optional[str]) -> Optional[bytes]:
+    return Path(path).read_bytes() if path else None
+
+
+def build_token_backend() -> TokenBackend:
+    """Cria o backend configurado, carregando as chaves uma única vez"""
+    backend_class = TOKEN_BACKENDS.get(settings.TOKEN_BACKEND)
+    if backend_class is None:
+        raise ValueError(f"Unknown token backend: {settings.TOKEN_BACKEND}")
+
+    algorithm = settings.ALGORITHM
+    if algorithm in HMAC_ALGORITHMS:
+        return backend_class(algorithm, settings.SECRET_KEY)
+    return backend_class(
+        algorithm,
+        _read_key_file(settings.JWT_PRIVATE_KEY_FILE),
+        _read_key_file(settings.JWT_PUBLIC_KEY_FILE)
+    )
@@ -1,17 +1,53 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
 from apps.auth.routes import router as auth_router
+from apps.auth.usernames import username_filter
 from apps.companies.routes import router as companies_router
 from core.config import settings
 from frontend import router as frontend_router
-from core.database import engine, Base
-Base.metadata.create_all(bind=engine)
+from core.database import ReadYourWritesMiddleware, SessionLocal, dispose_async_engines, warm_up_databases
+from core.hashing import password_hasher
+from core.health import readiness_probe
+from core.pagination import NEXT_CURSOR_HEADER
+from core.metrics import CONTENT_TYPE, MetricsMiddleware, generate_latest, http_metrics, snapshot_store
+from core.queries import QueryCountMiddleware, query_metrics
+from core.security import dummy_password_hash, token_backend
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # O schema é gerenciado pelas migrations (alembic upgrade head), executadas
+    # uma vez no deploy; aqui apenas aquecemos pools e caches
+    await run_in_threadpool(warm_up_databases)
+    await run_in_threadpool(password_hasher.warm_up)
+    # Hash de referência do login para usernames inexistentes
+    await run_in_threadpool(dummy_password_hash)
+    app.openapi()
+    http_metrics.preallocate(app)
+    if snapshot_store is not None:
+        snapshot_store.start()
+    # Filtro de usernames do login: carga e reconstruções fora do event loop
+    username_filter.start(SessionLocal)
+    yield
+    username_filter.stop()
+    if snapshot_store is not None:
+        snapshot_store.stop()
+    # Encerra o pool de hashing de senhas e as threads do probe de prontidão
+    password_hasher.shutdown()
+    readiness_probe.shutdown()
+    await dispose_async_engines()
+
 
 app = FastAPI(
     title="Rapier Auth API",
     description="API com sistema de autenticação e múltiplos apps",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS
@@ -21,7 +57,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+# Cookie de read-your-writes após commits (leituras no primário, em qualquer worker)
+app.add_middleware(ReadYourWritesMiddleware)
+# Contagem de queries por request (headers X-DB-* apenas com DEBUG)
+app.add_middleware(QueryCountMiddleware)
+# Latência por rota, status e requests em andamento (GET /metrics)
+app.add_middleware(MetricsMiddleware)
 
 # Routers
 app.include_router(auth_router, prefix="/api/v1/auth", tags=["auth"])
@@ -34,7 +77,39 @@ async def root():
     return {"message": "Rapier Auth API"}
 
 
+@app.get("/.well-known/jwks.json")
+async def jwks():
+    """Chaves públicas para outros serviços verificarem os tokens localmente"""
+    return token_backend.jwks()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas no formato de exposição do Prometheus"""
+    return PlainTextResponse(generate_latest(), media_type=CONTENT_TYPE)
+
+
+@app.get("/metrics/queries")
+async def queries_metrics():
+    """Queries SQL por rota: total, média, máximo, tempo e statements repetidos"""
+    return query_metrics.snapshot()
+
+
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
 
+
+@app.get("/health/live")
+async def health_live():
+    """Liveness: o processo responde (não consulta dependências)"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: banco, ocupação do pool e fila de hashing (resultado em cache)"""
+    result = await readiness_probe.check()
+    status_code = 200 if result["status"] == "ready" else 503
+    return JSONResponse(result, status_code=status_code)
+
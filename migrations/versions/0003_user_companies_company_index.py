@@ -0,0 +1,40 @@
+"""user_companies company index
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 18:02:41.118204
+
+Índice (company_id, user_id) usado pela checagem de membership e pela
+listagem de membros. Bancos criados pelo create_all depois que o índice
+entrou no model, ou migrados por uma versão anterior da revisão 0001, já o
+têm: nesse caso a revisão não faz nada.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = 'ix_user_companies_company_id_user_id'
+
+
+def _index_exists() -> bool:
+    indexes = sa.inspect(op.get_bind()).get_indexes('user_companies')
+    return any(index['name'] == INDEX_NAME for index in indexes)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not _index_exists():
+        op.create_index(INDEX_NAME, 'user_companies', ['company_id', 'user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(INDEX_NAME, table_name='user_companies')
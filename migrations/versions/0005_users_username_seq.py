@@ -0,0 +1,47 @@
+"""users username_seq
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 22:06:51.930417
+
+Número de alteração por usuário (criação ou renomeação), gerado pelo
+contador de linha única ``username_sequence``. O filtro de usernames do login
+lê só as linhas com número acima do último lido, então criações e renomeações
+feitas em qualquer worker entram no filtro. Usuários existentes ficam com 0 e
+são lidos pela carga completa.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'users',
+        sa.Column('username_seq', sa.Integer(), server_default='0', nullable=False)
+    )
+    op.create_index('ix_users_username_seq', 'users', ['username_seq'], unique=False)
+    username_sequence = op.create_table(
+        'username_sequence',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(username_sequence, [{'id': 1, 'value': 0}])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('username_sequence')
+    op.drop_index('ix_users_username_seq', table_name='users')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('username_seq')
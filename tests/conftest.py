@@ -1,17 +1,40 @@
+from contextlib import contextmanager
+
 import pytest
+from fastapi import Request
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-
-from core.database import Base, get_db
-from core.security import create_access_token
+from sqlalchemy.pool import NullPool, StaticPool
+
+import core.database as database
+from core.config import settings
+from core.database import (
+    Base,
+    ReplicaRouter,
+    async_url,
+    get_async_db,
+    get_async_read_db,
+    get_db,
+    get_read_db
+)
+from core.health import readiness_probe
+from core.metrics import http_metrics
+from core.queries import query_metrics, track_queries
+from core.ratelimit import login_rate_limiter
+from core.revocation import token_versions
+from core.security import create_access_token, principal_cache, token_cache
 from main import app
 from apps.auth.models import UserRole
 from apps.auth.services import UserService
+from apps.auth.usernames import username_filter
 from apps.auth.schemas import UserCreate
 
 
+# Custo mínimo do bcrypt nos testes (o custo real é configurável)
+settings.BCRYPT_ROUNDS = 4
+
 # Database de teste
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
 
@@ -22,6 +45,12 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# A suíte nunca abre o banco da aplicação (./rapier_auth.db): warm-up,
+# readiness, métricas de pool e sessões fora dos overrides usam o engine de teste
+database.engine = engine
+database.replica_router.primary = engine
+database.SessionLocal.configure(bind=engine)
+
 
 @pytest.fixture(scope="function")
 def db():
@@ -33,23 +62,96 @@ def db():
     finally:
         db.close()
         Base.metadata.drop_all(bind=engine)
+        # IDs são reutilizados entre testes; estado em memória não pode vazar
+        token_versions.clear()
+        principal_cache.clear()
+        token_cache.clear()
+        login_rate_limiter.reset()
+        username_filter.clear()
+        query_metrics.clear()
+        http_metrics.clear()
+        readiness_probe.clear()
 
 
 @pytest.fixture(scope="function")
-def client(db):
+def client(db, monkeypatch):
     """Cria um cliente de teste"""
-    def override_get_db():
+    # Sem a thread de fundo do filtro de usernames (ela usaria o banco da
+    # aplicação); os testes carregam o filtro com username_filter.refresh(db)
+    monkeypatch.setattr(username_filter, "start", lambda session_factory: None)
+
+    def override_get_db(request: Request):
+        # Como em get_db: commits marcam o request para o read-your-writes
+        db.info["request_state"] = request.scope.setdefault("state", {})
         try:
             yield db
         finally:
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope="function")
+def async_db(db, tmp_path, monkeypatch):
+    """Banco em arquivo servido às rotas por AsyncSession (DATABASE_ASYNC).
+
+    Produz uma Session síncrona do mesmo banco, para preparar os dados.
+    """
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    # NullPool: conexões aiosqlite não atravessam os event loops dos TestClients
+    async_engine = create_async_engine(async_url(url), poolclass=NullPool)
+    monkeypatch.setattr(
+        database, "AsyncSessionLocal",
+        async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    )
+    monkeypatch.setattr(database, "async_replica_router", ReplicaRouter(async_engine, []))
+    session = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        sync_engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def async_client(async_db, monkeypatch):
+    """Cliente de teste com as dependencies de sessão assíncronas"""
+    monkeypatch.setattr(username_filter, "start", lambda session_factory: None)
+    app.dependency_overrides[get_db] = get_async_db
+    app.dependency_overrides[get_read_db] = get_async_read_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def query_budget():
+    """Context manager que falha se o bloco exceder o orçamento de queries.
+
+    Conta também as queries dos requests feitos pelo TestClient dentro do
+    bloco; ``max_duplicates`` limita statements repetidos (N+1). Produz o
+    ``QueryStats`` do bloco (``stats.statements`` na ordem de execução).
+    """
+    @contextmanager
+    def budget(max_queries: int, max_duplicates: int = 0):
+        with track_queries() as stats:
+            yield stats
+        statements = "\n".join(stats.statements)
+        assert stats.count <= max_queries, (
+            f"{stats.count} queries (budget {max_queries}):\n{statements}"
+        )
+        assert stats.duplicates <= max_duplicates, (
+            f"{stats.duplicates} repeated statements (budget {max_duplicates}):\n{statements}"
+        )
+    return budget
+
+
 @pytest.fixture
 def test_user(db):
     """Cria um usuário de teste"""
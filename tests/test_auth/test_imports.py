@@ -0,0 +1,124 @@
+import pytest
+
+from apps.auth.imports import UserImportService, iter_lines, parse_import_stream
+from apps.auth.models import User, UserRole
+from apps.auth.services import UserService
+
+
+async def _stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _collect(aiter):
+    return [item async for item in aiter]
+
+
+@pytest.fixture
+def fast_hash(monkeypatch):
+    """Substitui o bcrypt por um hash trivial nos testes de lógica"""
+    monkeypatch.setattr("apps.auth.imports.get_password_hash", lambda password: f"hashed:{password}")
+
+
+async def test_iter_lines_across_chunks():
+    """Testa quebra de linhas que atravessam chunks"""
+    lines = await _collect(iter_lines(_stream(b"ab", b"c\r\nde", b"f\n", b"gh")))
+    assert lines == ["abc", "def", "gh"]
+
+
+async def test_parse_jsonl():
+    """Testa parsing de JSON Lines com linhas inválidas"""
+    body = b'{"email": "a@example.com"}\n\nnot json\n[1, 2]\n'
+    rows = await _collect(parse_import_stream(_stream(body), "jsonl"))
+    assert rows == [
+        (1, {"email": "a@example.com"}, None),
+        (3, None, "Invalid JSON"),
+        (4, None, "Expected a JSON object"),
+    ]
+
+
+async def test_parse_invalid_utf8_line():
+    """Testa que uma linha que não é UTF-8 vira erro da linha, sem abortar"""
+    body = b'{"email": "a@example.com"}\n\xff\xfe{"email": "b"}\n{"email": "c@example.com"}'
+    rows = await _collect(parse_import_stream(_stream(body), "jsonl"))
+    assert rows == [
+        (1, {"email": "a@example.com"}, None),
+        (2, None, "Invalid UTF-8"),
+        (3, {"email": "c@example.com"}, None),
+    ]
+
+
+async def test_import_users_continues_after_invalid_utf8(db, fast_hash):
+    """Testa importação com uma linha não UTF-8 entre linhas válidas"""
+    body = b"\n".join([
+        b'{"email": "one@example.com", "username": "one", "password": "pw1"}',
+        b"\xff\xfe\x00garbage",
+        b'{"email": "two@example.com", "username": "two", "password": "pw2"}',
+    ])
+    rows = parse_import_stream(_stream(body), "jsonl")
+    result = await UserImportService.import_users(db, rows, chunk_size=1)
+
+    assert result.created == 2
+    assert result.failed == 1
+    assert [(e.row, e.error) for e in result.errors] == [(2, "Invalid UTF-8")]
+
+
+async def test_parse_csv():
+    """Testa parsing de CSV com cabeçalho"""
+    body = b"email,username,password,full_name\na@example.com,a,pw,\nbad,row\n"
+    rows = await _collect(parse_import_stream(_stream(body), "csv"))
+    assert rows == [
+        (2, {"email": "a@example.com", "username": "a", "password": "pw"}, None),
+        (3, None, "Expected 4 columns, got 2"),
+    ]
+
+
+async def test_import_users_reports_row_errors(db, test_user, fast_hash):
+    """Testa importação em lotes com erros por linha"""
+    body = b"\n".join([
+        b'{"email": "one@example.com", "username": "one", "password": "pw1"}',
+        b'{"email": "two@example.com", "username": "two", "password": "pw2", "role": "admin"}',
+        b'{"email": "test@example.com", "username": "dup-email", "password": "pw"}',
+        b'{"email": "three@example.com", "username": "testuser", "password": "pw"}',
+        b'{"email": "one@example.com", "username": "again", "password": "pw"}',
+        b'{"email": "invalid", "username": "x", "password": "pw"}',
+        b'{"email": "four@example.com", "username": "four", "password": "pw4"}',
+    ])
+    rows = parse_import_stream(_stream(body), "jsonl")
+    result = await UserImportService.import_users(db, rows, chunk_size=2)
+
+    assert result.created == 3
+    assert result.failed == 4
+    assert {(e.row, e.error) for e in result.errors if e.row != 6} == {
+        (3, "Email already registered"),
+        (4, "Username already taken"),
+        (5, "Email already registered"),
+    }
+    assert any(e.row == 6 and e.error.startswith("email:") for e in result.errors)
+    two = UserService.get_user_by_username(db, "two")
+    assert two.role == UserRole.ADMIN
+    assert two.hashed_password == "hashed:pw2"
+
+
+async def test_import_users_isolates_integrity_errors(db, fast_hash, monkeypatch):
+    """Testa fallback linha a linha quando o insert em lote conflita"""
+    from sqlalchemy import select
+
+    # Simula uma corrida: o SELECT de unicidade não vê o usuário já existente
+    db.add(User(email="race@example.com", username="race", hashed_password="x"))
+    db.commit()
+    original_scalars = db.scalars
+    monkeypatch.setattr(
+        db, "scalars",
+        lambda stmt: iter(()) if "users" in str(stmt) else original_scalars(stmt)
+    )
+
+    body = (
+        b'{"email": "race@example.com", "username": "race2", "password": "pw"}\n'
+        b'{"email": "ok@example.com", "username": "ok", "password": "pw"}\n'
+    )
+    result = await UserImportService.import_users(db, parse_import_stream(_stream(body), "jsonl"))
+    assert result.created == 1
+    assert [(e.row, e.error) for e in result.errors] == [(1, "Email or username already exists")]
+    monkeypatch.undo()
+    assert db.scalar(select(User).where(User.username == "ok")) is not None
@@ -290,3 +290,275 @@ def test_delete_user_unauthorized(client, user_token, test_user):
     )
     assert response.status_code == status.HTTP_403_FORBIDDEN
 
+
+
+def test_login_hasher_saturated(client, test_user, monkeypatch):
+    """Testa 503 com Retry-After quando o pool de hashing está saturado"""
+    from core.hashing import password_hasher
+
+    monkeypatch.setattr(password_hasher, "workers", 0)
+    monkeypatch.setattr(password_hasher, "max_queue", 0)
+    response = client.post(
+        "/api/v1/auth/login",
+        json={
+            "username": test_user.username,
+            "password": "testpass123"
+        }
+    )
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert "retry-after" in response.headers
+
+
+def test_stateless_token_revoked_after_deactivation(client, db, test_user, admin_token, monkeypatch):
+    """Testa que desativar o usuário revoga o token stateless"""
+    from core.config import settings
+
+    monkeypatch.setattr(settings, "STATELESS_AUTH", True)
+    login = client.post(
+        "/api/v1/auth/login",
+        json={"username": test_user.username, "password": "testpass123"}
+    )
+    token = login.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == status.HTTP_200_OK
+
+    response = client.put(
+        f"/api/v1/auth/users/{test_user.id}",
+        json={"is_active": False},
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_get_all_users_cursor_pagination(client, admin_token, test_user, test_admin):
+    """Testa paginação por cursor via header X-Next-Cursor"""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = client.get("/api/v1/auth/users?limit=1", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 1
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(f"/api/v1/auth/users?limit=1&cursor={cursor}", headers=headers)
+    assert len(response.json()) == 1
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_get_all_users_legacy_offset(client, admin_token, test_user, test_admin):
+    """Testa a paginação legada por skip"""
+    response = client.get(
+        "/api/v1/auth/users?skip=1&limit=10",
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 1
+
+
+def test_get_all_users_role_filter(client, admin_token, test_user, test_admin):
+    """Testa filtro por role"""
+    response = client.get(
+        "/api/v1/auth/users?role=user",
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert [u["id"] for u in response.json()] == [test_user.id]
+
+
+def test_import_users_csv(client, admin_token):
+    """Testa importação em massa via CSV com bcrypt real"""
+    body = "email,username,password,full_name\nbulk1@example.com,bulk1,password123,Bulk One\nbulk2@example.com,bulk2,password123,\n"
+    response = client.post(
+        "/api/v1/auth/users/import",
+        content=body,
+        headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "text/csv"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"created": 2, "failed": 0, "errors": []}
+
+    login = client.post("/api/v1/auth/login", json={"username": "bulk1", "password": "password123"})
+    assert login.status_code == status.HTTP_200_OK
+
+
+def test_import_users_unsupported_format(client, admin_token):
+    """Testa formato de importação não suportado"""
+    response = client.post(
+        "/api/v1/auth/users/import",
+        content="<users/>",
+        headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "application/xml"}
+    )
+    assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+
+def test_import_users_as_user(client, user_token):
+    """Testa importação sem permissão de admin"""
+    response = client.post(
+        "/api/v1/auth/users/import",
+        content="",
+        headers={"Authorization": f"Bearer {user_token}", "Content-Type": "text/csv"}
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def _login(client, username="testuser", password="testpass123"):
+    response = client.post("/api/v1/auth/login", json={"username": username, "password": password})
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+
+def test_login_returns_refresh_token(client, test_user):
+    """Testa que o login emite um refresh token"""
+    data = _login(client)
+    assert data["refresh_token"]
+    assert data["refresh_token"] != data["access_token"]
+
+
+def test_refresh_rotates_tokens(client, test_user, monkeypatch):
+    """Testa renovação sem bcrypt, com rotação do refresh token"""
+    from core import security
+
+    tokens = _login(client)
+
+    def fail(*args):
+        raise AssertionError("bcrypt should not run on refresh")
+    monkeypatch.setattr(security, "verify_password", fail)
+
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_200_OK
+    renewed = response.json()
+    assert renewed["token_type"] == "bearer"
+    assert renewed["refresh_token"] != tokens["refresh_token"]
+
+    response = client.get(
+        "/api/v1/auth/me",
+        headers={"Authorization": f"Bearer {renewed['access_token']}"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["username"] == test_user.username
+
+
+def test_refresh_reuse_revokes_family(client, test_user):
+    """Testa que reusar um refresh token já rotacionado revoga a família"""
+    tokens = _login(client)
+    renewed = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.json()["detail"] == "Refresh token revoked"
+
+    # O token legítimo mais recente também foi revogado
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": renewed["refresh_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    # Outras sessões (famílias) do usuário continuam válidas
+    other = _login(client)
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": other["refresh_token"]})
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_refresh_invalid_token(client):
+    """Testa refresh token desconhecido"""
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": "unknown"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_login_rate_limited_before_hashing(client, test_user, monkeypatch):
+    """Testa que tentativas acima do limite são rejeitadas sem rodar o bcrypt"""
+    from core import security
+    from core.ratelimit import login_rate_limiter
+
+    monkeypatch.setattr(login_rate_limiter, "username_limit", 2)
+    for _ in range(2):
+        response = client.post("/api/v1/auth/login", json={"username": "testuser", "password": "wrong"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def fail(*args):
+        raise AssertionError("bcrypt should not run for rate-limited attempts")
+    monkeypatch.setattr(security, "verify_password", fail)
+
+    response = client.post("/api/v1/auth/login", json={"username": "TestUser", "password": "testpass123"})
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert "Retry-After" in response.headers
+    assert login_rate_limiter.stats()["rejected_username"] == 1
+
+
+def test_auth_routes_query_budget(client, admin_token, test_admin, db, query_budget, monkeypatch):
+    """Testa o orçamento de queries das rotas de auth"""
+    from apps.auth.schemas import UserCreate
+    from apps.auth.services import UserService
+    from apps.auth.usernames import username_filter
+
+    for i in range(5):
+        UserService.create_user(db, UserCreate(email=f"u{i}@example.com", username=f"user{i}", password="password123"))
+    monkeypatch.setattr(username_filter, "catch_up_interval", 3600)
+    username_filter.refresh(db)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    # Principal ainda fora do cache: a dependency e o handler leem o usuário
+    with query_budget(2, max_duplicates=1):
+        assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    with query_budget(1):
+        assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    with query_budget(1):
+        assert len(client.get("/api/v1/auth/users", headers=headers).json()) == 6
+    with query_budget(3):
+        response = client.post("/api/v1/auth/login", json={"username": "user0", "password": "password123"})
+    assert response.status_code == 200
+    # Username fora do filtro lido há pouco: nenhuma query
+    with query_budget(0):
+        response = client.post("/api/v1/auth/login", json={"username": "ghost", "password": "password123"})
+    assert response.status_code == 401
+
+
+def test_auth_routes_async_session(async_client, async_db, query_budget, monkeypatch):
+    """Testa as rotas de auth com AsyncSession (DATABASE_ASYNC)"""
+    from apps.auth.schemas import UserCreate
+    from apps.auth.services import UserService
+    from apps.auth.usernames import username_filter
+    from core.security import create_access_token
+
+    admin = UserService.create_user(
+        async_db, UserCreate(email="admin@example.com", username="admin", password="adminpass123"),
+        role=UserRole.ADMIN
+    )
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': admin.id})}"}
+    response = async_client.post(
+        "/api/v1/auth/register",
+        json={"email": "new@example.com", "username": "newuser", "password": "password123"}
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    user_id = response.json()["id"]
+
+    tokens = _login(async_client, "newuser", "password123")
+    user_headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    # As queries do driver assíncrono também entram na contagem
+    with query_budget(2, max_duplicates=1):
+        assert async_client.get("/api/v1/auth/me", headers=user_headers).json()["id"] == user_id
+    response = async_client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_200_OK
+
+    response = async_client.put("/api/v1/auth/me", json={"full_name": "Renamed"}, headers=user_headers)
+    assert response.json()["full_name"] == "Renamed"
+    response = async_client.put(
+        f"/api/v1/auth/users/{user_id}", json={"password": "newpassword123"}, headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert async_client.get(f"/api/v1/auth/users/{user_id}", headers=headers).json()["full_name"] == "Renamed"
+    response = async_client.post(
+        "/api/v1/auth/users/import",
+        content=b'{"email": "i@example.com", "username": "imported", "password": "password123"}\n',
+        headers={**headers, "Content-Type": "application/x-ndjson"}
+    )
+    assert response.json()["created"] == 1
+    assert len(async_client.get("/api/v1/auth/users", headers=headers).json()) == 3
+    assert len(async_client.get("/api/v1/auth/users?skip=1", headers=headers).json()) == 2
+
+    # Username fora do filtro: a leitura incremental usa a própria AsyncSession
+    monkeypatch.setattr(username_filter, "catch_up_interval", 0)
+    username_filter.refresh(async_db)
+    response = async_client.post("/api/v1/auth/login", json={"username": "ghost", "password": "password123"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert username_filter.stats()["negatives"] == 1
+    assert _login(async_client, "imported", "password123")["access_token"]
+
+    response = async_client.delete(f"/api/v1/auth/users/{user_id}", headers=headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert async_client.get(f"/api/v1/auth/users/{user_id}", headers=headers).status_code == 404
@@ -190,3 +190,320 @@ def test_authenticate_user_not_found(db):
     user = UserService.authenticate_user(db, "nonexistent", "password")
     assert user is None
 
+
+
+async def test_create_user_async(db):
+    """Testa criação assíncrona de usuário"""
+    user_data = UserCreate(
+        email="async@example.com",
+        username="asyncuser",
+        password="password123"
+    )
+    user = await UserService.create_user_async(db, user_data)
+    assert user.id is not None
+    assert user.hashed_password != "password123"
+
+
+async def test_update_user_async_password(db, test_user):
+    """Testa atualização assíncrona de senha"""
+    updated_user = await UserService.update_user_async(
+        db, test_user.id, UserUpdate(password="newpassword123")
+    )
+    assert await UserService.authenticate_user_async(db, updated_user.username, "newpassword123") is not None
+
+
+async def test_authenticate_user_async(db, test_user):
+    """Testa autenticação assíncrona"""
+    assert await UserService.authenticate_user_async(db, test_user.username, "testpass123") is not None
+    assert await UserService.authenticate_user_async(db, test_user.username, "wrong") is None
+    assert await UserService.authenticate_user_async(db, "nonexistent", "password") is None
+
+
+def test_update_and_delete_invalidate_principal_cache(db, test_user):
+    """Testa invalidação do cache de principals em update e delete"""
+    from core.security import Principal, principal_cache
+
+    principal_cache.set(test_user.id, Principal.from_user(test_user))
+    UserService.update_user(db, test_user.id, UserUpdate(full_name="Other"))
+    assert principal_cache.get(test_user.id) is None
+
+    principal_cache.set(test_user.id, Principal.from_user(test_user))
+    UserService.delete_user(db, test_user.id)
+    assert principal_cache.get(test_user.id) is None
+
+
+def test_update_bumps_token_version(db, test_user):
+    """Testa que só campos revogantes incrementam users.token_version"""
+    from core.revocation import token_versions
+
+    user = UserService.update_user(db, test_user.id, UserUpdate(full_name="Other"))
+    assert user.token_version == 0
+
+    token_versions.set(test_user.id, 0)
+    user = UserService.update_user(db, test_user.id, UserUpdate(role=UserRole.ADMIN))
+    assert user.token_version == 1
+    assert token_versions.get(test_user.id) is None
+
+
+def _create_plain_users(db, count, **fields):
+    from apps.auth.models import User
+
+    users = [
+        User(email=f"plain{i}@example.com", username=f"plain{i}", hashed_password="x", **fields)
+        for i in range(count)
+    ]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def test_get_users_page_keyset(db):
+    """Testa paginação por cursor na listagem de usuários"""
+    _create_plain_users(db, 5)
+
+    users, cursor = UserService.get_users_page(db, limit=2)
+    assert [u.username for u in users] == ["plain0", "plain1"]
+    assert cursor is not None
+
+    users, cursor = UserService.get_users_page(db, cursor=cursor, limit=2)
+    assert [u.username for u in users] == ["plain2", "plain3"]
+
+    users, cursor = UserService.get_users_page(db, cursor=cursor, limit=2)
+    assert [u.username for u in users] == ["plain4"]
+    assert cursor is None
+
+
+def test_get_users_page_filters(db, test_user, test_admin):
+    """Testa filtros de role e is_active na paginação"""
+    _create_plain_users(db, 2, is_active=False)
+
+    admins, _ = UserService.get_users_page(db, role=UserRole.ADMIN)
+    assert [u.id for u in admins] == [test_admin.id]
+
+    inactive, _ = UserService.get_users_page(db, is_active=False)
+    assert len(inactive) == 2
+
+    inactive_legacy = UserService.get_all_users(db, is_active=False)
+    assert len(inactive_legacy) == 2
+
+
+def test_get_users_page_invalid_cursor(db):
+    """Testa cursor com posição inválida"""
+    from core.pagination import encode_cursor
+
+    with pytest.raises(HTTPException) as exc_info:
+        UserService.get_users_page(db, cursor=encode_cursor({"name": "x"}))
+    assert exc_info.value.status_code == 400
+
+
+def test_create_user_single_insert(db, query_budget):
+    """Testa que o registro não faz SELECTs de unicidade antes do INSERT"""
+    user_data = UserCreate(email="single@example.com", username="single", password="password123")
+    with query_budget(3) as stats:
+        UserService.create_user(db, user_data)
+    # Número de alteração do username, INSERT e o refresh do usuário criado
+    assert [s.split()[0] for s in stats.statements] == ["UPDATE", "INSERT", "SELECT"]
+
+
+def test_update_user_duplicate_username(db, test_user, test_admin):
+    """Testa atualização com username duplicado"""
+    with pytest.raises(HTTPException) as exc_info:
+        UserService.update_user(db, test_user.id, UserUpdate(username=test_admin.username))
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == "Username already taken"
+    # A sessão continua utilizável após o rollback
+    assert UserService.get_user_by_id(db, test_user.id).username == "testuser"
+
+
+def test_unique_violation_other_constraint():
+    """Testa que violações fora de email/username não são mascaradas"""
+    from sqlalchemy.exc import IntegrityError
+    from apps.auth.services import _unique_violation
+
+    exc = IntegrityError("INSERT", {}, Exception("NOT NULL constraint failed: users.hashed_password"))
+    with pytest.raises(IntegrityError):
+        _unique_violation(exc)
+
+
+def test_unique_violation_ignores_duplicated_values():
+    """Testa que o erro vem do índice violado, não dos valores no DETAIL do Postgres"""
+    from types import SimpleNamespace
+    from sqlalchemy.exc import IntegrityError
+    from apps.auth.services import _unique_violation
+
+    message = (
+        'duplicate key value violates unique constraint "ix_users_username"\n'
+        "DETAIL:  Key (username)=(my.email) already exists."
+    )
+    assert _unique_violation(IntegrityError("INSERT", {}, Exception(message))).detail == "Username already taken"
+
+    class DriverError(Exception):
+        diag = SimpleNamespace(constraint_name="ix_users_email")
+
+    exc = IntegrityError("INSERT", {}, DriverError("Key (username)=(x) already exists"))
+    assert _unique_violation(exc).detail == "Email already registered"
+
+
+def test_refresh_token_single_lookup(db, test_user, query_budget):
+    """Testa que a renovação faz um único SELECT (token + usuário)"""
+    from apps.auth.services import RefreshTokenService
+
+    token = RefreshTokenService.issue(db, test_user.id)
+    with query_budget(3) as stats:
+        access_token, new_token = RefreshTokenService.refresh(db, token)
+    assert access_token and new_token != token
+    assert [s.split()[0] for s in stats.statements] == ["SELECT", "UPDATE", "INSERT"]
+
+
+def test_refresh_token_stored_hashed(db, test_user):
+    """Testa que apenas o hash do refresh token é persistido"""
+    from apps.auth.models import RefreshToken
+    from apps.auth.services import RefreshTokenService
+
+    token = RefreshTokenService.issue(db, test_user.id)
+    stored = db.query(RefreshToken).one()
+    assert stored.token_hash != token
+    assert len(stored.token_hash) == 64
+
+
+def test_refresh_token_expired(db, test_user, monkeypatch):
+    """Testa refresh token expirado"""
+    from apps.auth.services import RefreshTokenService
+    from core.config import settings
+
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_EXPIRE_DAYS", -1)
+    token = RefreshTokenService.issue(db, test_user.id)
+    with pytest.raises(HTTPException) as exc_info:
+        RefreshTokenService.refresh(db, token)
+    assert exc_info.value.status_code == 401
+
+
+def test_refresh_token_inactive_or_deleted_user(db, test_user):
+    """Testa renovação para usuário desativado e deletado"""
+    from apps.auth.services import RefreshTokenService
+
+    user_id = test_user.id
+    token = RefreshTokenService.issue(db, user_id)
+    test_user.is_active = False
+    db.commit()
+    with pytest.raises(HTTPException) as exc_info:
+        RefreshTokenService.refresh(db, token)
+    assert exc_info.value.status_code == 400
+
+    token = RefreshTokenService.issue(db, user_id)
+    UserService.delete_user(db, user_id)
+    with pytest.raises(HTTPException) as exc_info:
+        RefreshTokenService.refresh(db, token)
+    assert exc_info.value.status_code == 401
+
+
+@pytest.mark.parametrize("update", [UserUpdate(password="newpassword123"), UserUpdate(is_active=False)])
+def test_password_change_revokes_refresh_tokens(db, test_user, update):
+    """Testa que troca de senha ou desativação revogam os refresh tokens"""
+    from apps.auth.services import RefreshTokenService
+
+    token = RefreshTokenService.issue(db, test_user.id)
+    UserService.update_user(db, test_user.id, update)
+    with pytest.raises(HTTPException) as exc_info:
+        RefreshTokenService.refresh(db, token)
+    assert exc_info.value.status_code == 401
+
+
+def test_authenticate_user_rehashes_outdated_hash(db, test_user, monkeypatch):
+    """Testa que o login atualiza hashes com custo desatualizado"""
+    from core.config import settings
+    from core.security import password_needs_rehash
+
+    old_hash = test_user.hashed_password
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+    user = UserService.authenticate_user(db, test_user.username, "testpass123")
+
+    assert user.hashed_password != old_hash
+    assert password_needs_rehash(user.hashed_password) is False
+    assert UserService.authenticate_user(db, test_user.username, "testpass123") is not None
+    # Mesmo hash: um login atualizado não gera outra escrita
+    current_hash = user.hashed_password
+    UserService.authenticate_user(db, test_user.username, "testpass123")
+    assert user.hashed_password == current_hash
+
+
+async def test_authenticate_user_async_rehashes_to_scrypt(db, test_user, monkeypatch):
+    """Testa migração para scrypt no login assíncrono"""
+    from core.config import settings
+
+    monkeypatch.setattr(settings, "PASSWORD_HASH_SCHEME", "scrypt")
+    monkeypatch.setattr(settings, "SCRYPT_N", 2 ** 10)
+    user = await UserService.authenticate_user_async(db, test_user.username, "testpass123")
+    assert user.hashed_password.startswith("$scrypt$")
+    assert await UserService.authenticate_user_async(db, test_user.username, "testpass123") is not None
+
+
+def test_authenticate_unknown_user_constant_cost(db, test_user, query_budget, monkeypatch):
+    """Testa que usernames inexistentes verificam o hash de referência, sem SELECT do usuário"""
+    import core.security as security
+    from apps.auth.usernames import username_filter
+
+    # Leitura incremental recente: o negativo não consulta o banco
+    monkeypatch.setattr(username_filter, "catch_up_interval", 3600)
+    username_filter.refresh(db)
+    UserService.authenticate_user(db, test_user.username, "testpass123")
+    verified = []
+    real_verify = security.verify_password
+    monkeypatch.setattr(security, "verify_password", lambda *args: verified.append(args) or real_verify(*args))
+
+    with query_budget(0):
+        assert UserService.authenticate_user(db, "ghost", "password") is None
+    assert verified == [("password", security.dummy_password_hash())]
+    assert username_filter.stats()["negatives"] == 1
+
+
+async def test_authenticate_unknown_user_async_constant_cost(db, monkeypatch):
+    """Testa o hash de referência nos logins assíncronos"""
+    import core.security as security
+
+    calls = []
+    monkeypatch.setattr(security, "verify_dummy_password", lambda password: calls.append(password) or False)
+    assert await UserService.authenticate_user_async(db, "ghost", "password") is None
+    assert calls == ["password"]
+
+
+def test_dummy_password_hash_follows_settings(monkeypatch):
+    """Testa que o hash de referência acompanha esquema e custo configurados"""
+    from core.config import settings
+    from core.security import dummy_password_hash
+
+    assert dummy_password_hash() == dummy_password_hash()
+    assert dummy_password_hash().startswith("$2b$04$")
+    monkeypatch.setattr(settings, "PASSWORD_HASH_SCHEME", "scrypt")
+    monkeypatch.setattr(settings, "SCRYPT_N", 2 ** 10)
+    assert dummy_password_hash().startswith("$scrypt$n=1024,")
+
+
+def test_username_filter_tracks_writes(db, test_user, monkeypatch):
+    """Testa que criação, renomeação e deleção atualizam o filtro"""
+    from apps.auth.usernames import username_filter
+
+    assert UserService.authenticate_user(db, "testuser", "testpass123") is not None
+    other = UserService.create_user(db, UserCreate(email="o@example.com", username="other", password="password123"))
+    assert UserService.authenticate_user(db, "other", "password123") is not None
+
+    UserService.update_user(db, other.id, UserUpdate(username="renamed"))
+    assert UserService.authenticate_user(db, "renamed", "password123") is not None
+    UserService.update_user(db, other.id, UserUpdate(full_name="Same Name"))
+    UserService.delete_user(db, other.id)
+    assert username_filter.stats()["stale"] == 2
+
+
+def test_rename_visible_to_other_workers(db, test_user, test_admin):
+    """Testa que a renomeação grava username_seq, lido pelo filtro de outro worker"""
+    from apps.auth.usernames import UsernameFilter
+
+    other_worker = UsernameFilter(
+        capacity=100, error_rate=0.01, sync_interval=5, rebuild_interval=3600, catch_up_interval=0
+    )
+    other_worker.refresh(db)
+    last_seq = other_worker.stats()["last_seq"]
+
+    UserService.update_user(db, test_user.id, UserUpdate(username="renamed"))
+    assert test_user.username_seq > last_seq
+    assert other_worker.might_exist(db, "renamed") is True
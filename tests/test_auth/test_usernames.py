@@ -0,0 +1,288 @@
+import threading
+import time
+from contextlib import nullcontext
+
+from apps.auth.models import User
+from apps.auth.usernames import UsernameFilter, next_username_seq
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _filter(clock, **kwargs) -> UsernameFilter:
+    options = {"capacity": 100, "error_rate": 0.01, "sync_interval": 5, "rebuild_interval": 3600}
+    options.update(kwargs)
+    return UsernameFilter(clock=clock, **options)
+
+
+def _insert(db, *usernames: str) -> None:
+    # Simula usuários criados por outro worker (sem passar pelo filtro local)
+    seq = next_username_seq(db)
+    for username in usernames:
+        db.add(User(
+            email=f"{username}@example.com", username=username, hashed_password="x", username_seq=seq
+        ))
+    db.commit()
+
+
+def test_next_username_seq(db):
+    """Testa números crescentes e a devolução do número em rollback"""
+    first = next_username_seq(db)
+    db.commit()
+    second = next_username_seq(db)
+    assert second == first + 1
+    db.rollback()
+    assert next_username_seq(db) == second
+
+
+def test_filter_not_loaded_falls_through(db, test_user, query_budget):
+    """Testa que, antes da carga, todo username segue para o SELECT"""
+    usernames = _filter(FakeClock())
+    with query_budget(0):
+        assert usernames.might_exist(db, "ghost") is True
+    assert usernames.stats()["loaded"] is False
+
+
+def test_filter_negatives_share_catch_up(db, test_user, query_budget):
+    """Testa no máximo uma leitura incremental por catch_up_interval"""
+    clock = FakeClock()
+    usernames = _filter(clock, catch_up_interval=1)
+    usernames.refresh(db)
+    with query_budget(0):
+        assert usernames.might_exist(db, "testuser") is True
+        assert usernames.might_exist(db, "ghost") is False
+
+    clock.now = 2
+    with query_budget(1) as stats:
+        assert usernames.might_exist(db, "ghost1") is False
+        assert usernames.might_exist(db, "ghost2") is False
+        assert usernames.might_exist(db, "ghost3") is False
+    assert all("username_seq >" in statement for statement in stats.statements)
+    stats = usernames.stats()
+    assert stats["items"] == 1
+    assert stats["negatives"] == 4
+    assert stats["catch_ups"] == 1
+
+
+def test_filter_reads_only_new_changes(db, test_user):
+    """Testa que cada leitura começa após o último número lido"""
+    clock = FakeClock()
+    usernames = _filter(clock, catch_up_interval=1)
+    usernames.refresh(db)
+    _insert(db, *(f"bulk{i}" for i in range(50)))
+
+    clock.now = 2
+    assert usernames.might_exist(db, "ghost1") is False
+    last_seq = usernames.stats()["last_seq"]
+    assert last_seq == next_username_seq(db) - 1
+    db.rollback()
+    assert usernames.stats()["items"] == 51
+
+    clock.now = 4
+    assert usernames.might_exist(db, "ghost2") is False
+    assert usernames.stats()["last_seq"] == last_seq
+    assert usernames.stats()["items"] == 51
+
+
+def test_filter_sees_writes_from_other_workers(db, test_user):
+    """Testa criações e renomeações de outros workers, vistas em até catch_up_interval"""
+    clock = FakeClock()
+    usernames = _filter(clock, catch_up_interval=1)
+    usernames.refresh(db)
+    _insert(db, "remote")
+    # Leitura recente: o negativo ainda é servido pelo filtro
+    assert usernames.might_exist(db, "remote") is False
+    clock.now = 1
+    assert usernames.might_exist(db, "remote") is True
+
+    test_user.username = "renamed"
+    test_user.username_seq = next_username_seq(db)
+    db.commit()
+    clock.now = 2
+    assert usernames.might_exist(db, "renamed") is True
+    assert usernames.stats()["rebuilds"] == 1
+
+
+def test_filter_rebuild_reads_changes_after_start(db, test_user, monkeypatch):
+    """Testa alterações commitadas durante a leitura completa"""
+    import apps.auth.usernames as usernames_module
+
+    monkeypatch.setattr(usernames_module, "SYNC_BATCH_SIZE", 1)
+    _insert(db, "other")
+    usernames = _filter(FakeClock())
+    real_execute = db.execute
+    renamed = []
+
+    def execute(statement, *args, **kwargs):
+        result = real_execute(statement, *args, **kwargs)
+        if "ORDER BY users.id" in str(statement) and not renamed:
+            # Outro worker renomeia um usuário que a carga já leu
+            renamed.append(True)
+            test_user.username = "renamed"
+            test_user.username_seq = next_username_seq(db)
+            db.commit()
+        return result
+
+    monkeypatch.setattr(db, "execute", execute)
+    usernames.rebuild(db)
+    assert renamed
+    assert usernames.might_exist(db, "renamed") is True
+    assert usernames.might_exist(db, "other") is True
+
+
+async def test_filter_async_catch_up(db, test_user):
+    """Testa a leitura incremental fora do event loop"""
+    clock = FakeClock()
+    usernames = _filter(clock, catch_up_interval=1)
+    usernames.refresh(db)
+    assert await usernames.might_exist_async(db, "testuser") is True
+    _insert(db, "remote")
+    clock.now = 1
+    assert await usernames.might_exist_async(db, "remote") is True
+    assert await usernames.might_exist_async(db, "ghost") is False
+    assert usernames.stats()["catch_ups"] == 1
+
+
+async def test_filter_async_session_catch_up(async_db, monkeypatch):
+    """Testa a leitura incremental com AsyncSession (DATABASE_ASYNC)"""
+    import core.database as database
+
+    clock = FakeClock()
+    usernames = _filter(clock, catch_up_interval=1)
+    usernames.refresh(async_db)
+    _insert(async_db, "remote")
+    clock.now = 1
+    async with database.AsyncSessionLocal() as session:
+        assert await usernames.might_exist_async(session, "remote") is True
+        assert await usernames.might_exist_async(session, "ghost") is False
+        assert usernames.stats()["catch_ups"] == 1
+
+        # Filtro descartado durante a leitura: nada a aplicar, sem negativo
+        real_run_sync = session.run_sync
+
+        async def run_sync_and_clear(fn, *args):
+            rows = await real_run_sync(fn, *args)
+            usernames.clear()
+            return rows
+
+        monkeypatch.setattr(session, "run_sync", run_sync_and_clear)
+        clock.now = 2
+        assert await usernames.might_exist_async(session, "ghost") is True
+    assert usernames.stats()["loaded"] is False
+
+
+def test_filter_concurrent_negatives_share_catch_up(db, test_user):
+    """Testa que negativos que esperavam uma leitura em andamento a aproveitam"""
+    clock = FakeClock()
+    usernames = _filter(clock, catch_up_interval=1)
+    usernames.refresh(db)
+    clock.now = 2
+    usernames._lock.acquire()
+    threads = [threading.Thread(target=usernames.catch_up, args=(db, 1)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    usernames._lock.release()
+    for thread in threads:
+        thread.join()
+    assert usernames.stats()["catch_ups"] == 1
+
+
+def test_filter_rebuild_in_batches(db, monkeypatch):
+    """Testa a carga paginada por id"""
+    import apps.auth.usernames as usernames_module
+
+    monkeypatch.setattr(usernames_module, "SYNC_BATCH_SIZE", 2)
+    _insert(db, *(f"user{i}" for i in range(5)))
+    usernames = _filter(FakeClock())
+    usernames.refresh(db)
+    assert usernames.stats()["items"] == 5
+    assert all(usernames.might_exist(db, f"user{i}") for i in range(5))
+
+
+def test_filter_add_and_rebuild_on_stale(db):
+    """Testa add local e reconstrução quando há muitos itens obsoletos"""
+    usernames = _filter(FakeClock(), max_stale_ratio=0.5)
+    usernames.add("ignored")  # antes da carga: nada a fazer
+    _insert(db, *(f"user{i}" for i in range(4)))
+    usernames.refresh(db)
+    usernames.add("local")
+    assert usernames.might_exist(db, "local") is True
+
+    usernames.discard("user0")
+    usernames.discard("user1")
+    usernames.refresh(db)
+    assert usernames.stats()["rebuilds"] == 1
+    usernames.discard("user2")
+    usernames.refresh(db)
+    assert usernames.stats()["rebuilds"] == 2
+    assert usernames.stats()["stale"] == 0
+    assert usernames.might_exist(db, "local") is False
+
+
+def test_filter_periodic_rebuild(db, test_user):
+    """Testa reconstrução completa após rebuild_interval"""
+    clock = FakeClock()
+    usernames = _filter(clock, rebuild_interval=60)
+    usernames.refresh(db)
+    clock.now = 10
+    usernames.refresh(db)
+    assert usernames.stats()["rebuilds"] == 1
+    clock.now = 60
+    usernames.refresh(db)
+    assert usernames.stats()["rebuilds"] == 2
+
+
+def _wait_for(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_filter_background_thread(db, test_user):
+    """Testa a carga na thread de fundo e o encerramento"""
+    usernames = _filter(FakeClock(), sync_interval=0.01)
+    usernames.start(lambda: nullcontext(db))
+    try:
+        assert _wait_for(lambda: usernames.stats()["loaded"])
+    finally:
+        usernames.stop()
+    assert usernames.might_exist(db, "testuser") is True
+    usernames.stop()  # idempotente
+
+
+def test_filter_background_thread_logs_errors(caplog):
+    """Testa que falhas de banco na thread de fundo só geram warning"""
+    def broken_session():
+        raise RuntimeError("database unavailable")
+
+    usernames = _filter(FakeClock(), sync_interval=0.01)
+    usernames.start(broken_session)
+    try:
+        assert _wait_for(lambda: "Failed to refresh username filter" in caplog.text)
+    finally:
+        usernames.stop()
+    assert usernames.stats()["loaded"] is False
+
+
+def test_filter_disabled_and_clear(db):
+    """Testa filtro desativado e reset"""
+    usernames = _filter(FakeClock(), enabled=False)
+    usernames.refresh(db)
+    assert usernames.might_exist(db, "ghost") is True
+
+    usernames.enabled = True
+    usernames.might_exist(db, "ghost")
+    usernames.clear()
+    assert usernames.stats() == {
+        "loaded": False, "items": 0, "capacity": 100, "stale": 0, "last_seq": 0,
+        "catch_ups": 0, "rebuilds": 0, "negatives": 0,
+    }
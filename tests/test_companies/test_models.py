@@ -106,3 +106,13 @@ def test_user_multiple_companies(db):
     
     assert len(user.companies) == 2
 
+
+
+def test_user_companies_indexes(db):
+    """Testa índices da tabela de associação nas duas direções"""
+    from sqlalchemy import inspect
+
+    inspector = inspect(db.get_bind())
+    indexes = {idx["name"]: idx["column_names"] for idx in inspector.get_indexes("user_companies")}
+    assert indexes["ix_user_companies_company_id_user_id"] == ["company_id", "user_id"]
+    assert inspector.get_pk_constraint("user_companies")["constrained_columns"] == ["user_id", "company_id"]
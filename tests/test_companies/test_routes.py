@@ -196,10 +196,12 @@ def test_add_user_to_company_as_member(client, user_token, db, test_user, test_a
     )
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
-    assert len(data["users"]) == 2
-    user_ids = [u["id"] for u in data["users"]]
-    assert test_user.id in user_ids
-    assert test_admin.id in user_ids
+    assert data == {
+        "company_id": company.id,
+        "user_id": test_admin.id,
+        "is_member": True,
+        "member_count": 2
+    }
 
 
 def test_add_user_to_company_not_member(client, user_token, db, test_admin):
@@ -261,8 +263,9 @@ def test_remove_user_from_company_as_member(client, user_token, db, test_user, t
     )
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
-    assert len(data["users"]) == 1
-    assert data["users"][0]["id"] == test_user.id
+    assert data["is_member"] is False
+    assert data["member_count"] == 1
+    assert CompanyService.is_user_member(db, company.id, test_user.id)
 
 
 def test_remove_user_from_company_not_member(client, user_token, db, test_admin):
@@ -297,3 +300,200 @@ def test_remove_user_from_company_user_not_member(client, user_token, db, test_u
     )
     assert response.status_code == status.HTTP_400_BAD_REQUEST
 
+
+
+def test_add_user_to_company_query_count(client, user_token, db, test_user, test_admin, query_budget):
+    """Testa o número de queries ao adicionar um membro"""
+    company = CompanyService.create_company(db, CompanyCreate(name="Test Company", user_id=test_user.id))
+    headers = {"Authorization": f"Bearer {user_token}"}
+    # Aquece o cache de principals para contar apenas a rota
+    client.get(f"/api/v1/companies/{company.id}", headers=headers)
+    company_id, admin_id = company.id, test_admin.id
+
+    with query_budget(4) as stats:
+        response = client.post(
+            f"/api/v1/companies/{company_id}/users",
+            json={"user_id": admin_id},
+            headers=headers
+        )
+    assert response.status_code == status.HTTP_200_OK
+    # company + memberships, usuário alvo, INSERT e contagem de membros
+    assert stats.count == 4
+
+
+def test_get_my_companies_pagination(client, user_token, db, test_user):
+    """Testa paginação, ordenação e filtro na listagem de companies"""
+    for name in ["Beta", "Alpha", "Gamma"]:
+        CompanyService.create_company(db, CompanyCreate(name=name, user_id=test_user.id))
+    headers = {"Authorization": f"Bearer {user_token}"}
+
+    response = client.get("/api/v1/companies?limit=2", headers=headers)
+    assert [c["name"] for c in response.json()] == ["Alpha", "Beta"]
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/api/v1/companies?limit=2&cursor={cursor}", headers=headers)
+    assert [c["name"] for c in response.json()] == ["Gamma"]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/api/v1/companies?order=desc&name_prefix=G", headers=headers)
+    assert [c["name"] for c in response.json()] == ["Gamma"]
+
+    response = client.get("/api/v1/companies?sort=size", headers=headers)
+    assert response.status_code == 422
+
+
+def test_get_company_members(client, user_token, db, test_user, test_admin):
+    """Testa listagem paginada de membros"""
+    company = CompanyService.create_company(db, CompanyCreate(name="Test Company", user_id=test_user.id))
+    CompanyService.add_user_to_company(db, company.id, test_admin.id)
+    headers = {"Authorization": f"Bearer {user_token}"}
+
+    response = client.get(f"/api/v1/companies/{company.id}/users?limit=1", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert [u["id"] for u in response.json()] == [test_user.id]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(f"/api/v1/companies/{company.id}/users?limit=1&cursor={cursor}", headers=headers)
+    assert [u["id"] for u in response.json()] == [test_admin.id]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get(f"/api/v1/companies/{company.id}/users?search=adm", headers=headers)
+    assert [u["username"] for u in response.json()] == ["admin"]
+
+
+def test_get_company_members_not_member(client, user_token, db, test_admin):
+    """Testa listagem de membros quando não é membro"""
+    company = CompanyService.create_company(db, CompanyCreate(name="Test Company", user_id=test_admin.id))
+    response = client.get(
+        f"/api/v1/companies/{company.id}/users",
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_batch_membership_routes(client, user_token, db, test_user, test_admin):
+    """Testa as rotas de membership em lote"""
+    company = CompanyService.create_company(db, CompanyCreate(name="Test Company", user_id=test_user.id))
+    headers = {"Authorization": f"Bearer {user_token}"}
+
+    response = client.post(
+        f"/api/v1/companies/{company.id}/users:batch",
+        json={"user_ids": [test_admin.id, 99999]},
+        headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["applied"] == [test_admin.id]
+    assert data["not_found"] == [99999]
+    assert data["member_count"] == 2
+
+    response = client.post(
+        f"/api/v1/companies/{company.id}/users:batchRemove",
+        json={"user_ids": [test_admin.id]},
+        headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["member_count"] == 1
+
+
+def test_batch_membership_not_member(client, user_token, db, test_admin):
+    """Testa lote quando o usuário atual não é membro"""
+    company = CompanyService.create_company(db, CompanyCreate(name="Test Company", user_id=test_admin.id))
+    response = client.post(
+        f"/api/v1/companies/{company.id}/users:batch",
+        json={"user_ids": [test_admin.id]},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_batch_membership_empty_list(client, user_token, db, test_user):
+    """Testa lote vazio"""
+    company = CompanyService.create_company(db, CompanyCreate(name="Test Company", user_id=test_user.id))
+    response = client.post(
+        f"/api/v1/companies/{company.id}/users:batch",
+        json={"user_ids": []},
+        headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == 422
+
+
+def test_company_routes_query_budget(client, user_token, db, test_user, query_budget):
+    """Testa que listagens não fazem uma query por company/membro (N+1)"""
+    companies = [
+        CompanyService.create_company(db, CompanyCreate(name=f"Company {i}", user_id=test_user.id))
+        for i in range(5)
+    ]
+    for i in range(5):
+        member = UserService.create_user(
+            db, UserCreate(email=f"m{i}@example.com", username=f"member{i}", password="password123")
+        )
+        CompanyService.add_user_to_company(db, companies[0].id, member.id)
+    company_id = companies[0].id
+    headers = {"Authorization": f"Bearer {user_token}"}
+    # Aquece o cache de principals para contar apenas a rota
+    client.get("/api/v1/auth/me", headers=headers)
+
+    with query_budget(1):
+        assert len(client.get("/api/v1/companies", headers=headers).json()) == 5
+    with query_budget(1):
+        assert client.get(f"/api/v1/companies/{company_id}", headers=headers).status_code == 200
+    with query_budget(2):
+        assert len(client.get(f"/api/v1/companies/{company_id}/users", headers=headers).json()) == 6
+
+
+def test_company_routes_async_session(async_client, async_db, query_budget):
+    """Testa as rotas de companies com AsyncSession (DATABASE_ASYNC)"""
+    from core.security import create_access_token
+
+    admin = UserService.create_user(
+        async_db, UserCreate(email="admin@example.com", username="admin", password="adminpass123"),
+        role=UserRole.ADMIN
+    )
+    users = [
+        UserService.create_user(
+            async_db, UserCreate(email=f"m{i}@example.com", username=f"member{i}", password="password123")
+        )
+        for i in range(3)
+    ]
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': admin.id})}"}
+
+    response = async_client.post(
+        "/api/v1/companies", json={"name": "Async Company", "user_id": admin.id}, headers=headers
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    company_id = response.json()["id"]
+    response = async_client.put(
+        f"/api/v1/companies/{company_id}", json={"description": "Updated"}, headers=headers
+    )
+    assert response.json()["description"] == "Updated"
+
+    response = async_client.post(
+        f"/api/v1/companies/{company_id}/users", json={"user_id": users[0].id}, headers=headers
+    )
+    assert response.json()["member_count"] == 2
+    response = async_client.post(
+        f"/api/v1/companies/{company_id}/users:batch",
+        json={"user_ids": [users[0].id, users[1].id, users[2].id, 99999]},
+        headers=headers
+    )
+    data = response.json()
+    assert data["applied"] == [users[1].id, users[2].id]
+    assert data["skipped"] == [users[0].id]
+    assert data["member_count"] == 4
+
+    with query_budget(1):
+        assert len(async_client.get("/api/v1/companies", headers=headers).json()) == 1
+    with query_budget(1):
+        response = async_client.get(f"/api/v1/companies/{company_id}", headers=headers)
+    assert response.json()["name"] == "Async Company"
+    with query_budget(2):
+        assert len(async_client.get(f"/api/v1/companies/{company_id}/users", headers=headers).json()) == 4
+
+    response = async_client.delete(f"/api/v1/companies/{company_id}/users/{users[0].id}", headers=headers)
+    assert response.json()["member_count"] == 3
+    response = async_client.post(
+        f"/api/v1/companies/{company_id}/users:batchRemove",
+        json={"user_ids": [users[1].id, users[2].id]},
+        headers=headers
+    )
+    assert response.json()["member_count"] == 1
@@ -232,3 +232,155 @@ def test_remove_user_from_company_user_not_found(db, test_user):
         CompanyService.remove_user_from_company(db, company.id, 99999)
     assert exc_info.value.status_code == 404
 
+
+
+def test_load_company_access(db, test_user, test_admin, query_budget):
+    """Testa carregamento autorizado da company em duas queries"""
+    company = CompanyService.create_company(db, CompanyCreate(name="Test Company", user_id=test_user.id))
+    company_id, user_id, admin_id = company.id, test_user.id, test_admin.id
+    db.expunge_all()
+
+    with query_budget(2) as stats:
+        access = CompanyService.load_company_access(
+            db, company_id, member_id=user_id, target_user_id=admin_id
+        )
+    assert stats.count == 2
+    assert access.company.id == company_id
+    assert access.target_user.id == admin_id
+    assert access.target_is_member is False
+
+
+def test_load_company_access_not_member(db, test_user, test_admin):
+    """Testa 403 quando o usuário não é membro"""
+    company = CompanyService.create_company(db, CompanyCreate(name="Test Company", user_id=test_user.id))
+    with pytest.raises(HTTPException) as exc_info:
+        CompanyService.load_company_access(db, company.id, member_id=test_admin.id)
+    assert exc_info.value.status_code == 403
+
+
+def _create_companies(db, user, names):
+    return [CompanyService.create_company(db, CompanyCreate(name=name, user_id=user.id)) for name in names]
+
+
+def test_get_user_companies_page_by_name(db, test_user, test_admin):
+    """Testa paginação por cursor ordenada por nome"""
+    _create_companies(db, test_user, ["Delta", "Alpha", "Charlie", "Bravo"])
+    _create_companies(db, test_admin, ["Aardvark"])
+
+    companies, cursor = CompanyService.get_user_companies_page(db, test_user.id, limit=3)
+    assert [c.name for c in companies] == ["Alpha", "Bravo", "Charlie"]
+    companies, cursor = CompanyService.get_user_companies_page(db, test_user.id, cursor=cursor, limit=3)
+    assert [c.name for c in companies] == ["Delta"]
+    assert cursor is None
+
+
+def test_get_user_companies_page_by_created_at_desc(db, test_user):
+    """Testa paginação por created_at em ordem decrescente"""
+    created = _create_companies(db, test_user, ["First", "Second", "Third"])
+    expected = [c.name for c in sorted(created, key=lambda c: (c.created_at, c.id), reverse=True)]
+
+    names, cursor = [], None
+    while True:
+        companies, cursor = CompanyService.get_user_companies_page(
+            db, test_user.id, cursor=cursor, limit=1, sort="created_at", descending=True
+        )
+        names.extend(c.name for c in companies)
+        if cursor is None:
+            break
+    assert names == expected
+
+
+def test_get_user_companies_page_name_prefix(db, test_user):
+    """Testa filtro por prefixo do nome"""
+    _create_companies(db, test_user, ["Acme", "Acme Labs", "Globex"])
+    companies, _ = CompanyService.get_user_companies_page(db, test_user.id, name_prefix="Acme")
+    assert [c.name for c in companies] == ["Acme", "Acme Labs"]
+
+
+def test_get_user_companies_page_cursor_sort_mismatch(db, test_user):
+    """Testa cursor gerado para outra ordenação"""
+    _create_companies(db, test_user, ["A", "B"])
+    _, cursor = CompanyService.get_user_companies_page(db, test_user.id, limit=1)
+    with pytest.raises(HTTPException) as exc_info:
+        CompanyService.get_user_companies_page(db, test_user.id, cursor=cursor, sort="created_at")
+    assert exc_info.value.status_code == 400
+
+
+def test_get_company_members_page(db, test_user, test_admin):
+    """Testa paginação e busca de membros"""
+    company = CompanyService.create_company(db, CompanyCreate(name="Test Company", user_id=test_user.id))
+    CompanyService.add_user_to_company(db, company.id, test_admin.id)
+
+    users, cursor = CompanyService.get_company_members_page(db, company.id, limit=1)
+    assert [u.id for u in users] == [test_user.id]
+    users, cursor = CompanyService.get_company_members_page(db, company.id, cursor=cursor)
+    assert [u.id for u in users] == [test_admin.id]
+    assert cursor is None
+
+    users, _ = CompanyService.get_company_members_page(db, company.id, search="test@")
+    assert [u.id for u in users] == [test_user.id]
+    assert CompanyService.count_members(db, company.id) == 2
+
+
+def test_get_company_members_page_invalid_cursor(db, test_user):
+    """Testa cursor inválido na listagem de membros"""
+    from core.pagination import encode_cursor
+
+    company = CompanyService.create_company(db, CompanyCreate(name="Test Company", user_id=test_user.id))
+    with pytest.raises(HTTPException) as exc_info:
+        CompanyService.get_company_members_page(db, company.id, cursor=encode_cursor({"id": "x"}))
+    assert exc_info.value.status_code == 400
+
+
+def test_add_and_remove_members_batch(db, test_user, test_admin, query_budget):
+    """Testa adição e remoção em lote com relatório de ignorados"""
+    company = CompanyService.create_company(db, CompanyCreate(name="Test Company", user_id=test_user.id))
+    company_id, user_id, admin_id = company.id, test_user.id, test_admin.id
+
+    with query_budget(4) as stats:
+        result = CompanyService.add_members(db, company_id, [admin_id, user_id, 99999, admin_id])
+    # SELECT usuários, SELECT membros, INSERT em lote e contagem
+    assert stats.count == 4
+    assert result == {
+        "company_id": company_id,
+        "applied": [admin_id],
+        "skipped": [user_id],
+        "not_found": [99999],
+        "member_count": 2,
+    }
+
+    result = CompanyService.remove_members(db, company_id, [admin_id, user_id, 99999])
+    assert result["applied"] == [admin_id, user_id]
+    assert result["not_found"] == [99999]
+    assert result["member_count"] == 0
+
+    result = CompanyService.remove_members(db, company_id, [admin_id])
+    assert result["applied"] == []
+    assert result["skipped"] == [admin_id]
+
+
+def test_add_members_concurrent_insert_skipped(db, test_user, test_admin, monkeypatch):
+    """Testa membros adicionados por outro request entre o SELECT e o INSERT"""
+    company = CompanyService.create_company(db, CompanyCreate(name="Test Company", user_id=test_user.id))
+    company_id, user_id, admin_id = company.id, test_user.id, test_admin.id
+    # Simula o request concorrente: a classificação não vê o membro atual
+    monkeypatch.setattr(
+        CompanyService, "_classify_batch",
+        staticmethod(lambda db, company_id, user_ids: (list(user_ids), set(), []))
+    )
+
+    result = CompanyService.add_members(db, company_id, [user_id, admin_id])
+    assert result["applied"] == [admin_id]
+    assert result["skipped"] == [user_id]
+    assert result["member_count"] == 2
+
+
+def test_add_members_other_dialects(db, test_user, test_admin, monkeypatch):
+    """Testa o INSERT simples em dialetos sem ON CONFLICT mapeado"""
+    import apps.companies.services as services
+
+    monkeypatch.setattr(services, "_UPSERT_INSERTS", {})
+    company = CompanyService.create_company(db, CompanyCreate(name="Test Company", user_id=test_user.id))
+    result = CompanyService.add_members(db, company.id, [test_admin.id])
+    assert result["applied"] == [test_admin.id]
+    assert result["member_count"] == 2
@@ -0,0 +1,29 @@
+import pytest
+
+from core.bloom import BloomFilter
+
+
+def test_bloom_filter_no_false_negatives():
+    """Testa que todo item adicionado é encontrado"""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"user{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert bloom.count == 1000
+
+
+def test_bloom_filter_false_positive_rate():
+    """Testa a taxa de falsos positivos dentro da capacidade"""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"user{i}")
+    false_positives = sum(f"other{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_bloom_filter_invalid_parameters():
+    """Testa capacidade e taxa de erro inválidas"""
+    for capacity, error_rate in ((0, 0.01), (10, 0), (10, 1)):
+        with pytest.raises(ValueError):
+            BloomFilter(capacity, error_rate)
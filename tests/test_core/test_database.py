@@ -0,0 +1,358 @@
+import pytest
+from starlette.requests import Request
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+import core.database as database
+from core.database import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    ReplicaRouter,
+    READ_YOUR_WRITES_COOKIE,
+    ReadYourWritesMiddleware,
+    async_engine_options,
+    async_url,
+    build_async_engine,
+    build_engine,
+    dispose_async_engines,
+    engine_options,
+    get_async_db,
+    get_async_read_db,
+    get_db,
+    get_read_db,
+    pool_stats,
+    primary_until,
+    run_db,
+    warm_up_databases,
+    warm_up_pool
+)
+
+
+def test_engine_options_memory_sqlite():
+    """Testa que SQLite em memória mantém o pool padrão"""
+    assert engine_options("sqlite:///:memory:") == {"connect_args": {"check_same_thread": False}}
+
+
+def test_engine_options_pool_settings(monkeypatch):
+    """Testa parâmetros de pool vindos das configurações"""
+    monkeypatch.setattr(database.settings, "DB_POOL_SIZE", 20)
+    monkeypatch.setattr(database.settings, "DB_MAX_OVERFLOW", 0)
+    monkeypatch.setattr(database.settings, "DB_POOL_RECYCLE", 1800)
+    monkeypatch.setattr(database.settings, "DB_POOL_PRE_PING", True)
+
+    options = engine_options("sqlite:///./file.db")
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] == 20
+    assert options["max_overflow"] == 0
+    assert options["pool_recycle"] == 1800
+    assert options["pool_pre_ping"] is True
+
+
+def test_engine_options_statement_timeout(monkeypatch):
+    """Testa statement_timeout no Postgres"""
+    monkeypatch.setattr(database.settings, "DB_STATEMENT_TIMEOUT_MS", 5000)
+
+    options = engine_options("postgresql://u:p@h/db")
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+
+def test_sqlite_pragmas_applied_on_connect(tmp_path, monkeypatch):
+    """Testa PRAGMAs aplicados a cada nova conexão"""
+    monkeypatch.setattr(database.settings, "SQLITE_MMAP_SIZE", 1048576)
+    db_engine = build_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    try:
+        with db_engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA cache_size")).scalar() == -64000
+            assert conn.execute(text("PRAGMA mmap_size")).scalar() == 1048576
+    finally:
+        db_engine.dispose()
+
+
+def test_pool_stats(tmp_path, monkeypatch):
+    """Testa estatísticas de checkout, overflow e espera do pool"""
+    monkeypatch.setattr(database.settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(database.settings, "DB_MAX_OVERFLOW", 1)
+    monkeypatch.setattr(database.settings, "DB_POOL_TIMEOUT", 0.01)
+    db_engine = build_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    try:
+        first = db_engine.connect()
+        second = db_engine.connect()
+        stats = pool_stats(db_engine)
+        assert stats["pool"] == "InstrumentedQueuePool"
+        assert stats["checked_out"] == 2
+        assert stats["overflow"] == 1
+
+        with pytest.raises(PoolTimeoutError):
+            db_engine.connect()
+        first.close()
+        second.close()
+
+        stats = pool_stats(db_engine)
+        assert stats["checked_out"] == 0
+        assert stats["checkouts"] == 3
+        assert stats["timeouts"] == 1
+        assert stats["max_wait_ms"] >= 10
+    finally:
+        db_engine.dispose()
+
+
+def test_pool_stats_default_pool(tmp_path):
+    """Testa estatísticas do engine principal e de pools sem QueuePool"""
+    assert pool_stats() == pool_stats(database.engine)
+    file_engine = build_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    assert "checked_out" in pool_stats(file_engine)
+    memory_engine = build_engine("sqlite:///:memory:")
+    assert pool_stats(memory_engine) == {"pool": "SingletonThreadPool"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _request(cookie=None) -> Request:
+    headers = [(b"cookie", f"{READ_YOUR_WRITES_COOKIE}={cookie}".encode())] if cookie else []
+    return Request({"type": "http", "headers": headers})
+
+
+def test_replica_router_round_robin():
+    """Testa distribuição round-robin entre réplicas"""
+    primary, r1, r2 = object(), object(), object()
+    router = ReplicaRouter(primary, [r1, r2])
+    assert [router.engine_for() for _ in range(4)] == [r1, r2, r1, r2]
+
+
+def test_replica_router_without_replicas():
+    """Testa que sem réplicas as leituras vão ao primário"""
+    primary = object()
+    assert ReplicaRouter(primary, []).engine_for("client") is primary
+
+
+def test_replica_router_least_connections(tmp_path):
+    """Testa escolha da réplica com menos conexões em uso"""
+    busy = build_engine(f"sqlite:///{tmp_path / 'busy.db'}")
+    idle = build_engine(f"sqlite:///{tmp_path / 'idle.db'}")
+    router = ReplicaRouter(object(), [busy, idle], strategy="least_connections")
+    try:
+        with busy.connect():
+            assert router.engine_for() is idle
+            assert router.engine_for() is idle
+    finally:
+        busy.dispose()
+        idle.dispose()
+
+
+def test_replica_router_invalid_strategy():
+    """Testa estratégia inválida"""
+    with pytest.raises(ValueError):
+        ReplicaRouter(object(), [], strategy="random")
+
+
+def test_replica_router_read_your_writes():
+    """Testa stickiness no primário até o prazo informado pelo cliente"""
+    clock = FakeClock()
+    primary, replica = object(), object()
+    router = ReplicaRouter(primary, [replica], sticky_seconds=5, clock=clock)
+
+    until = router.primary_until()
+    assert until == 5
+    assert router.engine_for(until) is primary
+    assert router.engine_for(None) is replica
+    assert router.engine_for() is replica
+
+    clock.now = 6
+    assert router.engine_for(until) is replica
+
+
+def test_replica_router_ignores_forged_deadline():
+    """Testa que prazos além de now + sticky_seconds (cookie forjado) são ignorados"""
+    clock = FakeClock()
+    clock.now = 1000
+    primary, replica = object(), object()
+    router = ReplicaRouter(primary, [replica], sticky_seconds=5, clock=clock)
+
+    assert router.engine_for(1005.5) is primary  # dentro da tolerância de relógio
+    assert router.engine_for(9999999999) is replica
+    assert router.engine_for(float("inf")) is replica
+    assert router.engine_for(float("nan")) is replica
+
+
+def test_replica_router_stickiness_disabled():
+    """Testa READ_YOUR_WRITES_SECONDS=0 e a ausência de réplicas"""
+    primary, replica = object(), object()
+    assert ReplicaRouter(primary, [replica], sticky_seconds=0).primary_until() is None
+    assert ReplicaRouter(primary, []).primary_until() is None
+
+
+def test_primary_until_cookie():
+    """Testa leitura do prazo no cookie, ignorando valores inválidos"""
+    assert primary_until(_request()) is None
+    assert primary_until(_request("123.5")) == 123.5
+    assert primary_until(_request("garbage")) is None
+
+
+def test_get_db_marks_write_on_commit():
+    """Testa que commits via get_db marcam o request como escrita"""
+    request = _request()
+    dependency = get_db(request)
+    session = next(dependency)
+    assert "db_write" not in request.scope["state"]
+    session.commit()
+    dependency.close()
+    assert request.scope["state"]["db_write"] is True
+
+
+async def test_read_your_writes_middleware(monkeypatch):
+    """Testa o cookie só em respostas de requests com commit"""
+    clock = FakeClock()
+    clock.now = 1000
+    monkeypatch.setattr(database, "replica_router", ReplicaRouter(object(), [object()], sticky_seconds=5, clock=clock))
+
+    async def app(scope, receive, send):
+        if scope.get("path") == "/write":
+            scope["state"]["db_write"] = True
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def call(path):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await ReadYourWritesMiddleware(app)({"type": "http", "path": path}, None, send)
+        return dict(messages[0]["headers"])
+
+    assert b"set-cookie" not in await call("/read")
+    cookie = (await call("/write"))[b"set-cookie"].decode()
+    assert cookie.startswith(f"{READ_YOUR_WRITES_COOKIE}=1005.000;")
+    assert "Max-Age=5" in cookie
+
+    # Escopos que não são HTTP passam direto
+    async def ignore(message):
+        return None
+
+    scope = {"type": "lifespan"}
+    await ReadYourWritesMiddleware(app)(scope, None, ignore)
+    assert "state" not in scope
+
+
+def test_read_after_write_on_another_worker(client, user_token, tmp_path, monkeypatch):
+    """Testa que o cookie leva as leituras ao primário mesmo em outro processo"""
+    replica = build_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    router = ReplicaRouter(database.engine, [replica], sticky_seconds=5)
+    monkeypatch.setattr(database, "replica_router", router)
+    try:
+        response = client.put(
+            "/api/v1/auth/me", json={"full_name": "Renamed"},
+            headers={"Authorization": f"Bearer {user_token}"}
+        )
+        assert response.status_code == 200
+        cookie = response.cookies.get(READ_YOUR_WRITES_COOKIE)
+        assert cookie is not None
+        # Outro worker não tem estado local: decide só pelo cookie
+        assert router.engine_for(primary_until(_request(cookie))) is database.engine
+        assert router.engine_for(primary_until(_request())) is replica
+    finally:
+        replica.dispose()
+
+
+def test_get_read_db_binds_routed_engine(tmp_path, monkeypatch):
+    """Testa que get_read_db usa o engine escolhido pelo roteador"""
+    replica = build_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(database, "replica_router", ReplicaRouter(database.engine, [replica]))
+    try:
+        dependency = get_read_db(_request())
+        session = next(dependency)
+        assert session.get_bind() is replica
+        dependency.close()
+    finally:
+        replica.dispose()
+
+
+def test_warm_up_pool(tmp_path, monkeypatch):
+    """Testa aquecimento do pool, limitado ao pool_size"""
+    monkeypatch.setattr(database.settings, "DB_POOL_SIZE", 2)
+    db_engine = build_engine(f"sqlite:///{tmp_path / 'warm.db'}")
+    try:
+        assert warm_up_pool(db_engine, connections=5) == 2
+        stats = pool_stats(db_engine)
+        assert stats["checked_in"] == 2
+        assert stats["checked_out"] == 0
+    finally:
+        db_engine.dispose()
+    assert warm_up_pool(build_engine("sqlite:///:memory:"), connections=5) == 1
+
+
+def test_warm_up_databases_tolerates_failures(tmp_path, monkeypatch):
+    """Testa que uma réplica indisponível não impede o startup"""
+    broken = build_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    monkeypatch.setattr(database, "replica_router", ReplicaRouter(database.engine, [broken]))
+    assert warm_up_databases() == {"primary": 1, "replica0": 0}
+
+
+def test_async_url():
+    """Testa a troca para o driver assíncrono"""
+    assert async_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    assert async_url("postgresql+psycopg2://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    with pytest.raises(ValueError, match="No async driver"):
+        async_url("mysql://u:p@h/db")
+
+
+def test_async_engine_options(monkeypatch):
+    """Testa pool assíncrono e statement_timeout no formato do asyncpg"""
+    monkeypatch.setattr(database.settings, "DB_STATEMENT_TIMEOUT_MS", 5000)
+    options = async_engine_options("postgresql+asyncpg://u:p@h/db")
+    assert options["poolclass"] is InstrumentedAsyncQueuePool
+    assert options["connect_args"] == {"server_settings": {"statement_timeout": "5000"}}
+    assert async_engine_options("sqlite+aiosqlite:///./app.db")["connect_args"] == {}
+    assert async_engine_options("sqlite+aiosqlite:///:memory:") == {"connect_args": {}}
+
+
+async def test_build_async_engine(tmp_path):
+    """Testa PRAGMAs e métricas de pool no engine assíncrono"""
+    db_engine = build_async_engine(f"sqlite:///{tmp_path / 'async.db'}")
+    try:
+        async with db_engine.connect() as conn:
+            assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        stats = pool_stats(db_engine.sync_engine)
+        assert stats["pool"] == "InstrumentedAsyncQueuePool"
+        assert stats["checkouts"] == 1
+    finally:
+        await db_engine.dispose()
+
+
+async def test_run_db_with_sync_session(db):
+    """Testa que, com Session, a função roda direto na sessão"""
+    assert await run_db(db, lambda session, value: (session, value), 1) == (db, 1)
+
+
+async def test_async_db_dependencies(tmp_path, monkeypatch):
+    """Testa get_async_db (marca escritas) e get_async_read_db (engine do roteador)"""
+    primary = build_async_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = build_async_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    router = ReplicaRouter(primary, [replica])
+    monkeypatch.setattr(database, "async_replica_router", router)
+    monkeypatch.setattr(database, "AsyncSessionLocal", database.AsyncSessionLocal.__class__(bind=primary))
+
+    request = _request()
+    dependency = get_async_db(request)
+    session = await dependency.__anext__()
+    assert await run_db(session, lambda sync_session: sync_session.execute(text("SELECT 1")).scalar()) == 1
+    await session.commit()
+    await dependency.aclose()
+    assert request.scope["state"]["db_write"] is True
+
+    dependency = get_async_read_db(_request())
+    session = await dependency.__anext__()
+    assert session.get_bind() is replica.sync_engine
+    await dependency.aclose()
+
+    await dispose_async_engines()
+    monkeypatch.setattr(database, "async_replica_router", None)
+    await dispose_async_engines()
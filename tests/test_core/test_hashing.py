@@ -0,0 +1,162 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from core.hashing import PasswordHasher
+from core.security import get_password_hash_async, verify_password_async
+
+
+def _blocking(event: threading.Event) -> str:
+    event.wait(timeout=5)
+    return "done"
+
+
+def _fail():
+    raise RuntimeError("boom")
+
+
+async def test_hasher_runs_function():
+    """Testa execução de uma função no pool"""
+    hasher = PasswordHasher(workers=2, max_queue=2)
+    try:
+        assert await hasher.run(max, 1, 5) == 5
+        stats = hasher.stats()
+        assert stats["submitted"] == 1
+        assert stats["completed"] == 1
+        assert stats["in_flight"] == 0
+    finally:
+        hasher.shutdown()
+
+
+async def test_hasher_process_executor():
+    """Testa execução no pool de processos"""
+    hasher = PasswordHasher(workers=1, max_queue=0, executor="process")
+    try:
+        assert await hasher.run(max, 3, 2) == 3
+        assert hasher.stats()["executor"] == "process"
+    finally:
+        hasher.shutdown()
+
+
+def test_hasher_invalid_executor():
+    """Testa executor inválido"""
+    with pytest.raises(ValueError):
+        PasswordHasher(executor="fiber")
+
+
+async def test_hasher_rejects_when_saturated():
+    """Testa backpressure com 503 e Retry-After quando o pool está cheio"""
+    hasher = PasswordHasher(workers=1, max_queue=1, retry_after=7)
+    event = threading.Event()
+    try:
+        first = asyncio.ensure_future(hasher.run(_blocking, event))
+        second = asyncio.ensure_future(hasher.run(_blocking, event))
+        await asyncio.sleep(0)
+        assert hasher.in_flight == 2
+        assert hasher.queue_depth == 1
+
+        with pytest.raises(HTTPException) as exc_info:
+            await hasher.run(_blocking, event)
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers["Retry-After"] == "7"
+
+        event.set()
+        assert await first == "done"
+        assert await second == "done"
+        stats = hasher.stats()
+        assert stats["rejected"] == 1
+        assert stats["completed"] == 2
+    finally:
+        event.set()
+        hasher.shutdown()
+
+
+async def test_hasher_counts_failures():
+    """Testa contagem de falhas e liberação da vaga"""
+    hasher = PasswordHasher(workers=1, max_queue=0)
+    try:
+        with pytest.raises(RuntimeError):
+            await hasher.run(_fail)
+        stats = hasher.stats()
+        assert stats["failed"] == 1
+        assert stats["in_flight"] == 0
+    finally:
+        hasher.shutdown()
+
+
+async def test_hasher_cancelled_run_releases_slot():
+    """Testa que um request cancelado libera a vaga quando o worker termina"""
+    hasher = PasswordHasher(workers=1, max_queue=0)
+    event = threading.Event()
+    try:
+        task = asyncio.ensure_future(hasher.run(_blocking, event))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # O worker ainda está ocupado: a vaga continua reservada
+        assert hasher.in_flight == 1
+        with pytest.raises(HTTPException):
+            await hasher.run(max, 1, 2)
+
+        event.set()
+        for _ in range(100):
+            if hasher.in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert hasher.in_flight == 0
+        assert await hasher.run(max, 1, 2) == 2
+    finally:
+        event.set()
+        hasher.shutdown()
+
+
+async def test_async_password_helpers():
+    """Testa hash e verificação assíncronos"""
+    hashed = await get_password_hash_async("secret123")
+    assert await verify_password_async("secret123", hashed) is True
+    assert await verify_password_async("wrong", hashed) is False
+
+
+async def test_hasher_run_many_waits_for_capacity():
+    """Testa lote maior que a capacidade do pool, sem rejeições"""
+    hasher = PasswordHasher(workers=2, max_queue=0)
+    try:
+        results = await hasher.run_many(max, [(i, 3) for i in range(10)])
+        assert results == [max(i, 3) for i in range(10)]
+        stats = hasher.stats()
+        assert stats["completed"] == 10
+        assert stats["rejected"] == 0
+    finally:
+        hasher.shutdown()
+
+
+async def test_hasher_run_many_polls_when_saturated():
+    """Testa que o lote aguarda vaga quando o pool está ocupado"""
+    hasher = PasswordHasher(workers=1, max_queue=0)
+    event = threading.Event()
+    try:
+        blocker = asyncio.ensure_future(hasher.run(_blocking, event))
+        await asyncio.sleep(0)
+        batch = asyncio.ensure_future(hasher.run_many(max, [(1, 2)]))
+        await asyncio.sleep(0.05)
+        assert not batch.done()
+        event.set()
+        assert await blocker == "done"
+        assert await batch == [2]
+    finally:
+        event.set()
+        hasher.shutdown()
+
+
+def test_hasher_warm_up():
+    """Testa criação antecipada do pool de workers"""
+    hasher = PasswordHasher(workers=2, max_queue=0)
+    try:
+        hasher.warm_up()
+        assert hasher._executor is not None
+        assert hasher.stats()["submitted"] == 0
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,134 @@
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+import core.health as health
+from core.config import settings
+from core.health import ReadinessProbe, check_password_hasher, check_pool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_health_live(client):
+    """Testa o probe de liveness"""
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+
+
+def test_health_ready(client):
+    """Testa o probe de readiness com dependências saudáveis"""
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert body["checks"]["database:primary"]["status"] == "ok"
+    assert body["checks"]["database:primary"]["latency_ms"] >= 0
+    assert body["checks"]["pool:primary"]["status"] == "ok"
+    assert body["checks"]["password_hasher"]["status"] == "ok"
+
+
+def test_health_ready_database_error(client, tmp_path, monkeypatch):
+    """Testa readiness com banco inacessível"""
+    broken = create_engine(f"sqlite:///{tmp_path}/missing/dir/app.db")
+    monkeypatch.setattr(health, "database_engines", lambda: [("primary", broken)])
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "not_ready"
+    assert response.json()["checks"]["database:primary"] == {"status": "error", "error": "OperationalError"}
+
+
+def test_health_ready_database_timeout(client, monkeypatch):
+    """Testa o timeout do ping ao banco"""
+    monkeypatch.setattr(settings, "HEALTH_DB_TIMEOUT", 0.01)
+    monkeypatch.setattr(health, "ping_database", lambda db_engine: time.sleep(0.2))
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["database:primary"] == {"status": "timeout"}
+
+
+def test_health_ready_pool_saturated(client, tmp_path, monkeypatch):
+    """Testa que um pool esgotado marca o worker como não pronto, sem ping"""
+    db_engine = create_engine(
+        f"sqlite:///{tmp_path}/app.db", poolclass=QueuePool, pool_size=1, max_overflow=0
+    )
+    monkeypatch.setattr(health, "database_engines", lambda: [("primary", db_engine)])
+    pings = []
+    monkeypatch.setattr(health, "ping_database", pings.append)
+    with db_engine.connect():
+        response = client.get("/health/ready")
+    assert response.status_code == 503
+    checks = response.json()["checks"]
+    assert checks["pool:primary"] == {"status": "saturated", "checked_out": 1, "capacity": 1, "utilization": 1.0}
+    assert checks["database:primary"] == {"status": "skipped"}
+    assert pings == []
+
+
+def test_check_pool_unbounded():
+    """Testa pools sem limite de conexões"""
+    assert check_pool(create_engine("sqlite:///:memory:")) == {"status": "ok"}
+
+
+def test_check_password_hasher(monkeypatch):
+    """Testa a fila do pool de hashing"""
+    monkeypatch.setattr(health.password_hasher, "_in_flight", health.password_hasher.workers + 60)
+    assert check_password_hasher()["status"] == "overloaded"
+    monkeypatch.setattr(health.password_hasher, "_in_flight", 0)
+    assert check_password_hasher() == {
+        "status": "ok", "queue_depth": 0, "max_queue": health.password_hasher.max_queue
+    }
+
+
+def test_check_password_hasher_without_queue(monkeypatch):
+    """Testa PASSWORD_HASH_MAX_QUEUE=0: ocioso é ok, workers todos ocupados não"""
+    monkeypatch.setattr(health.password_hasher, "max_queue", 0)
+    monkeypatch.setattr(health.password_hasher, "_in_flight", 0)
+    assert check_password_hasher() == {"status": "ok", "queue_depth": 0, "max_queue": 0}
+    monkeypatch.setattr(health.password_hasher, "_in_flight", health.password_hasher.workers)
+    assert check_password_hasher()["status"] == "overloaded"
+
+
+async def test_readiness_cached(monkeypatch):
+    """Testa que probes dentro do intervalo reaproveitam o resultado"""
+    pings = []
+    monkeypatch.setattr(health, "ping_database", pings.append)
+    clock = FakeClock()
+    probe = ReadinessProbe(cache_seconds=2, clock=clock)
+    try:
+        first = await probe.check()
+        assert await probe.check() is first
+        assert len(pings) == 1
+
+        clock.now = 2
+        assert await probe.check() is not first
+        assert len(pings) == 2
+    finally:
+        probe.shutdown()
+        probe.shutdown()
+
+
+async def test_readiness_single_flight(monkeypatch):
+    """Testa que probes concorrentes disparam uma única checagem"""
+    import asyncio
+
+    pings = []
+
+    def slow_ping(db_engine):
+        pings.append(db_engine)
+        time.sleep(0.05)
+
+    monkeypatch.setattr(health, "ping_database", slow_ping)
+    probe = ReadinessProbe(cache_seconds=2)
+    try:
+        results = await asyncio.gather(*(probe.check() for _ in range(5)))
+    finally:
+        probe.shutdown()
+    assert all(result is results[0] for result in results)
+    assert len(pings) == 1
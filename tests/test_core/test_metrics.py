@@ -0,0 +1,191 @@
+import json
+import time
+
+import pytest
+
+from core.config import settings
+from core.metrics import (
+    HttpMetrics,
+    LatencyHistogram,
+    MetricFamily,
+    SnapshotStore,
+    collect,
+    generate_latest,
+    http_metrics,
+    merge,
+    render
+)
+
+
+def _sample(text: str, prefix: str) -> float:
+    """Valor da primeira linha que começa com ``prefix``"""
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{prefix} not found")
+
+
+def test_histogram_buckets():
+    """Testa contagens cumulativas e limites inclusivos (le)"""
+    histogram = LatencyHistogram([0.1, 0.5])
+    for value in (0.05, 0.1, 0.3, 2.0):
+        histogram.observe(value)
+    family = MetricFamily("latency", "histogram", "Latency")
+    histogram.export(family, route="/x")
+    text = render([family])
+    assert 'latency_bucket{le="0.1",route="/x"} 2' in text
+    assert 'latency_bucket{le="0.5",route="/x"} 3' in text
+    assert 'latency_bucket{le="+Inf",route="/x"} 4' in text
+    assert 'latency_count{route="/x"} 4' in text
+    assert 'latency_sum{route="/x"} 2.45' in text
+
+
+def test_render_format_and_escaping():
+    """Testa HELP/TYPE, amostras sem labels e escape de valores"""
+    family = MetricFamily("things_total", "counter", "Things")
+    family.add(1)
+    family.add(2.5, path='a"b\\c\nd')
+    assert render([family]) == (
+        "# HELP things_total Things\n"
+        "# TYPE things_total counter\n"
+        "things_total 1\n"
+        'things_total{path="a\\"b\\\\c\\nd"} 2.5\n'
+    )
+
+
+def test_metrics_endpoint_by_route_template(client, user_token, test_user):
+    """Testa latência e status por template da rota, nunca pelo path bruto"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    for _ in range(2):
+        client.get(f"/api/v1/auth/users/{test_user.id}", headers=headers)
+    client.get("/api/v1/auth/users/999", headers=headers)
+    client.get("/nothing-here/123")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    route = 'method="GET",route="/api/v1/auth/users/{user_id}"'
+    assert _sample(text, f"http_request_duration_seconds_count{{{route}}}") == 3
+    assert _sample(text, f'http_requests_total{{{route},status="403"}}') == 3
+    assert _sample(text, 'http_requests_total{method="GET",route="<unmatched>",status="404"}') == 1
+    assert "/api/v1/auth/users/999" not in text
+    # O próprio scrape está em andamento
+    assert _sample(text, "http_requests_in_progress") == 1
+
+
+def test_metrics_custom_methods_grouped(client, test_user):
+    """Testa que métodos arbitrários enviados pelo cliente não criam séries"""
+    for method in ("X0", "X1", "X2"):
+        client.request(method, f"/api/v1/auth/users/{test_user.id}")
+        client.request(method, "/api/v1/auth/me")
+
+    text = client.get("/metrics").text
+    for method in ("X0", "X1", "X2"):
+        assert f'method="{method}"' not in text
+    route = 'method="OTHER",route="/api/v1/auth/users/{user_id}"'
+    assert _sample(text, f"http_request_duration_seconds_count{{{route}}}") == 3
+    assert "OTHER /api/v1/auth/me" in client.get("/metrics/queries").json()
+
+
+def test_metrics_preallocated_routes(client):
+    """Testa que as rotas do OpenAPI já têm séries antes do primeiro request"""
+    http_metrics.preallocate(client.app)
+    text = generate_latest()
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/v1/auth/login"} 0' in text
+
+
+def test_application_metrics(client, db, test_user):
+    """Testa pools, hashing, rate limit, caches e filtro de usernames"""
+    from apps.auth.usernames import username_filter
+
+    username_filter.refresh(db)
+    client.post("/api/v1/auth/login", json={"username": "testuser", "password": "testpass123"})
+    client.post("/api/v1/auth/login", json={"username": "ghost", "password": "x"})
+    text = client.get("/metrics").text
+
+    assert _sample(text, 'login_attempts_total{result="allowed"}') == 2
+    assert _sample(text, 'password_hasher_jobs_total{result="completed"}') >= 2
+    assert _sample(text, "password_hasher_queue_depth") == 0
+    assert _sample(text, "username_filter_negatives_total") == 1
+    assert _sample(text, 'db_queries_total{method="POST",route="/api/v1/auth/login"}') >= 1
+    assert 'cache_requests_total{cache="token",result="hit"}' in text
+    assert "# TYPE db_pool_connections gauge" in text
+
+
+def test_metrics_middleware_disabled(client, monkeypatch):
+    """Testa METRICS_ENABLED=false"""
+    monkeypatch.setattr(settings, "METRICS_ENABLED", False)
+    client.get("/")
+    assert http_metrics.route("GET", "/").histogram.count == 0
+
+
+async def test_unhandled_error_counted_as_500():
+    """Testa que exceções sem resposta contam como 500"""
+    from core.metrics import MetricsMiddleware
+
+    metrics = HttpMetrics([0.1])
+
+    async def app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await MetricsMiddleware(app, metrics)({"type": "http", "method": "GET", "path": "/"}, None, None)
+    with pytest.raises(RuntimeError):
+        await MetricsMiddleware(app, metrics)({"type": "lifespan"}, None, None)
+    assert metrics.route("GET", "<unmatched>").statuses == {500: 1}
+    assert metrics.in_flight == 0
+
+
+def test_merge_snapshots():
+    """Testa soma entre workers; gauges de snapshots antigos são ignorados"""
+    counter = MetricFamily("requests_total", "counter", "Requests")
+    counter.add(2, route="/a")
+    gauge = MetricFamily("in_progress", "gauge", "In progress")
+    gauge.add(1)
+    other = {
+        "requests_total": {"type": "counter", "help": "Requests",
+                           "samples": [["requests_total", [["route", "/a"]], 3]]},
+        "in_progress": {"type": "gauge", "help": "In progress", "samples": [["in_progress", [], 4]]},
+        "only_there_total": {"type": "counter", "help": "Other", "samples": [["only_there_total", [], 1]]},
+    }
+    merged = {family.name: family for family in merge([counter, gauge], [(other, True), (other, False)])}
+    assert merged["requests_total"].samples[("requests_total", (("route", "/a"),))] == 8
+    assert merged["in_progress"].samples[("in_progress", ())] == 5
+    assert merged["only_there_total"].samples[("only_there_total", ())] == 2
+
+
+def test_snapshot_store_multiprocess(tmp_path):
+    """Testa agregação entre workers via snapshots em arquivo"""
+    worker = SnapshotStore(str(tmp_path), interval=5, pid=1001)
+    family = MetricFamily("http_requests_total", "counter", "HTTP requests by route and status")
+    family.add(7, method="GET", route="/x", status=200)
+    worker.write([family])
+    (tmp_path / "metrics-broken.json").write_text("{")
+
+    scraper = SnapshotStore(str(tmp_path), interval=5, pid=1002)
+    assert [fresh for _, fresh in scraper.read_others()] == [True]
+    text = generate_latest(scraper)
+    assert 'http_requests_total{method="GET",route="/x",status="200"} 7' in text
+
+    # Gauges de um worker que parou de gravar deixam de ser somados
+    data = json.loads(worker.path.read_text())
+    data["written_at"] = time.time() - 60
+    worker.path.write_text(json.dumps(data))
+    assert [fresh for _, fresh in scraper.read_others()] == [False]
+
+
+def test_snapshot_store_background_writer(tmp_path, monkeypatch, caplog):
+    """Testa a thread que grava snapshots periodicamente"""
+    store = SnapshotStore(str(tmp_path / "metrics"), interval=0.01)
+    store.start()
+    assert store.path.exists()
+    store.write = lambda families=None: (_ for _ in ()).throw(OSError("disk full"))
+    time.sleep(0.05)
+    del store.write
+    store.stop()
+    assert "Failed to write metrics snapshot" in caplog.text
+    assert {family["type"] for family in json.loads(store.path.read_text())["families"].values()} >= {
+        "counter", "gauge", "histogram"
+    }
+    assert len(collect()) > 3
@@ -0,0 +1,112 @@
+from pathlib import Path
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect
+
+import apps.auth.models  # noqa: F401
+import apps.companies.models  # noqa: F401
+from core.database import Base
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+def _alembic_config(url: str) -> Config:
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("sqlalchemy.url", url)
+    # Mantém a configuração de logging do pytest
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def test_migrations_match_models(tmp_path):
+    """Testa que as migrations geram exatamente o schema dos models"""
+    url = f"sqlite:///{tmp_path / 'migrations.db'}"
+    command.upgrade(_alembic_config(url), "head")
+
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            diff = compare_metadata(MigrationContext.configure(conn), Base.metadata)
+        assert diff == []
+        indexes = {index["name"] for index in inspect(engine).get_indexes("user_companies")}
+        assert "ix_user_companies_company_id_user_id" in indexes
+    finally:
+        engine.dispose()
+
+
+def test_migrations_downgrade(tmp_path):
+    """Testa que o downgrade remove todas as tabelas"""
+    url = f"sqlite:///{tmp_path / 'migrations.db'}"
+    config = _alembic_config(url)
+    command.upgrade(config, "head")
+    command.downgrade(config, "base")
+
+    engine = create_engine(url)
+    try:
+        assert inspect(engine).get_table_names() == ["alembic_version"]
+    finally:
+        engine.dispose()
+
+
+def _user_companies_indexes(url: str) -> set:
+    engine = create_engine(url)
+    try:
+        return {index["name"] for index in inspect(engine).get_indexes("user_companies")}
+    finally:
+        engine.dispose()
+
+
+def test_stamped_legacy_database_gets_membership_index(tmp_path):
+    """Testa o fluxo documentado: schema antigo + ``stamp 0001`` + ``upgrade head``"""
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    config = _alembic_config(url)
+    # Equivalente ao schema do create_all anterior ao índice composto
+    command.upgrade(config, "0001")
+    assert "ix_user_companies_company_id_user_id" not in _user_companies_indexes(url)
+
+    command.upgrade(config, "head")
+    assert "ix_user_companies_company_id_user_id" in _user_companies_indexes(url)
+
+
+def test_membership_index_revision_skips_existing_index(tmp_path):
+    """Testa bancos que já têm o índice (create_all recente ou 0001 antiga)"""
+    url = f"sqlite:///{tmp_path / 'existing.db'}"
+    config = _alembic_config(url)
+    command.upgrade(config, "0002")
+    engine = create_engine(url)
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE INDEX ix_user_companies_company_id_user_id ON user_companies (company_id, user_id)"
+            )
+    finally:
+        engine.dispose()
+
+    command.upgrade(config, "head")
+    assert "ix_user_companies_company_id_user_id" in _user_companies_indexes(url)
+
+
+def test_user_columns_added_to_existing_rows(tmp_path):
+    """Testa token_version, username_seq e o contador em uma tabela users com linhas"""
+    url = f"sqlite:///{tmp_path / 'populated.db'}"
+    config = _alembic_config(url)
+    command.upgrade(config, "0003")
+    engine = create_engine(url)
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO users (email, username, hashed_password) VALUES ('a@example.com', 'a', 'x')"
+            )
+        command.upgrade(config, "head")
+        with engine.connect() as conn:
+            version, seq = conn.exec_driver_sql(
+                "SELECT token_version, username_seq FROM users"
+            ).one()
+            counter = conn.exec_driver_sql("SELECT id, value FROM username_sequence").all()
+        assert (version, seq) == (0, 0)
+        assert counter == [(1, 0)]
+    finally:
+        engine.dispose()
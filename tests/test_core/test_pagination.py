@@ -0,0 +1,25 @@
+import pytest
+from fastapi import HTTPException
+
+from core.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_roundtrip():
+    """Testa codificação e decodificação do cursor"""
+    cursor = encode_cursor({"id": 42, "k": "Acme"})
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == {"id": 42, "k": "Acme"}
+
+
+def test_decode_empty_cursor():
+    """Testa cursor ausente"""
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor!", "bnVsbA", "WzEsMl0"])
+def test_decode_invalid_cursor(cursor):
+    """Testa cursor malformado ou que não é um objeto"""
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor)
+    assert exc_info.value.status_code == 400
@@ -0,0 +1,127 @@
+import logging
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from core.config import settings
+from core.queries import (
+    QUERY_COUNT_HEADER,
+    QUERY_DUPLICATES_HEADER,
+    QUERY_TIME_HEADER,
+    QueryStats,
+    current_query_stats,
+    query_metrics,
+    track_queries
+)
+from core.routing import OTHER_METHOD, UNMATCHED_ROUTE, route_method, route_template
+
+
+def test_track_queries_counts_and_duplicates(db):
+    """Testa contagem, tempo e statements repetidos"""
+    assert current_query_stats() is None
+    with track_queries() as stats:
+        assert current_query_stats() is stats
+        for _ in range(3):
+            db.execute(text("SELECT 1"))
+        db.execute(text("SELECT 2"))
+    assert current_query_stats() is None
+    assert stats.count == 4
+    assert stats.duplicates == 2
+    assert stats.seconds > 0
+    assert stats.most_repeated() == ("SELECT 1", 3)
+    assert QueryStats().most_repeated() == (None, 0)
+
+
+def test_track_queries_nested(db):
+    """Testa que escopos aninhados repassam as queries ao escopo externo"""
+    with track_queries() as outer:
+        db.execute(text("SELECT 1"))
+        with track_queries() as inner:
+            db.execute(text("SELECT 2"))
+    assert inner.count == 1
+    assert outer.count == 2
+
+
+def test_track_queries_failed_statement(db):
+    """Testa que statements com erro não desalinham a medição"""
+    with track_queries() as stats:
+        with pytest.raises(OperationalError):
+            db.execute(text("SELECT * FROM missing_table"))
+        db.rollback()
+        db.execute(text("SELECT 1"))
+    assert stats.count == 1
+    assert db.connection().info["query_started_at"] == []
+
+
+def test_debug_headers(client, user_token, monkeypatch):
+    """Testa os headers X-DB-* apenas em modo DEBUG"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    response = client.get("/api/v1/auth/me", headers=headers)
+    assert QUERY_COUNT_HEADER not in response.headers
+
+    monkeypatch.setattr(settings, "DEBUG", True)
+    response = client.get("/api/v1/auth/me", headers=headers)
+    assert response.headers[QUERY_COUNT_HEADER] == "1"
+    assert response.headers[QUERY_DUPLICATES_HEADER] == "0"
+    assert float(response.headers[QUERY_TIME_HEADER]) >= 0
+
+
+def test_queries_metrics_endpoint(client, user_token, test_user):
+    """Testa o agregado por template de rota"""
+    headers = {"Authorization": f"Bearer {user_token}"}
+    client.get("/api/v1/auth/me", headers=headers)
+    client.get("/api/v1/auth/me", headers=headers)
+    client.get(f"/api/v1/auth/users/{test_user.id}", headers=headers)
+    client.get("/does-not-exist")
+
+    metrics = client.get("/metrics/queries").json()
+    me = metrics["GET /api/v1/auth/me"]
+    assert me["requests"] == 2
+    assert me["queries"] == 3
+    assert me["max_queries"] == 2
+    assert me["avg_queries"] == 1.5
+    assert me["requests_with_duplicates"] == 1
+    assert "GET /api/v1/auth/users/{user_id}" in metrics
+    assert f"GET {UNMATCHED_ROUTE}" in metrics
+
+
+def test_duplicate_queries_warning(client, user_token, monkeypatch, caplog):
+    """Testa o warning de possível N+1"""
+    monkeypatch.setattr(settings, "QUERY_DUPLICATE_WARN_THRESHOLD", 1)
+    with caplog.at_level(logging.WARNING, logger="core.queries"):
+        client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {user_token}"})
+    assert "Possible N+1 on GET /api/v1/auth/me" in caplog.text
+
+
+def test_route_template():
+    """Testa template com prefixo de router incluído e rota desconhecida"""
+    from apps.auth.routes import router
+
+    route = next(r for r in router.routes if r.path == "/users/{user_id}")
+    scope = {"route": route, "path": "/api/v1/auth/users/7"}
+    assert route_template(scope) == "/api/v1/auth/users/{user_id}"
+    # Segunda chamada usa o prefixo já resolvido
+    assert route_template(scope) == "/api/v1/auth/users/{user_id}"
+    assert route_template({"route": route, "path": "/other"}) == "/users/{user_id}"
+    assert route_template({"path": "/missing"}) == UNMATCHED_ROUTE
+
+
+def test_route_method():
+    """Testa métodos padrão e o agrupamento dos demais em OTHER"""
+    assert route_method({"method": "PATCH"}) == "PATCH"
+    assert route_method({"method": "PROPFIND"}) == OTHER_METHOD
+
+
+async def test_websocket_scope_passthrough():
+    """Testa que scopes não-HTTP passam direto pelo middleware"""
+    from core.queries import QueryCountMiddleware
+
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["type"])
+
+    await QueryCountMiddleware(app)({"type": "lifespan"}, None, None)
+    assert calls == ["lifespan"]
+    assert query_metrics.snapshot() == {}
@@ -0,0 +1,230 @@
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import core.ratelimit as ratelimit
+from core.ratelimit import (
+    InMemoryStore,
+    LoginRateLimiter,
+    MemoryRateLimitBackend,
+    RateLimitBackend,
+    RedisStore,
+    SharedStoreRateLimitBackend,
+    build_rate_limit_backend,
+    client_ip
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Subconjunto do redis-py usado pelo RedisStore"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def get(self, key):
+        value = self.data.get(key)
+        return None if value is None else str(value).encode()
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.results = []
+
+    def incr(self, key):
+        self.redis.data[key] = self.redis.data.get(key, 0) + 1
+        self.results.append(self.redis.data[key])
+
+    def expire(self, key, ttl):
+        self.redis.ttls[key] = ttl
+        self.results.append(True)
+
+    def execute(self):
+        return self.results
+
+
+def test_memory_backend_token_bucket():
+    """Testa consumo e reposição de tokens"""
+    clock = FakeClock()
+    backend = MemoryRateLimitBackend(clock=clock)
+    assert [backend.hit("k", 3, 60)[0] for _ in range(4)] == [True, True, True, False]
+
+    allowed, retry_after = backend.hit("k", 3, 60)
+    assert allowed is False
+    assert retry_after == pytest.approx(20)
+
+    clock.now += 20  # repõe um token (3 por 60 s)
+    assert backend.hit("k", 3, 60)[0] is True
+    assert backend.hit("k", 3, 60)[0] is False
+    assert backend.hit("other", 3, 60)[0] is True
+
+
+def test_memory_backend_bounded():
+    """Testa limite de chaves rastreadas"""
+    backend = MemoryRateLimitBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        backend.hit(key, 1, 60)
+    assert list(backend._buckets) == ["b", "c"]
+    backend.clear()
+    assert len(backend._buckets) == 0
+
+
+def test_shared_store_sliding_window():
+    """Testa a janela deslizante ponderada pela janela anterior"""
+    clock = FakeClock(now=600.0)
+    backend = SharedStoreRateLimitBackend(InMemoryStore(clock=clock), clock=clock)
+    assert [backend.hit("k", 4, 60)[0] for _ in range(5)] == [True, True, True, True, False]
+
+    # Metade da janela seguinte: a anterior (5 hits) pesa 50%
+    clock.now = 690.0
+    allowed, _ = backend.hit("k", 4, 60)
+    assert allowed is True  # 2.5 + 1
+    allowed, retry_after = backend.hit("k", 4, 60)
+    assert allowed is False  # 2.5 + 2
+    assert retry_after == pytest.approx(30)
+
+    clock.now = 800.0
+    assert backend.hit("k", 4, 60)[0] is True
+
+
+def test_rate_limit_backend_is_abstract():
+    """Testa que backends precisam implementar hit e clear"""
+    with pytest.raises(TypeError):
+        RateLimitBackend()
+
+
+def test_in_memory_store_expiry_and_bound():
+    """Testa TTL e limite de chaves do store local"""
+    clock = FakeClock()
+    store = InMemoryStore(max_keys=2, clock=clock)
+    assert store.incr("a", 10) == 1
+    assert store.incr("a", 10) == 2
+    clock.now += 11
+    assert store.get("a") == 0
+    assert store.incr("a", 10) == 1
+    store.incr("b", 10)
+    store.incr("c", 10)
+    assert store.get("a") == 0
+    store.clear()
+    assert store.get("c") == 0
+
+
+def test_redis_store():
+    """Testa o adaptador para clientes redis-py"""
+    redis = FakeRedis()
+    backend = SharedStoreRateLimitBackend(RedisStore(redis), clock=lambda: 120.0)
+    assert backend.hit("k", 1, 60)[0] is True
+    assert backend.hit("k", 1, 60)[0] is False
+    assert redis.data == {"k:2": 2}
+    assert redis.ttls == {"k:2": 120}
+    backend.clear()
+
+
+def test_build_rate_limit_backend(monkeypatch):
+    """Testa criação do backend a partir das configurações"""
+    monkeypatch.setattr(ratelimit.settings, "RATE_LIMIT_BACKEND", "memory")
+    assert isinstance(build_rate_limit_backend(), MemoryRateLimitBackend)
+    monkeypatch.setattr(ratelimit.settings, "RATE_LIMIT_BACKEND", "store")
+    assert isinstance(build_rate_limit_backend().store, InMemoryStore)
+    monkeypatch.setattr(ratelimit.settings, "RATE_LIMIT_BACKEND", "memcached")
+    with pytest.raises(ValueError):
+        build_rate_limit_backend()
+
+
+def test_build_rate_limit_backend_redis_missing(monkeypatch):
+    """Testa backend redis sem o pacote instalado"""
+    import builtins
+
+    real_import = builtins.__import__
+
+    def fake_import(name, *args, **kwargs):
+        if name == "redis":
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(ratelimit.settings, "RATE_LIMIT_BACKEND", "redis")
+    monkeypatch.setattr(builtins, "__import__", fake_import)
+    with pytest.raises(RuntimeError):
+        build_rate_limit_backend()
+
+
+def test_client_ip(monkeypatch):
+    """Testa IP do cliente, com e sem proxy confiável"""
+    request = Request({
+        "type": "http",
+        "client": ("10.0.0.1", 1234),
+        "headers": [(b"x-forwarded-for", b"203.0.113.7, 10.0.0.2")],
+    })
+    assert client_ip(request) == "10.0.0.1"
+    monkeypatch.setattr(ratelimit.settings, "RATE_LIMIT_TRUST_FORWARDED", True)
+    assert client_ip(request) == "203.0.113.7"
+    assert client_ip(Request({"type": "http", "headers": []})) == "unknown"
+
+
+def test_login_rate_limiter_limits_and_stats():
+    """Testa limites por username e por IP e as métricas"""
+    limiter = LoginRateLimiter(MemoryRateLimitBackend(), username_limit=2, ip_limit=3, window=60)
+    limiter.check("Alice", "1.1.1.1")
+    limiter.check("alice", "1.1.1.1")
+    with pytest.raises(HTTPException) as exc_info:
+        limiter.check("ALICE", "2.2.2.2")
+    assert exc_info.value.status_code == 429
+    assert int(exc_info.value.headers["Retry-After"]) >= 1
+
+    limiter.check("bob", "1.1.1.1")
+    with pytest.raises(HTTPException):
+        limiter.check("carol", "1.1.1.1")
+
+    assert limiter.stats() == {
+        "backend": "memory",
+        "allowed": 3,
+        "rejected_ip": 1,
+        "rejected_username": 1,
+    }
+    limiter.reset()
+    assert limiter.stats()["allowed"] == 0
+    limiter.check("alice", "1.1.1.1")
+
+
+def test_login_rate_limiter_disabled():
+    """Testa limiter desativado"""
+    limiter = LoginRateLimiter(MemoryRateLimitBackend(), username_limit=0, ip_limit=0, window=60, enabled=False)
+    limiter.check("alice", "1.1.1.1")
+    assert limiter.stats()["allowed"] == 0
+
+
+async def test_login_rate_limiter_async_offloads_blocking_backend():
+    """Testa que backends bloqueantes (Redis) não rodam no event loop"""
+    import threading
+
+    threads = []
+
+    class RecordingRedis(FakeRedis):
+        def get(self, key):
+            threads.append(threading.current_thread())
+            return super().get(key)
+
+    redis_limiter = LoginRateLimiter(
+        SharedStoreRateLimitBackend(RedisStore(RecordingRedis())), username_limit=1, ip_limit=10, window=60
+    )
+    await redis_limiter.check_async("alice", "1.1.1.1")
+    assert threads and threading.main_thread() not in threads
+    with pytest.raises(HTTPException):
+        await redis_limiter.check_async("alice", "1.1.1.1")
+
+    memory_limiter = LoginRateLimiter(MemoryRateLimitBackend(), username_limit=1, ip_limit=10, window=60)
+    assert memory_limiter.backend.blocking is False
+    await memory_limiter.check_async("alice", "1.1.1.1")
+    assert memory_limiter.stats()["allowed"] == 1
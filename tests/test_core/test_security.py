@@ -1,12 +1,24 @@
+import time
+
 import pytest
 from datetime import timedelta
 from jose import jwt
+from fastapi import HTTPException
+from apps.auth.models import User, UserRole
+from core.revocation import current_token_version, token_versions
 from core.security import (
+    Principal,
     verify_password,
     get_password_hash,
+    password_needs_rehash,
     create_access_token,
-    decode_access_token
+    create_user_access_token,
+    decode_access_token,
+    get_current_user,
+    principal_cache,
+    token_cache
 )
+import core.security as security
 from core.config import settings
 
 
@@ -81,3 +93,193 @@ def test_decode_access_token_expired():
     payload = decode_access_token(token)
     assert payload is None
 
+
+
+def test_create_user_access_token_claims(test_user):
+    """Testa claims do token stateless"""
+    payload = decode_access_token(create_user_access_token(test_user))
+    assert payload["sub"] == str(test_user.id)
+    assert payload["username"] == test_user.username
+    assert payload["role"] == "user"
+    assert payload["active"] is True
+    assert payload["ver"] == 0
+
+
+async def test_get_current_user_stateless_skips_db(test_user, monkeypatch):
+    """Testa autenticação stateless sem consulta ao banco"""
+    monkeypatch.setattr(settings, "STATELESS_AUTH", True)
+    token = create_user_access_token(test_user)
+    principal = await get_current_user(token=token, db=None)
+    assert principal == Principal(
+        id=test_user.id, username=test_user.username, role=UserRole.USER, is_active=True
+    )
+
+
+async def test_get_current_user_stateless_revoked(db, test_user, monkeypatch):
+    """Testa rejeição de token stateless revogado em outro worker"""
+    monkeypatch.setattr(settings, "STATELESS_AUTH", True)
+    token = create_user_access_token(test_user)
+    db.query(User).filter(User.id == test_user.id).update(
+        {User.token_version: User.token_version + 1}
+    )
+    db.commit()
+    # Outro worker: a versão antiga fica em cache até o TTL
+    assert (await get_current_user(token=token, db=db)).id == test_user.id
+    token_versions.clear()
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_user(token=token, db=db)
+    assert exc_info.value.status_code == 401
+
+
+async def test_get_current_user_stateless_deleted_user(db, test_user, monkeypatch):
+    """Testa rejeição de token stateless de usuário removido"""
+    monkeypatch.setattr(settings, "STATELESS_AUTH", True)
+    token = create_user_access_token(test_user)
+    db.delete(test_user)
+    db.commit()
+    token_versions.clear()
+    with pytest.raises(HTTPException):
+        await get_current_user(token=token, db=db)
+
+
+async def test_get_current_user_stateless_invalid_role(test_user, monkeypatch):
+    """Testa rejeição de token stateless com role inválida"""
+    monkeypatch.setattr(settings, "STATELESS_AUTH", True)
+    token = create_access_token(
+        {"sub": test_user.id, "username": "x", "role": "root", "active": True, "ver": 0}
+    )
+    with pytest.raises(HTTPException):
+        await get_current_user(token=token, db=None)
+
+
+async def test_get_current_user_stateless_incomplete_claims(test_user, monkeypatch):
+    """Testa rejeição de token stateless sem todos os claims"""
+    monkeypatch.setattr(settings, "STATELESS_AUTH", True)
+    token = create_access_token({"sub": test_user.id, "ver": 0})
+    with pytest.raises(HTTPException):
+        await get_current_user(token=token, db=None)
+
+
+async def test_get_current_user_loads_from_db(db, test_user):
+    """Testa autenticação padrão com consulta ao banco"""
+    token = create_user_access_token(test_user)
+    principal = await get_current_user(token=token, db=db)
+    assert principal.id == test_user.id
+    assert principal.role == UserRole.USER
+
+
+def test_current_token_version(db, test_user):
+    """Testa leitura da versão de token no banco, com cache"""
+    assert current_token_version(db, test_user.id) == 0
+    assert token_versions.get(test_user.id) == 0
+    assert current_token_version(db, 999) is None
+    assert token_versions.get(999) is None
+
+
+async def test_get_current_user_uses_principal_cache(db, test_user):
+    """Testa que a segunda autenticação vem do cache de principals"""
+    token = create_user_access_token(test_user)
+    first = await get_current_user(token=token, db=db)
+    second = await get_current_user(token=token, db=None)
+    assert first is second
+    assert principal_cache.stats()["hits"] >= 1
+
+
+def test_decode_access_token_cached(monkeypatch):
+    """Testa que a verificação da assinatura é feita uma vez por token"""
+    token_cache.clear()
+    token = create_access_token({"sub": 1}, expires_delta=timedelta(minutes=5))
+    calls = []
+    original_decode = security.token_backend.decode
+
+    def counting_decode(token):
+        calls.append(token)
+        return original_decode(token)
+
+    monkeypatch.setattr(security.token_backend, "decode", counting_decode)
+    stats_before = token_cache.stats()
+    first = decode_access_token(token)
+    second = decode_access_token(token)
+
+    assert first == second
+    assert len(calls) == 1
+    stats = token_cache.stats()
+    assert stats["hits"] == stats_before["hits"] + 1
+    assert stats["size"] == 1
+
+
+def test_decode_access_token_cache_expires_with_token(monkeypatch):
+    """Testa que a entrada do cache expira junto com o token"""
+    token_cache.clear()
+    token = create_access_token({"sub": 1}, expires_delta=timedelta(seconds=60))
+    assert decode_access_token(token) is not None
+
+    now = time.monotonic()
+    monkeypatch.setattr(token_cache, "_clock", lambda: now + 59)
+    decode_access_token(token)
+    assert token_cache.stats()["expirations"] == 0
+
+    # Após o exp a entrada é descartada e o token volta a ser verificado
+    monkeypatch.setattr(token_cache, "_clock", lambda: now + 61)
+    decode_access_token(token)
+    assert token_cache.stats()["expirations"] == 1
+
+
+def test_decode_access_token_cache_isolated():
+    """Testa que alterar o payload retornado não altera o cache"""
+    token_cache.clear()
+    token = create_access_token({"sub": 1, "role": "user"})
+    decode_access_token(token)["role"] = "admin"
+    assert decode_access_token(token)["role"] == "user"
+
+
+def test_decode_access_token_invalid_not_cached():
+    """Testa que tokens inválidos não ocupam o cache"""
+    token_cache.clear()
+    assert decode_access_token("invalid.token.here") is None
+    assert len(token_cache) == 0
+
+
+def test_password_hash_bcrypt_rounds(monkeypatch):
+    """Testa custo do bcrypt configurável e detecção de hash desatualizado"""
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+    hashed = get_password_hash("secret123")
+    assert hashed.startswith("$2b$05$")
+    assert password_needs_rehash(hashed) is False
+
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 6)
+    assert password_needs_rehash(hashed) is True
+    assert verify_password("secret123", hashed) is True
+
+
+def test_password_hash_scrypt(monkeypatch):
+    """Testa o esquema scrypt e a migração entre esquemas"""
+    bcrypt_hash = get_password_hash("secret123")
+    monkeypatch.setattr(settings, "PASSWORD_HASH_SCHEME", "scrypt")
+    monkeypatch.setattr(settings, "SCRYPT_N", 2 ** 10)
+
+    hashed = get_password_hash("secret123")
+    assert hashed.startswith("$scrypt$n=1024,r=8,p=1$")
+    assert verify_password("secret123", hashed) is True
+    assert verify_password("wrong", hashed) is False
+    assert password_needs_rehash(hashed) is False
+    assert password_needs_rehash(bcrypt_hash) is True
+    # Hashes bcrypt continuam verificáveis durante a migração
+    assert verify_password("secret123", bcrypt_hash) is True
+
+    monkeypatch.setattr(settings, "SCRYPT_N", 2 ** 11)
+    assert password_needs_rehash(hashed) is True
+
+    monkeypatch.setattr(settings, "PASSWORD_HASH_SCHEME", "bcrypt")
+    assert password_needs_rehash(hashed) is True
+
+
+def test_password_hash_malformed(monkeypatch):
+    """Testa hashes malformados e esquema desconhecido"""
+    assert verify_password("secret123", "$scrypt$n=x$bad") is False
+    assert password_needs_rehash("not-a-hash") is True
+    monkeypatch.setattr(settings, "PASSWORD_HASH_SCHEME", "scrypt")
+    assert password_needs_rehash("$scrypt$broken") is True
+    monkeypatch.setattr(settings, "PASSWORD_HASH_SCHEME", "argon2")
+    with pytest.raises(ValueError):
+        get_password_hash("secret123")
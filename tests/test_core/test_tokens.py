@@ -0,0 +1,233 @@
+import base64
+import json
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jose import jwt as jose_jwt
+
+import core.tokens as tokens
+from core.tokens import (
+    InvalidTokenError,
+    JoseTokenBackend,
+    NativeTokenBackend,
+    TokenBackend,
+    build_token_backend
+)
+
+SECRET = "test-secret"
+
+
+def _pem(private_key) -> bytes:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+
+
+def _public_pem(private_key) -> bytes:
+    return private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+
+def _segment(data: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+
+
+@pytest.fixture(scope="module")
+def ec_key():
+    return ec.generate_private_key(ec.SECP256R1())
+
+
+@pytest.fixture(scope="module")
+def ed_key():
+    return ed25519.Ed25519PrivateKey.generate()
+
+
+def test_native_hmac_round_trip():
+    """Testa encode/decode HS256 com datas convertidas para timestamp"""
+    from datetime import datetime, timedelta, timezone
+
+    backend = NativeTokenBackend("HS256", SECRET)
+    exp = datetime.now(timezone.utc) + timedelta(minutes=5)
+    claims = backend.decode(backend.encode({"sub": "1", "exp": exp}))
+    assert claims == {"sub": "1", "exp": int(exp.timestamp())}
+
+
+@pytest.mark.parametrize("algorithm", ["HS256", "HS384", "HS512"])
+def test_native_hmac_interoperates_with_jose(algorithm):
+    """Testa que tokens são intercambiáveis com o python-jose"""
+    backend = NativeTokenBackend(algorithm, SECRET)
+    exp = int(time.time()) + 60
+    native_token = backend.encode({"sub": "1", "exp": exp})
+    assert jose_jwt.decode(native_token, SECRET, algorithms=[algorithm])["sub"] == "1"
+
+    jose_token = jose_jwt.encode({"sub": "2", "exp": exp}, SECRET, algorithm=algorithm)
+    assert backend.decode(jose_token)["sub"] == "2"
+
+
+def test_native_rejects_invalid_tokens():
+    """Testa assinatura adulterada, algoritmo inesperado e tokens malformados"""
+    backend = NativeTokenBackend("HS256", SECRET)
+    token = backend.encode({"sub": "1"})
+    header, payload, signature = token.split(".")
+
+    forged_payload = _segment({"sub": "2"})
+    none_header = _segment({"alg": "none", "typ": "JWT"})
+    invalid = [
+        f"{header}.{forged_payload}.{signature}",
+        f"{none_header}.{payload}.",
+        NativeTokenBackend("HS256", "other-secret").encode({"sub": "1"}),
+        "invalid.token.here",
+        "not-a-token",
+        f"{header}.{payload}.@@@",
+        "ção.ção.ção",
+    ]
+    for bad_token in invalid:
+        with pytest.raises(InvalidTokenError):
+            backend.decode(bad_token)
+
+
+def test_native_rejects_non_object_payload():
+    """Testa payload assinado que não é um objeto JSON"""
+    backend = NativeTokenBackend("HS256", SECRET)
+    header = backend._header_segment
+    for payload in (base64.urlsafe_b64encode(b"[1]").rstrip(b"=").decode(), "bm90LWpzb24"):
+        signing_input = f"{header}.{payload}"
+        signature = base64.urlsafe_b64encode(backend._sign(signing_input.encode())).rstrip(b"=").decode()
+        with pytest.raises(InvalidTokenError):
+            backend.decode(f"{signing_input}.{signature}")
+
+
+def test_native_time_claims():
+    """Testa exp expirado, nbf futuro e claims de data inválidos"""
+    backend = NativeTokenBackend("HS256", SECRET)
+    now = int(time.time())
+    for claims in ({"exp": now - 10}, {"nbf": now + 60}, {"exp": "soon"}):
+        with pytest.raises(InvalidTokenError):
+            backend.decode(backend.encode(claims))
+    assert backend.decode(backend.encode({"exp": now + 60, "nbf": now}))["nbf"] == now
+
+
+def test_native_es256(ec_key):
+    """Testa ES256: assinatura verificável pelo python-jose e JWKS"""
+    backend = NativeTokenBackend("ES256", _pem(ec_key))
+    token = backend.encode({"sub": "1"})
+    assert backend.decode(token) == {"sub": "1"}
+    assert jose_jwt.decode(token, _public_pem(ec_key).decode(), algorithms=["ES256"])["sub"] == "1"
+
+    header = json.loads(base64.urlsafe_b64decode(token.split(".")[0] + "=="))
+    (jwk,) = backend.jwks()["keys"]
+    assert jwk["kty"] == "EC"
+    assert jwk["crv"] == "P-256"
+    assert header["kid"] == jwk["kid"]
+
+
+def test_native_es256_rejects_bad_signature_length(ec_key):
+    """Testa assinatura ES256 com tamanho inválido"""
+    backend = NativeTokenBackend("ES256", ec_key)
+    header, payload, _ = backend.encode({"sub": "1"}).split(".")
+    with pytest.raises(InvalidTokenError):
+        backend.decode(f"{header}.{payload}.AAAA")
+
+
+def test_native_eddsa_verify_only(ed_key):
+    """Testa EdDSA e um backend só com a chave pública (apenas verificação)"""
+    issuer = NativeTokenBackend("EdDSA", _pem(ed_key))
+    verifier = NativeTokenBackend("EdDSA", verifying_key=_public_pem(ed_key))
+    token = issuer.encode({"sub": "1"})
+    assert verifier.decode(token) == {"sub": "1"}
+    assert verifier.jwks() == issuer.jwks()
+    assert verifier.jwks()["keys"][0]["kty"] == "OKP"
+
+    with pytest.raises(RuntimeError):
+        verifier.encode({"sub": "1"})
+    other = NativeTokenBackend("EdDSA", ed25519.Ed25519PrivateKey.generate())
+    with pytest.raises(InvalidTokenError):
+        verifier.decode(other.encode({"sub": "1"}))
+
+
+def test_native_invalid_configuration(ec_key, ed_key):
+    """Testa algoritmo, segredo e tipos de chave inválidos"""
+    with pytest.raises(ValueError):
+        NativeTokenBackend("RS256", SECRET)
+    with pytest.raises(ValueError):
+        NativeTokenBackend("HS256", "")
+    with pytest.raises(ValueError):
+        NativeTokenBackend("ES256")
+    with pytest.raises(ValueError):
+        NativeTokenBackend("ES256", ed_key)
+    with pytest.raises(ValueError):
+        NativeTokenBackend("EdDSA", ec_key)
+    with pytest.raises(ValueError):
+        NativeTokenBackend("ES256", ec.generate_private_key(ec.SECP384R1()))
+
+
+def test_jose_backend(ec_key):
+    """Testa o backend python-jose"""
+    backend = JoseTokenBackend("HS256", SECRET)
+    token = backend.encode({"sub": "1"})
+    assert backend.decode(token) == {"sub": "1"}
+    assert backend.jwks() == {"keys": []}
+    with pytest.raises(InvalidTokenError):
+        backend.decode("invalid.token.here")
+
+    es_backend = JoseTokenBackend("ES256", _pem(ec_key).decode())
+    assert es_backend.decode(es_backend.encode({"sub": "1"})) == {"sub": "1"}
+    assert NativeTokenBackend("ES256", ec_key).decode(es_backend.encode({"sub": "1"})) == {"sub": "1"}
+    assert es_backend.jwks()["keys"][0]["kty"] == "EC"
+    verifier = JoseTokenBackend("ES256", verifying_key=_public_pem(ec_key).decode())
+    assert verifier.decode(es_backend.encode({"sub": "2"}))["sub"] == "2"
+    with pytest.raises(RuntimeError):
+        verifier.encode({"sub": "1"})
+
+
+def test_jose_backend_invalid_configuration():
+    """Testa algoritmos não suportados pelo backend python-jose"""
+    with pytest.raises(ValueError):
+        JoseTokenBackend("EdDSA", SECRET)
+    with pytest.raises(ValueError):
+        JoseTokenBackend("RS256", SECRET)
+
+
+def test_token_backend_is_abstract():
+    """Testa que backends precisam implementar encode e decode"""
+    with pytest.raises(TypeError):
+        TokenBackend()
+
+    class EncodeOnly(TokenBackend):
+        def encode(self, claims: dict) -> str:
+            return ""
+
+    with pytest.raises(TypeError):
+        EncodeOnly()
+
+
+def test_build_token_backend(tmp_path, monkeypatch, ed_key):
+    """Testa criação do backend a partir das configurações"""
+    monkeypatch.setattr(tokens.settings, "TOKEN_BACKEND", "jose")
+    assert isinstance(build_token_backend(), JoseTokenBackend)
+
+    monkeypatch.setattr(tokens.settings, "TOKEN_BACKEND", "native")
+    private_file = tmp_path / "private.pem"
+    private_file.write_bytes(_pem(ed_key))
+    monkeypatch.setattr(tokens.settings, "ALGORITHM", "EdDSA")
+    monkeypatch.setattr(tokens.settings, "JWT_PRIVATE_KEY_FILE", str(private_file))
+    backend = build_token_backend()
+    assert isinstance(backend, NativeTokenBackend)
+    assert backend.decode(backend.encode({"sub": "1"})) == {"sub": "1"}
+
+    monkeypatch.setattr(tokens.settings, "TOKEN_BACKEND", "pyjwt")
+    with pytest.raises(ValueError):
+        build_token_backend()
+
+
+def test_jwks_endpoint(client):
+    """Testa o endpoint JWKS (HS256 não publica chaves)"""
+    response = client.get("/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert response.json() == {"keys": []}